@@ -1,5 +1,13 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import cbsodata
 import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from api_scripts.cbs_cache import STANDAARD_TTL, haal_op_met_cache
+from pipeline_scripts.profilering import meet_stap
 
 # Tijdelijke oplossing voor het definiëren van Limburgse COROP-regio's
 limburg_dict = {
@@ -11,11 +19,187 @@ limburg_dict = {
     }
 }
 
-def download_cbs_data(table_code, geolevel=None, filter_limburg=False, convert_to_geolevel_codes=False, keep_nl_data=True):
+# CBS-regiocode van Nederland in de kolom 'RegioS'
+CBS_CODE_NEDERLAND = 'NL01'
+
+# Aantal rijen per OData-pagina bij het parallel downloaden van één tabel
+CBS_PAGINA_GROOTTE = 10000
+
+# Dataset van de CBS-tabellen die wordt opgehaald, parallel of niet. Hoort bij de cachesleutel,
+# zodat getypeerde en ongetypeerde data nooit onder dezelfde sleutel terechtkomen.
+CBS_DATASET = 'TypedDataSet'
+
+# Endpoints in de root-lijst van een CBS-tabel die geen dimensie (code -> titel) zijn;
+# alle overige endpoints zijn dimensies (zoals cbsodata.get_data ze ook bepaalt)
+CBS_GEEN_DIMENSIE = {'TableInfos', 'UntypedDataSet', 'TypedDataSet', 'DataProperties', 'CategoryGroups'}
+
+# Kolomprefixen van de totale oppervlakte in CBS-tabellen, met de factor naar km²:
+# 70072NED (Regionale kerncijfers) in km², de Kerncijfers wijken en buurten in hectare
+CBS_OPPERVLAKTE_KOLOMMEN = {'TotaleOppervlakte': 1, 'OppervlakteTotaal': 0.01}
+
+def _met_herhaling(functie, pogingen=3, wachttijd=1.0):
+    """
+    Voert `functie` uit en probeert het bij netwerkfouten opnieuw,
+    met een exponentieel oplopende wachttijd (1s, 2s, 4s, ...).
+    """
+    for poging in range(1, pogingen + 1):
+        try:
+            return functie()
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as fout:
+            if poging == pogingen:
+                raise
+            wacht = wachttijd * 2 ** (poging - 1)
+            print(f"Poging {poging} van {pogingen} mislukt ({fout}). Opnieuw proberen over {wacht:.0f}s...")
+            time.sleep(wacht)
+
+def _maak_sessie(max_workers):
+    """
+    Maakt een requests-sessie met een connection pool die groot genoeg is
+    voor het opgegeven aantal gelijktijdige verzoeken.
+    """
+    sessie = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    sessie.mount('https://', adapter)
+    sessie.mount('http://', adapter)
+    sessie.proxies.update({k: v for k, v in cbsodata.options.requests.get('proxies', {}).items() if v})
+    return sessie
+
+def _cbs_tabel_url(table_code):
+    protocol = 'https' if cbsodata.options.use_https else 'http'
+    return f"{protocol}://{cbsodata.options.catalog_url}/ODataFeed/odata/{table_code}/"
+
+def _get(sessie, url, params):
+    antwoord = sessie.get(url, params=params, timeout=60)
+    antwoord.raise_for_status()
+    antwoord.encoding = 'utf-8'
+    return antwoord
+
+def _download_cbs_pagina(sessie, url, params, pogingen=3):
+    """Downloadt één OData-pagina (inclusief eventuele vervolgpagina's)."""
+    rijen = []
+    while url is not None:
+        antwoord = _met_herhaling(lambda: _get(sessie, url, params), pogingen=pogingen)
+        inhoud = antwoord.json()
+        rijen.extend(inhoud['value'])
+        url, params = inhoud.get('odata.nextLink'), None
+    return rijen
+
+@meet_stap
+def download_cbs_tabel_parallel(table_code, filters=None, select=None, max_workers=4,
+                                pagina_grootte=CBS_PAGINA_GROOTTE, pogingen=3, behoud_codes=None):
+    """
+    Downloadt een CBS-tabel (de dataset `CBS_DATASET`) door de OData-pagina's parallel op te halen.
+    Met `max_workers=1` worden de pagina's na elkaar opgehaald.
+
+    Het aantal rijen wordt eerst opgevraagd met `$count` en de dimensies uit de lijst met
+    endpoints van de tabel, waarna de pagina's met `$top`/`$skip` gelijktijdig worden
+    gedownload over een gedeelde connection pool.
+    Net als `cbsodata.get_data` worden dimensiecodes vertaald naar hun titels, behalve
+    voor de dimensies in `behoud_codes`.
+
+    Parameters:
+    -----------
+    table_code (str): De tabelcode van de CBS-dataset (bijv. '37230NED').
+    filters (str, optional): OData `$filter`-expressie.
+    select (list, optional): Kolommen om op te halen.
+    max_workers (int, optional): Maximaal aantal gelijktijdige verzoeken.
+    pagina_grootte (int, optional): Aantal rijen per pagina.
+    pogingen (int, optional): Aantal pogingen per verzoek bij netwerkfouten.
+    behoud_codes (list, optional): Dimensies waarvan de codes behouden blijven (bijv. ['RegioS']).
+
+    Returns:
+    --------
+    pd.DataFrame: De opgehaalde dataset.
+    """
+    basis_url = _cbs_tabel_url(table_code)
+    basis_params = {'$format': 'json'}
+    if filters:
+        basis_params['$filter'] = filters
+    if select:
+        basis_params['$select'] = ','.join(select)
+
+    with _maak_sessie(max_workers) as sessie:
+        # Stap 1: Bepaal het aantal rijen en de dimensies van de tabel
+        count_params = {'$filter': filters} if filters else None
+        aantal_rijen = int(_met_herhaling(
+            lambda: _get(sessie, basis_url + f'{CBS_DATASET}/$count', count_params), pogingen=pogingen
+        ).text)
+        endpoints = _download_cbs_pagina(sessie, basis_url, {'$format': 'json'}, pogingen)
+        dimensies = [e['name'] for e in endpoints if e['name'] not in CBS_GEEN_DIMENSIE]
+        if select:
+            dimensies = [d for d in dimensies if d in select]
+        dimensies = [d for d in dimensies if d not in (behoud_codes or [])]
+
+        # Stap 2: Download de pagina's en de dimensietabellen gelijktijdig
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pagina_futures = [
+                executor.submit(
+                    _download_cbs_pagina, sessie, basis_url + CBS_DATASET,
+                    {**basis_params, '$top': pagina_grootte, '$skip': skip}, pogingen
+                )
+                for skip in range(0, max(aantal_rijen, 1), pagina_grootte)
+            ]
+            dimensie_futures = {
+                dimensie: executor.submit(_download_cbs_pagina, sessie, basis_url + dimensie, {'$format': 'json'}, pogingen)
+                for dimensie in dimensies
+            }
+            rijen = [rij for future in pagina_futures for rij in future.result()]
+            dimensie_titels = {
+                dimensie: {item['Key']: item['Title'] for item in future.result()}
+                for dimensie, future in dimensie_futures.items()
+            }
+
+    # Stap 3: Vertaal dimensiecodes naar titels (zoals cbsodata.get_data dat doet)
+    data = pd.DataFrame(rijen)
+    for dimensie, titels in dimensie_titels.items():
+        if dimensie in data.columns:
+            data[dimensie] = data[dimensie].map(titels).fillna(data[dimensie])
+    return data
+
+def _bouw_odata_filter(regio_codes=None, perioden=None):
+    """
+    Bouwt een OData `$filter`-expressie op basis van regiocodes en periodepatronen.
+
+    Regiocodes worden als prefix gematcht (bijv. 'CR37' of 'GM' voor alle gemeenten),
+    periodepatronen als deelstring (bijv. 'JJ00' voor hele jaren of '2024' voor één jaar).
+    """
+    delen = []
+    if regio_codes:
+        regio_filter = " or ".join(f"startswith(RegioS,'{code.upper()}')" for code in regio_codes)
+        delen.append(f"({regio_filter})")
+    if perioden:
+        periode_filter = " or ".join(f"substringof('{patroon}',Perioden)" for patroon in perioden)
+        delen.append(f"({periode_filter})")
+    return " and ".join(delen) if delen else None
+
+def _bepaal_regio_codes(geolevel, filter_limburg, keep_nl_data):
+    """
+    Leidt de CBS-regiocodes af die nodig zijn voor de opgegeven geolevel-filters,
+    zodat deze al bij het CBS gefilterd kunnen worden.
+    """
+    if not geolevel:
+        return None
+    geolevel = geolevel.lower()
+    if filter_limburg and geolevel in limburg_dict:
+        regio_codes = [code.upper() for code in limburg_dict[geolevel].values()]
+    else:
+        regio_codes = [geolevel.upper()]
+    if keep_nl_data:
+        regio_codes.append(CBS_CODE_NEDERLAND)
+    return regio_codes
+
+@meet_stap
+def download_cbs_data(table_code, geolevel=None, filter_limburg=False, convert_to_geolevel_codes=False, keep_nl_data=True,
+                      regio_codes=None, perioden=None, kolommen=None,
+                      use_cache=True, offline=None, cache_ttl=STANDAARD_TTL,
+                      parallel_paginas=False, max_workers=4, behoud_codes=None):
     """
     Haalt een CBS-tabel op aan de hand van een opgegeven tabelcode, 
     en kan optioneel filteren op een specifiek geolevel (bijv. LD, PV, CR),
     en/of specifiek Limburgse COROP-regio's en regio-namen vertalen naar corresponderende codes.
+
+    Filters op regio en periode en de kolomselectie worden als OData `$filter`/`$select`
+    naar het CBS gestuurd, zodat alleen het benodigde deel van de tabel wordt gedownload.
     Parameters:
     -----------
     table_code (str): De tabelcode van de CBS-dataset (bijv. '70072NED').
@@ -23,13 +207,48 @@ def download_cbs_data(table_code, geolevel=None, filter_limburg=False, convert_t
     filter_limburg (bool, optional): Filter alleen Limburgse COROP-regio's indien `True`.
     convert_to_geolevel_codes (bool, optional): Converteer namen in 'RegioS' naar codes indien `True`.
     keep_nl_data (bool, optional): Houd de rijen waar 'RegionS == Nederland' ongeacht de toegepaste filters.
+    regio_codes (list, optional): CBS-regiocodes of -prefixen om op te filteren (bijv. ['CR37', 'NL01'] of ['GM']).
+        Standaard afgeleid uit `geolevel`, `filter_limburg` en `keep_nl_data`.
+    perioden (list, optional): Periodepatronen om op te filteren (bijv. ['JJ00'] voor hele jaren).
+    kolommen (list, optional): Kolommen om op te halen (bijv. ['RegioS', 'Perioden', 'BevolkingAanHetEindeVanDePeriode_15']).
+    use_cache (bool, optional): Gebruik de lokale CBS-cache (zie `api_scripts.cbs_cache`) indien `True`.
+    offline (bool, optional): Gebruik uitsluitend de lokale cache, zonder netwerk. Standaard via 'CBS_OFFLINE'.
+    cache_ttl (int, optional): Aantal seconden dat de wijzigingsdatum van de tabel niet opnieuw wordt gecontroleerd.
+    parallel_paginas (bool, optional): Download de OData-pagina's van de tabel parallel indien `True`.
+        Beide varianten halen dezelfde dataset (`CBS_DATASET`) op en leveren dus dezelfde waarden.
+    max_workers (int, optional): Maximaal aantal gelijktijdige verzoeken bij `parallel_paginas=True`.
+    behoud_codes (list, optional): Dimensies waarvan de CBS-codes behouden blijven in plaats van
+        de titels (bijv. ['RegioS'] voor 'CR37' in plaats van 'Noord-Limburg (CR)').
     Returns:
     --------
     pd.DataFrame: De volledige of gefilterde dataset.
     """
-    # Download de volledige tabel
-    data = pd.DataFrame(cbsodata.get_data(table_code))
-    print(f"Dataset met tabelcode '{table_code}' succesvol opgehaald.")
+    # Bepaal welk deel van de tabel bij het CBS opgehaald moet worden
+    if regio_codes is None:
+        regio_codes = _bepaal_regio_codes(geolevel, filter_limburg, keep_nl_data)
+    odata_filter = _bouw_odata_filter(regio_codes, perioden)
+    if kolommen is not None:
+        # 'RegioS' is altijd nodig voor de verdere verwerking
+        kolommen = ['RegioS'] + [kolom for kolom in kolommen if kolom != 'RegioS']
+
+    # Download de (gefilterde) tabel, of laad deze uit de lokale cache
+    def download():
+        # Eén implementatie voor beide varianten: `cbsodata.get_data` kiest de dataset via een
+        # `typed`-vlag die in cbsodata 1.3.5 precies andersom uitpakt
+        data = download_cbs_tabel_parallel(
+            table_code, filters=odata_filter, select=kolommen, max_workers=max_workers if parallel_paginas else 1,
+            behoud_codes=behoud_codes
+        )
+        print(f"Dataset met tabelcode '{table_code}' succesvol opgehaald ({len(data)} rijen).")
+        return data
+
+    if use_cache:
+        query = {'dataset': CBS_DATASET, 'filters': odata_filter, 'select': kolommen}
+        if behoud_codes:
+            query['codes'] = sorted(behoud_codes)
+        data = haal_op_met_cache(table_code, download, query=query, ttl=cache_ttl, offline=offline)
+    else:
+        data = download()
     
     # Controleer of 'RegionS' bestaat
     if 'RegioS' not in data.columns:
@@ -85,4 +304,112 @@ def download_cbs_data(table_code, geolevel=None, filter_limburg=False, convert_t
         data = pd.concat([data, nl_data], ignore_index=True)
         print(f"Nederland-rijen toegevoegd aan de dataset: totaal {len(data)} rijen.")
     
-    return data
\ No newline at end of file
+    return data
+
+@meet_stap
+def download_cbs_tabellen(tabel_specs, max_workers=4, pogingen=3, wachttijd=1.0):
+    """
+    Haalt meerdere CBS-tabellen gelijktijdig op met `download_cbs_data`.
+
+    Elke specificatie is een dict met de argumenten voor `download_cbs_data`
+    (minimaal 'table_code') en optioneel een 'naam' waaronder het resultaat
+    wordt teruggegeven. Bij netwerkfouten wordt een tabel opnieuw opgehaald
+    met een oplopende wachttijd.
+
+    Parameters:
+    -----------
+    tabel_specs (list van dict): Specificaties van de op te halen tabellen, bijv.
+        [{'naam': 'bevolking', 'table_code': '37230NED', 'geolevel': 'cr', 'filter_limburg': True}]
+    max_workers (int, optional): Maximaal aantal tabellen dat tegelijk wordt opgehaald.
+    pogingen (int, optional): Aantal pogingen per tabel bij netwerkfouten.
+    wachttijd (float, optional): Wachttijd in seconden na de eerste mislukte poging (verdubbelt per poging).
+
+    Returns:
+    --------
+    dict: Mapping van naam (of tabelcode) naar het bijbehorende DataFrame.
+
+    Raises:
+    -------
+    RuntimeError: Als één of meer tabellen na alle pogingen niet opgehaald konden worden.
+    """
+    specs = {}
+    for spec in tabel_specs:
+        spec = dict(spec)
+        naam = spec.pop('naam', spec['table_code'])
+        if naam in specs:
+            raise ValueError(f"De naam '{naam}' komt meerdere keren voor in de tabelspecificaties.")
+        specs[naam] = spec
+
+    resultaten, fouten = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_met_herhaling, lambda spec=spec: download_cbs_data(**spec), pogingen, wachttijd): naam
+            for naam, spec in specs.items()
+        }
+        for future in as_completed(futures):
+            naam = futures[future]
+            try:
+                resultaten[naam] = future.result()
+            except Exception as fout:
+                fouten[naam] = fout
+
+    if fouten:
+        overzicht = '; '.join(f"{naam}: {fout}" for naam, fout in fouten.items())
+        raise RuntimeError(f"Niet alle CBS-tabellen konden worden opgehaald: {overzicht}")
+
+    # Behoud de volgorde van de specificaties
+    return {naam: resultaten[naam] for naam in specs}
+
+
+@meet_stap
+def download_cbs_oppervlakte(regio_codes, table_code='70072NED', periode=None, **kwargs):
+    """
+    Haalt de totale oppervlakte (in km²) van regio's op uit een CBS-tabel, standaard
+    70072NED (Nederland, provincies, COROP-gebieden en gemeenten). Voor wijken en buurten
+    kan een tabel met de Kerncijfers wijken en buurten worden opgegeven.
+
+    De tabel wordt via `download_cbs_data` opgehaald en dus lokaal gecachet. Er wordt per
+    regioniveau gefilterd (bijv. 'GM' voor alle gemeenten), niet per regio. De regio's worden
+    gekoppeld op de CBS-code in de dimensie 'RegioS' (bijv. 'CR37', 'GM0889').
+
+    Parameters:
+    -----------
+    regio_codes (iterable): Regiocodes zoals in de indicatoren, bijv. ['nl00', 'cr37', 'gm0889'].
+    table_code (str, optional): Tabelcode van de CBS-tabel met oppervlaktes.
+    periode (str, optional): Periode waarvan de oppervlakte gebruikt wordt (bijv. '2025JJ00').
+        Standaard per regio het meest recente jaar waarvoor een oppervlakte bekend is.
+    **kwargs: Overige argumenten voor `download_cbs_data`, bijv. `offline=True`.
+
+    Returns:
+    --------
+    pd.Series: Oppervlakte in km², geïndexeerd op regiocode (kleine letters, Nederland als 'nl00').
+
+    Raises:
+    -------
+    KeyError: Als de tabel geen kolom met de totale oppervlakte bevat.
+    """
+    regio_codes = {code.lower() for code in regio_codes}
+    prefixen = sorted({
+        CBS_CODE_NEDERLAND if code == limburg_dict['nederland'] else code[:2].upper()
+        for code in regio_codes
+    })
+    data = download_cbs_data(
+        table_code, keep_nl_data=False, regio_codes=prefixen, perioden=[periode or 'JJ00'],
+        behoud_codes=['RegioS', 'Perioden'], **kwargs
+    )
+
+    oppervlakte_kolom = next(
+        (kolom for kolom in data.columns if kolom.split('_')[0] in CBS_OPPERVLAKTE_KOLOMMEN), None
+    )
+    if oppervlakte_kolom is None:
+        raise KeyError(f"CBS-tabel {table_code} bevat geen kolom met de totale oppervlakte.")
+
+    factor = CBS_OPPERVLAKTE_KOLOMMEN[oppervlakte_kolom.split('_')[0]]
+    data = data.assign(
+        RegioS=data['RegioS'].replace({CBS_CODE_NEDERLAND.lower(): limburg_dict['nederland']}),
+        oppervlakte=pd.to_numeric(data[oppervlakte_kolom], errors='coerce').mul(factor),
+    ).dropna(subset=['oppervlakte'])
+
+    # Per regio de meest recente periode met een bekende oppervlakte (periodecodes als '2025JJ00' sorteren op jaar)
+    data = data.sort_values('Perioden').drop_duplicates('RegioS', keep='last')
+    return pd.Series(data['oppervlakte'].to_numpy(), index=data['RegioS'].to_numpy(), name='oppervlakte')
@@ -0,0 +1,318 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import cbsodata
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # niet beschikbaar op Windows
+    fcntl = None
+
+# Standaardlocatie van de lokale CBS-cache (in de root van de repository)
+CACHE_MAP = Path(os.environ.get(
+    "CBS_CACHE_MAP",
+    Path(__file__).resolve().parents[1] / ".cache" / "cbs"
+))
+
+# Hoe lang (in seconden) een opgehaalde wijzigingsdatum van een tabel vertrouwd wordt
+STANDAARD_TTL = 24 * 60 * 60
+
+# Maximaal aantal versies per tabel/query en maximale totale grootte van de cache
+MAX_VERSIES_PER_QUERY = 2
+MAX_CACHE_GROOTTE_MB = 2048
+
+INDEX_BESTAND = "index.json"
+
+# Beschermt de index tegen gelijktijdige updates wanneer tabellen parallel worden opgehaald
+# (tussen threads; zie `_index_slot` voor het slot tussen processen)
+_INDEX_SLOT = threading.RLock()
+_INDEX_DIEPTE = threading.local()
+
+
+def _offline_modus(offline):
+    """
+    Bepaalt of de offline-modus actief is: expliciet via het argument,
+    of via de omgevingsvariabele 'CBS_OFFLINE=1'.
+    """
+    if offline is not None:
+        return offline
+    return os.environ.get("CBS_OFFLINE", "0").lower() in ("1", "true", "ja")
+
+
+def _lees_index(cache_map):
+    index_pad = cache_map / INDEX_BESTAND
+    if not index_pad.exists():
+        return {}
+    try:
+        with open(index_pad, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        # Een beschadigde index is geen ramp: de cache wordt dan opnieuw opgebouwd
+        return {}
+
+
+def _schrijf_index(cache_map, index):
+    cache_map.mkdir(parents=True, exist_ok=True)
+    tijdelijk_pad = cache_map / f"{INDEX_BESTAND}.{os.getpid()}.tmp"
+    with open(tijdelijk_pad, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tijdelijk_pad, cache_map / INDEX_BESTAND)
+
+
+@contextmanager
+def _index_slot(cache_map):
+    """
+    Slot op de index over threads én processen heen (meerdere teams of de watch-modus kunnen
+    tegelijk CBS-tabellen ophalen), zodat een lees-wijzig-schrijfronde van de index niet door
+    een ander proces wordt overschreven. Het slot is herbruikbaar binnen dezelfde thread.
+    Zonder `fcntl` (Windows) geldt alleen het slot tussen threads.
+    """
+    with _INDEX_SLOT:
+        diepte = getattr(_INDEX_DIEPTE, "waarde", 0)
+        if fcntl is None or diepte:
+            _INDEX_DIEPTE.waarde = diepte + 1
+            try:
+                yield
+            finally:
+                _INDEX_DIEPTE.waarde = diepte
+            return
+        cache_map.mkdir(parents=True, exist_ok=True)
+        with open(cache_map / f"{INDEX_BESTAND}.lock", "w") as slot:
+            fcntl.flock(slot, fcntl.LOCK_EX)
+            _INDEX_DIEPTE.waarde = 1
+            try:
+                yield
+            finally:
+                _INDEX_DIEPTE.waarde = 0
+                fcntl.flock(slot, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _download_slot(cache_map, query_sleutel):
+    """
+    Slot per tabel/query over processen heen: als meerdere stappen (of teams) tegelijk
+    dezelfde tabel nodig hebben, downloadt er één en lezen de anderen daarna de cache.
+    Zonder `fcntl` (Windows) wordt er niet gewacht.
+    """
+    if fcntl is None:
+        yield
+        return
+    cache_map.mkdir(parents=True, exist_ok=True)
+    with open(cache_map / f"{query_sleutel}.lock", "w") as slot:
+        fcntl.flock(slot, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(slot, fcntl.LOCK_UN)
+
+
+def maak_query_sleutel(table_code, **query):
+    """
+    Maakt een stabiele sleutel voor een tabel en de bijbehorende query-parameters.
+    Dezelfde tabel met andere filters of kolommen krijgt zo een eigen cache-item.
+    """
+    query_tekst = json.dumps(query, sort_keys=True, default=str)
+    query_hash = hashlib.sha256(query_tekst.encode("utf-8")).hexdigest()[:12]
+    return f"{table_code}__{query_hash}"
+
+
+def haal_tabel_wijzigingsdatum(table_code, ttl=STANDAARD_TTL, offline=None, cache_map=None):
+    """
+    Haalt de wijzigingsdatum ('Modified') van een CBS-tabel op uit de TableInfos-metadata.
+
+    Het resultaat wordt in de cache-index bewaard en gedurende `ttl` seconden hergebruikt,
+    zodat een herhaalde run geen netwerkverzoek hoeft te doen.
+
+    Parameters:
+    -----------
+    table_code (str): De tabelcode van de CBS-dataset (bijv. '37230NED').
+    ttl (int, optional): Aantal seconden dat een eerder opgehaalde wijzigingsdatum geldig blijft.
+    offline (bool, optional): Gebruik uitsluitend de cache indien `True`.
+    cache_map (str of Path, optional): Map van de cache. Standaard `CACHE_MAP`.
+
+    Returns:
+    --------
+    str of None: De wijzigingsdatum van de tabel, of None als deze (offline) onbekend is.
+    """
+    cache_map = Path(cache_map) if cache_map else CACHE_MAP
+    index = _lees_index(cache_map)
+    tabel_info = index.get("tabellen", {}).get(table_code, {})
+
+    verlopen = time.time() - tabel_info.get("gecontroleerd_op", 0) > ttl
+    if _offline_modus(offline) or (tabel_info and not verlopen):
+        return tabel_info.get("gewijzigd")
+
+    info = cbsodata.get_info(table_code) or {}
+    gewijzigd = info.get("Modified")
+
+    with _index_slot(cache_map):
+        index = _lees_index(cache_map)
+        index.setdefault("tabellen", {})[table_code] = {
+            "gewijzigd": gewijzigd,
+            "gecontroleerd_op": time.time(),
+        }
+        _schrijf_index(cache_map, index)
+    return gewijzigd
+
+
+def _cache_pad(cache_map, query_sleutel, gewijzigd):
+    # Maak de wijzigingsdatum bruikbaar als bestandsnaam
+    versie = "".join(c if c.isalnum() else "-" for c in str(gewijzigd))
+    return cache_map / f"{query_sleutel}__{versie}.parquet"
+
+
+def _ruim_cache_op(cache_map, index, max_versies=MAX_VERSIES_PER_QUERY, max_grootte_mb=MAX_CACHE_GROOTTE_MB):
+    """
+    Verwijdert oude versies per query en, indien de cache te groot wordt,
+    de minst recent gebruikte bestanden.
+    """
+    items = index.setdefault("items", {})
+
+    # Stap 1: Beperk het aantal versies per query (oudste versies eerst weg)
+    per_query = {}
+    for bestandsnaam, item in items.items():
+        per_query.setdefault(item["query_sleutel"], []).append(bestandsnaam)
+    for bestandsnamen in per_query.values():
+        bestandsnamen.sort(key=lambda naam: items[naam]["opgeslagen_op"], reverse=True)
+        for bestandsnaam in bestandsnamen[max_versies:]:
+            (cache_map / bestandsnaam).unlink(missing_ok=True)
+            del items[bestandsnaam]
+
+    # Stap 2: Houd de totale grootte onder de limiet (least recently used eerst weg)
+    totale_grootte = sum(item["grootte"] for item in items.values())
+    for bestandsnaam in sorted(items, key=lambda naam: items[naam]["gebruikt_op"]):
+        if totale_grootte <= max_grootte_mb * 1024 * 1024:
+            break
+        totale_grootte -= items[bestandsnaam]["grootte"]
+        (cache_map / bestandsnaam).unlink(missing_ok=True)
+        del items[bestandsnaam]
+
+
+def haal_op_met_cache(
+    table_code,
+    download_functie,
+    query=None,
+    ttl=STANDAARD_TTL,
+    offline=None,
+    cache_map=None,
+    max_versies=MAX_VERSIES_PER_QUERY,
+    max_grootte_mb=MAX_CACHE_GROOTTE_MB,
+):
+    """
+    Haalt een CBS-tabel op uit de lokale cache, of downloadt en bewaart deze indien nodig.
+
+    Cache-items worden opgeslagen als Parquet-bestand en zijn gesleuteld op tabelcode,
+    query-parameters en de wijzigingsdatum van de tabel. Verschijnt er bij het CBS
+    een nieuwe versie van de tabel, dan wordt deze automatisch opnieuw gedownload.
+
+    Parameters:
+    -----------
+    table_code (str): De tabelcode van de CBS-dataset (bijv. '37230NED').
+    download_functie (callable): Functie zonder argumenten die de tabel als DataFrame downloadt.
+    query (dict, optional): Query-parameters (filters, kolommen) die onderdeel zijn van de sleutel.
+    ttl (int, optional): Aantal seconden dat de wijzigingsdatum van de tabel niet opnieuw wordt gecontroleerd.
+    offline (bool, optional): Gebruik uitsluitend de cache indien `True` (of via 'CBS_OFFLINE=1').
+    cache_map (str of Path, optional): Map van de cache. Standaard `CACHE_MAP`.
+    max_versies (int, optional): Aantal versies dat per tabel/query bewaard blijft.
+    max_grootte_mb (int, optional): Maximale totale grootte van de cache in megabytes.
+
+    Returns:
+    --------
+    pd.DataFrame: De (gecachte) dataset.
+
+    Raises:
+    -------
+    FileNotFoundError: Als in offline-modus geen gecachte versie beschikbaar is.
+    """
+    cache_map = Path(cache_map) if cache_map else CACHE_MAP
+    offline = _offline_modus(offline)
+    query_sleutel = maak_query_sleutel(table_code, **(query or {}))
+
+    gewijzigd = haal_tabel_wijzigingsdatum(table_code, ttl=ttl, offline=offline, cache_map=cache_map)
+
+    with _index_slot(cache_map):
+        index = _lees_index(cache_map)
+        items = index.setdefault("items", {})
+
+        if offline:
+            # Gebruik de meest recent opgeslagen versie van deze query
+            kandidaten = [naam for naam, item in items.items() if item["query_sleutel"] == query_sleutel]
+            kandidaten = [naam for naam in kandidaten if (cache_map / naam).exists()]
+            if not kandidaten:
+                raise FileNotFoundError(
+                    f"Offline-modus: geen gecachte versie van tabel '{table_code}' gevonden in {cache_map}."
+                )
+            bestandsnaam = max(kandidaten, key=lambda naam: items[naam]["opgeslagen_op"])
+        else:
+            bestandsnaam = _cache_pad(cache_map, query_sleutel, gewijzigd).name
+
+        pad = cache_map / bestandsnaam
+        if bestandsnaam in items and pad.exists():
+            items[bestandsnaam]["gebruikt_op"] = time.time()
+            _schrijf_index(cache_map, index)
+            in_cache = True
+        else:
+            in_cache = False
+
+    if in_cache:
+        data = pd.read_parquet(pad)
+        print(f"Dataset met tabelcode '{table_code}' geladen uit de cache ({pad.name}).")
+        return data
+
+    # Niet in de cache: download en sla op (buiten het index-slot, zodat verschillende
+    # tabellen parallel gedownload kunnen worden; dezelfde tabel maar één keer tegelijk)
+    with _download_slot(cache_map, query_sleutel):
+        # Een ander proces kan de tabel intussen hebben opgehaald
+        with _index_slot(cache_map):
+            in_cache = bestandsnaam in _lees_index(cache_map).get("items", {}) and pad.exists()
+        if in_cache:
+            data = pd.read_parquet(pad)
+            print(f"Dataset met tabelcode '{table_code}' geladen uit de cache ({pad.name}).")
+            return data
+
+        data = download_functie()
+        cache_map.mkdir(parents=True, exist_ok=True)
+        data.to_parquet(pad, index=False)
+
+        with _index_slot(cache_map):
+            index = _lees_index(cache_map)
+            nu = time.time()
+            index.setdefault("items", {})[bestandsnaam] = {
+                "table_code": table_code,
+                "query_sleutel": query_sleutel,
+                "gewijzigd": gewijzigd,
+                "grootte": pad.stat().st_size,
+                "opgeslagen_op": nu,
+                "gebruikt_op": nu,
+            }
+            _ruim_cache_op(cache_map, index, max_versies=max_versies, max_grootte_mb=max_grootte_mb)
+            _schrijf_index(cache_map, index)
+    print(f"Dataset met tabelcode '{table_code}' opgeslagen in de cache ({pad.name}).")
+    return data
+
+
+def leeg_cbs_cache(table_code=None, cache_map=None):
+    """
+    Verwijdert gecachte CBS-tabellen: alle tabellen, of alleen die met de opgegeven tabelcode.
+    """
+    cache_map = Path(cache_map) if cache_map else CACHE_MAP
+    with _index_slot(cache_map):
+        index = _lees_index(cache_map)
+        items = index.get("items", {})
+
+        for bestandsnaam in list(items):
+            if table_code is None or items[bestandsnaam]["table_code"] == table_code:
+                (cache_map / bestandsnaam).unlink(missing_ok=True)
+                del items[bestandsnaam]
+
+        if table_code is None:
+            index.pop("tabellen", None)
+        else:
+            index.get("tabellen", {}).pop(table_code, None)
+        _schrijf_index(cache_map, index)
@@ -0,0 +1,93 @@
+"""
+Benchmark van de buurtcode-verwerking voor de Leefbaarometer.
+
+Vergelijkt de oorspronkelijke, rijgewijze keten (correctie per rij met een lambda,
+filter met een lijst, aparte merge voor COROP) met de gevectoriseerde stap
+`corrigeer_filter_en_map_buurten`. Gebruik vanuit de root van de repository:
+
+    python benchmarks/bench_buurtcodes.py --rijen 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT_MAP = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_MAP)
+sys.path.append(os.path.join(ROOT_MAP, "teams", "Leefbare_steden_en_dorpen", "transformaties"))
+
+from helpers import corrigeer_filter_en_map_buurten  # noqa: E402
+from pipeline_scripts.geo_referentie import laad_geo_referentie  # noqa: E402
+
+
+def oorspronkelijke_keten(df, bu_code_kolom, geo_referentie):
+    """De rijgewijze keten zoals die vóór de vectorisatie in helpers.py stond."""
+    correctie_dict = geo_referentie.correcties
+    df[bu_code_kolom] = df[bu_code_kolom].apply(lambda x: correctie_dict.get(x.upper(), x.upper()))
+
+    bu_codes_limburg = geo_referentie.buurten['BU_CODE'].tolist()
+    df = df[df[bu_code_kolom].isin(bu_codes_limburg)].reset_index(drop=True)
+
+    mapping_dict = dict(zip(geo_referentie.buurten['BU_CODE'], geo_referentie.buurten['COROP_NAAM']))
+    df['COROP_NAAM'] = df[bu_code_kolom].map(mapping_dict)
+    return df
+
+
+def maak_synthetische_buurten(n_rijen, geo_referentie, seed=0):
+    """
+    Maakt een DataFrame dat lijkt op het landelijke Leefbaarometer-buurtbestand:
+    Limburgse en niet-Limburgse buurtcodes, deels in kleine letters en deels verouderd.
+    """
+    rng = np.random.default_rng(seed)
+    limburgse_codes = list(geo_referentie.bu_codes)
+    verouderde_codes = list(geo_referentie.correcties)
+    overige_codes = [f"BU{i:08d}" for i in range(14000)]
+    alle_codes = np.array(limburgse_codes + verouderde_codes + overige_codes, dtype=object)
+
+    bu_codes = alle_codes[rng.integers(0, len(alle_codes), n_rijen)]
+    kleine_letters = rng.random(n_rijen) < 0.3
+    bu_codes[kleine_letters] = [code.lower() for code in bu_codes[kleine_letters]]
+
+    return pd.DataFrame({
+        "bu_code": bu_codes,
+        "jaar": rng.choice([2014, 2018, 2020, 2022, 2024], n_rijen),
+        "lbm": rng.normal(4, 0.2, n_rijen),
+    })
+
+
+def meet(functie, *args, herhalingen=3):
+    """Geeft de snelste looptijd (in seconden) over een aantal herhalingen terug, plus het resultaat."""
+    tijden, resultaat = [], None
+    for _ in range(herhalingen):
+        invoer = [arg.copy() if isinstance(arg, pd.DataFrame) else arg for arg in args]
+        start = time.perf_counter()
+        resultaat = functie(*invoer)
+        tijden.append(time.perf_counter() - start)
+    return min(tijden), resultaat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rijen", type=int, default=500_000, help="Aantal rijen in het synthetische buurtbestand")
+    parser.add_argument("--herhalingen", type=int, default=3)
+    args = parser.parse_args()
+
+    geo_referentie = laad_geo_referentie()
+    df = maak_synthetische_buurten(args.rijen, geo_referentie)
+
+    tijd_oud, resultaat_oud = meet(oorspronkelijke_keten, df, "bu_code", geo_referentie, herhalingen=args.herhalingen)
+    tijd_nieuw, resultaat_nieuw = meet(corrigeer_filter_en_map_buurten, df, "bu_code", geo_referentie, herhalingen=args.herhalingen)
+
+    pd.testing.assert_frame_equal(resultaat_oud, resultaat_nieuw, check_dtype=False)
+
+    print(f"Rijen: {args.rijen:,} ({len(resultaat_nieuw):,} Limburgse rijen)")
+    print(f"Oorspronkelijke keten:            {tijd_oud:8.3f} s")
+    print(f"corrigeer_filter_en_map_buurten:  {tijd_nieuw:8.3f} s")
+    print(f"Versnelling:                      {tijd_oud / tijd_nieuw:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
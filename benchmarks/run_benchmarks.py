@@ -0,0 +1,263 @@
+"""
+Benchmarksuite voor de transformaties van Leefbare steden en dorpen.
+
+Meet de looptijd van `transformeer_leefbarometer_data`, `transformeer_planrealisaties`,
+`laad_data_invoerapplicatie`, `transformeer_cbs_data` en `corrigeer_bu_codes` op
+synthetische invoer van 1x, 10x en 100x de omvang van de echte bronnen. De resultaten
+worden bewaard in '.cache/benchmarks/resultaten/<commit>.json' (buiten git) en vergeleken
+met de vorige run, zodat regressies tussen commits zichtbaar worden. Gebruik vanuit de root van de repository:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --schalen 1 10 --alleen leefbaarometer cbs
+    python benchmarks/run_benchmarks.py --vergelijk-met 1c5f1b9
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+ROOT_MAP = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TEAM_MAP = os.path.join(ROOT_MAP, "teams", "Leefbare_steden_en_dorpen", "transformaties")
+sys.path.append(ROOT_MAP)
+sys.path.append(TEAM_MAP)
+
+# Meet het inlezen zelf, niet de cache van ingelezen bronbestanden
+os.environ.setdefault("BESTAND_CACHE", "0")
+
+import synthetisch  # noqa: E402
+from helpers import corrigeer_bu_codes  # noqa: E402
+from pipeline_scripts.geo_referentie import STANDAARD_PAD_BUURTCODES, STANDAARD_PAD_CORRECTIES, laad_geo_referentie  # noqa: E402
+from preprocessing import (  # noqa: E402
+    REGIO_OPPERVLAKTE_TERUGVAL,
+    laad_data_invoerapplicatie,
+    transformeer_cbs_data,
+    transformeer_leefbarometer_data,
+    transformeer_planrealisaties,
+)
+
+# Resultaten per commit; in de (genegeerde) cache, zodat een benchmarkrun de repository niet wijzigt
+RESULTATEN_MAP = os.environ.get(
+    "BENCHMARK_RESULTATEN_MAP", os.path.join(ROOT_MAP, ".cache", "benchmarks", "resultaten")
+)
+
+REGIO_MAPPING = {
+    "Nederland": "nl00",
+    "Noord-Limburg": "cr37",
+    "Midden-Limburg": "cr38",
+    "Zuid-Limburg": "cr39",
+}
+
+
+def _bench_leefbaarometer(schaal, geo_referentie):
+    pad = synthetisch.maak_leefbaarometer_csv(schaal, geo_referentie)
+    invoer = dict(
+        input_bestand_pad=pad,
+        limburg_buurten_pad=str(STANDAARD_PAD_BUURTCODES),
+        bu_code_correcties_pad=str(STANDAARD_PAD_CORRECTIES),
+        relevante_jaren=[2014, 2018, 2020, 2022, 2024],
+        column_renames={"lbm": "MO_10a", "fys": "D_39a", "vrz": "D_39aa", "COROP_NAAM": "geoitem", "jaar": "period"},
+        regio_mapping=REGIO_MAPPING,
+    )
+    controleer_leefbaarometer_geoniveaus(invoer)
+    return synthetisch.LEEFBAROMETER_RIJEN * schaal, lambda: transformeer_leefbarometer_data(**invoer)
+
+
+def controleer_leefbaarometer_geoniveaus(invoer):
+    """
+    Controleert dat de aggregatie via `geoniveaus` op COROP-niveau dezelfde uitvoer geeft
+    als het standaardpad (ongewogen, dus het gemiddelde over alle Limburgse buurtrijen).
+    Over alle jaren van de synthetische data: daarin komen de Limburgse buurten niet in elk jaar voor.
+    """
+    invoer = {**invoer, "relevante_jaren": synthetisch.LEEFBAROMETER_JAREN}
+    with contextlib.redirect_stdout(io.StringIO()):
+        standaard = transformeer_leefbarometer_data(**invoer)
+        via_geoniveaus = transformeer_leefbarometer_data(**invoer, geoniveaus=["corop"])
+    if standaard.empty:
+        raise AssertionError("Geen Limburgse COROP-waarden om de aggregatie via geoniveaus mee te vergelijken")
+
+    def normaliseer(df):
+        df = df[["geoitem", "geolevel", "period", "MO_10a", "D_39a", "D_39aa"]].astype(
+            {"geoitem": str, "geolevel": str, "period": "int64"}
+        )
+        return df.sort_values(["geoitem", "period"]).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(normaliseer(standaard), normaliseer(via_geoniveaus))
+
+
+def _bench_planrealisaties(schaal, geo_referentie):
+    bron_bestanden = synthetisch.maak_planrealisaties_bestanden(schaal)
+    return (
+        synthetisch.JUNO_RIJEN * schaal,
+        lambda: transformeer_planrealisaties(bron_bestanden=bron_bestanden, regio_mapping=REGIO_MAPPING),
+    )
+
+
+def _bench_invoerapplicatie(schaal, geo_referentie):
+    bron_bestanden = synthetisch.maak_invoerapplicatie_bestanden(schaal)
+    return len(bron_bestanden), lambda: laad_data_invoerapplicatie(bron_bestanden)
+
+
+def _bench_cbs(schaal, geo_referentie):
+    df = synthetisch.maak_cbs_37230ned(schaal)
+    # Vaste oppervlaktes, zodat de benchmark niet van het CBS afhangt
+    oppervlakte = pd.Series(REGIO_OPPERVLAKTE_TERUGVAL)
+    return len(df), lambda: transformeer_cbs_data(df.copy(), geolevel="corop_id", hele_jaren=True, oppervlakte=oppervlakte)
+
+
+def _bench_bu_codes(schaal, geo_referentie):
+    df = synthetisch.maak_buurten_df(schaal, geo_referentie)
+    return len(df), lambda: corrigeer_bu_codes(df.copy(), "bu_code", geo_referentie=geo_referentie)
+
+
+# Naam van de benchmark -> (gemeten functie, opbouw van de invoer)
+BENCHMARKS = {
+    "leefbaarometer": ("transformeer_leefbarometer_data", _bench_leefbaarometer),
+    "planrealisaties": ("transformeer_planrealisaties", _bench_planrealisaties),
+    "invoerapplicatie": ("laad_data_invoerapplicatie", _bench_invoerapplicatie),
+    "cbs": ("transformeer_cbs_data", _bench_cbs),
+    "bu_codes": ("corrigeer_bu_codes", _bench_bu_codes),
+}
+
+
+def meet(functie, herhalingen):
+    """Voert de functie een aantal keer uit (zonder uitvoer op het scherm) en geeft de looptijden terug."""
+    tijden = []
+    for _ in range(herhalingen):
+        with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            start = time.perf_counter()
+            functie()
+            tijden.append(time.perf_counter() - start)
+    return tijden
+
+
+def huidige_commit():
+    """Korte hash van de huidige commit, met '-dirty' als er niet-gecommitte wijzigingen zijn."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_MAP, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        gewijzigd = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_MAP, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "onbekend"
+    return f"{commit}-dirty" if gewijzigd else commit
+
+
+def laad_vorige_resultaten(commit, vergelijk_met=None):
+    """
+    Laadt de resultaten waarmee vergeleken wordt: van de opgegeven commit, of anders
+    de meest recente run van een andere commit.
+    """
+    if vergelijk_met:
+        pad = os.path.join(RESULTATEN_MAP, f"{vergelijk_met}.json")
+        if not os.path.exists(pad):
+            raise FileNotFoundError(f"Geen benchmarkresultaten gevonden voor commit '{vergelijk_met}': {pad}")
+        with open(pad, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    runs = []
+    for pad in glob.glob(os.path.join(RESULTATEN_MAP, "*.json")):
+        with open(pad, "r", encoding="utf-8") as f:
+            run = json.load(f)
+        if run["commit"] != commit:
+            runs.append(run)
+    return max(runs, key=lambda run: run["datum"]) if runs else None
+
+
+def vergelijk(resultaten, vorige, drempel):
+    """Print per benchmark en schaal de looptijd t.o.v. de vorige run en markeer regressies."""
+    vorige_tijden = {(r["benchmark"], r["schaal"]): r["min_s"] for r in vorige["resultaten"]}
+    regels = []
+    for r in resultaten:
+        vorige_tijd = vorige_tijden.get((r["benchmark"], r["schaal"]))
+        verhouding = r["min_s"] / vorige_tijd if vorige_tijd else None
+        if verhouding is None:
+            oordeel = "nieuw"
+        elif verhouding > 1 + drempel:
+            oordeel = "REGRESSIE"
+        elif verhouding < 1 / (1 + drempel):
+            oordeel = "sneller"
+        else:
+            oordeel = ""
+        regels.append({
+            "benchmark": r["benchmark"],
+            "schaal": f"{r['schaal']}x",
+            f"vorige ({vorige['commit']})": vorige_tijd,
+            "huidig": r["min_s"],
+            "verhouding": verhouding,
+            "": oordeel,
+        })
+
+    print(f"\nVergelijking met {vorige['commit']} ({vorige['datum']}):")
+    with pd.option_context("display.float_format", "{:.3f}".format, "display.width", 200):
+        print(pd.DataFrame(regels).to_string(index=False))
+    return [regel for regel in regels if regel[""] == "REGRESSIE"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schalen", type=int, nargs="+", default=[1, 10, 100], help="Schaalfactoren t.o.v. de echte bronnen")
+    parser.add_argument("--alleen", nargs="+", choices=list(BENCHMARKS), help="Voer alleen deze benchmarks uit")
+    parser.add_argument("--herhalingen", type=int, default=3)
+    parser.add_argument("--vergelijk-met", help="Commit waarmee vergeleken wordt (standaard: de vorige run)")
+    parser.add_argument("--drempel", type=float, default=0.2, help="Relatieve vertraging die als regressie telt")
+    parser.add_argument("--niet-opslaan", action="store_true", help="Bewaar de resultaten van deze run niet")
+    args = parser.parse_args()
+
+    geo_referentie = laad_geo_referentie()
+    commit = huidige_commit()
+
+    resultaten = []
+    for naam in args.alleen or list(BENCHMARKS):
+        functie_naam, opbouw = BENCHMARKS[naam]
+        for schaal in args.schalen:
+            rijen, functie = opbouw(schaal, geo_referentie)
+            tijden = meet(functie, args.herhalingen)
+            resultaten.append({
+                "benchmark": naam,
+                "functie": functie_naam,
+                "schaal": schaal,
+                "invoer": rijen,
+                "min_s": round(min(tijden), 4),
+                "mediaan_s": round(statistics.median(tijden), 4),
+            })
+            print(f"{naam:<18} {schaal:>4}x  {rijen:>12,} invoer  {min(tijden):9.3f} s (min)  {statistics.median(tijden):9.3f} s (mediaan)")
+
+    run = {
+        "commit": commit,
+        "datum": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.node(),
+        "herhalingen": args.herhalingen,
+        "resultaten": resultaten,
+    }
+
+    vorige = laad_vorige_resultaten(commit, args.vergelijk_met)
+    regressies = vergelijk(resultaten, vorige, args.drempel) if vorige else []
+
+    if not args.niet_opslaan:
+        os.makedirs(RESULTATEN_MAP, exist_ok=True)
+        pad = os.path.join(RESULTATEN_MAP, f"{commit}.json")
+        with open(pad, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nResultaten opgeslagen in: {pad}")
+
+    if regressies:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
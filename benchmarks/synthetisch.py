@@ -0,0 +1,186 @@
+"""
+Synthetische invoerbestanden voor de benchmarks, in de vorm van de echte bronnen.
+
+Schaal 1 komt ongeveer overeen met de omvang van de echte bestanden; schaal 10 en 100
+vermenigvuldigen het aantal rijen (of bestanden). Gegenereerde bestanden worden bewaard
+in '.cache/benchmarks/' en bij een volgende run hergebruikt.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+ROOT_MAP = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATA_MAP = os.path.join(ROOT_MAP, ".cache", "benchmarks")
+
+# Omvang van de echte bronnen (bij schaal 1)
+LEEFBAROMETER_RIJEN = 140_000       # ca. 14.000 buurten x 10 meetjaren, heel Nederland
+LEEFBAROMETER_JAREN = [2002, 2008, 2012, 2014, 2016, 2018, 2020, 2022, 2024]
+JUNO_RIJEN = 2_000                  # projectregels planrealisaties per jaar, Limburg
+ETIL_JAREN = list(range(2004, 2024))
+INVOERAPPLICATIE_BESTANDEN = 3      # halfjaarlijkse uitvragen
+CBS_JAREN = list(range(1995, 2025))
+
+COROP_NAMEN = ["Noord-Limburg", "Midden-Limburg", "Zuid-Limburg"]
+COROP_CODES = ["cr37", "cr38", "cr39"]
+
+BETAALBARE_PRIJSKLASSEN = [
+    'Goedkope sociale huur', 'Betaalbare sociale huur', 'Dure sociale huur', 'Middeldure huur',
+    'Betaalbaar laag koop', 'Betaalbaar midden koop', 'Betaalbaar hoog koop'
+]
+OVERIGE_PRIJSKLASSEN = ['Dure huur', 'Dure koop', 'Onbekend']
+
+MAANDEN = [
+    "januari", "februari", "maart", "april", "mei", "juni",
+    "juli", "augustus", "september", "oktober", "november", "december"
+]
+
+
+def _doelmap(naam, schaal):
+    doelmap = os.path.join(DATA_MAP, f"{naam}_x{schaal}")
+    os.makedirs(doelmap, exist_ok=True)
+    return doelmap
+
+
+def maak_buurtcodes(n_rijen, geo_referentie, seed=0):
+    """
+    Trekt buurtcodes zoals in het landelijke buurtbestand: Limburgse, verouderde (te corrigeren)
+    en niet-Limburgse codes, deels in kleine letters.
+    """
+    rng = np.random.default_rng(seed)
+    limburgse_codes = list(geo_referentie.bu_codes)
+    verouderde_codes = list(geo_referentie.correcties)
+    overige_codes = [f"BU{i:08d}" for i in range(14000)]
+    alle_codes = np.array(limburgse_codes + verouderde_codes + overige_codes, dtype=object)
+
+    bu_codes = alle_codes[rng.integers(0, len(alle_codes), n_rijen)]
+    kleine_letters = rng.random(n_rijen) < 0.3
+    bu_codes[kleine_letters] = [code.lower() for code in bu_codes[kleine_letters]]
+    return bu_codes
+
+
+def maak_buurten_df(schaal, geo_referentie, seed=0):
+    """DataFrame met buurtcodes, voor `corrigeer_bu_codes`."""
+    n_rijen = LEEFBAROMETER_RIJEN * schaal
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "bu_code": maak_buurtcodes(n_rijen, geo_referentie, seed),
+        "jaar": rng.choice(LEEFBAROMETER_JAREN, n_rijen),
+        "lbm": rng.normal(4, 0.2, n_rijen),
+    })
+
+
+def maak_leefbaarometer_csv(schaal, geo_referentie, seed=0):
+    """Landelijk Leefbaarometer-buurtbestand (CSV) met alle scorekolommen."""
+    pad = os.path.join(_doelmap("leefbaarometer", schaal), "Leefbaarometer-scores buurten.csv")
+    if os.path.exists(pad):
+        return pad
+
+    n_rijen = LEEFBAROMETER_RIJEN * schaal
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "bu_code": maak_buurtcodes(n_rijen, geo_referentie, seed),
+        "jaar": rng.choice(LEEFBAROMETER_JAREN, n_rijen),
+        "lbm": rng.normal(4, 0.2, n_rijen),
+        "fys": rng.normal(0, 0.1, n_rijen),
+        "onv": rng.normal(0, 0.1, n_rijen),
+        "soc": rng.normal(0, 0.1, n_rijen),
+        "vrz": rng.normal(0, 0.1, n_rijen),
+        "won": rng.normal(0, 0.1, n_rijen),
+    })
+    df.loc[rng.random(n_rijen) < 0.05, "lbm"] = np.nan
+    df.to_csv(pad, index=False)
+    return pad
+
+
+def maak_planrealisaties_bestanden(schaal, seed=0):
+    """
+    Planrealisaties: een ETIL-bestand (lang formaat, 2004-2023) en een JUNO-bestand
+    met projectregels voor 2024. Geeft de paden terug in de volgorde ETIL, JUNO.
+    """
+    doelmap = _doelmap("planrealisaties", schaal)
+    etil_pad = os.path.join(doelmap, "Planrealisaties 2004-2023 (ETIL).xlsx")
+    juno_pad = os.path.join(doelmap, "Planrealisaties 2024 (JUNO).xlsx")
+    rng = np.random.default_rng(seed)
+
+    if not os.path.exists(etil_pad):
+        geoitems = COROP_CODES + [f"gm{i:04d}" for i in range(3 * (schaal - 1))]
+        index = pd.MultiIndex.from_product(
+            [geoitems, ETIL_JAREN, ["d_40a", "d_40b", "d_41a"]],
+            names=["geoitemcode", "periodcode", "variablecode"]
+        )
+        etil = index.to_frame(index=False)
+        etil.insert(0, "geolevelcode", "corop_code")
+        etil["value"] = rng.integers(100, 2000, len(etil))
+        etil.to_excel(etil_pad, index=False)
+
+    if not os.path.exists(juno_pad):
+        n_rijen = JUNO_RIJEN * schaal
+        prijsklassen = BETAALBARE_PRIJSKLASSEN + OVERIGE_PRIJSKLASSEN
+        juno = pd.DataFrame({
+            "Gemeente": rng.choice([f"Gemeente {i}" for i in range(31)], n_rijen),
+            "COROP": rng.choice(COROP_NAMEN, n_rijen),
+            "Soort": rng.choice(["Nieuwbouw", "Transformatie", "Sloop"], n_rijen),
+            "Aantal toevoegingen": rng.integers(0, 50, n_rijen),
+            "Aantal onttrekkingen": rng.integers(0, 5, n_rijen),
+            "Huur/Koop": rng.choice(["Huur", "Koop"], n_rijen),
+            "Prijsklasse": rng.choice(prijsklassen, n_rijen),
+            "Woningtype": rng.choice(["Eengezinswoning", "Meergezinswoning"], n_rijen),
+            "In-/uitbreidingslocatie": rng.choice(["Inbreiding", "Uitbreiding"], n_rijen),
+        })
+        juno.to_excel(juno_pad, index=False)
+
+    return [etil_pad, juno_pad]
+
+
+def maak_invoerapplicatie_bestanden(schaal, seed=0):
+    """
+    Halfjaarlijkse Invoerapplicatie-bestanden, afwisselend Excel (met datums) en
+    CSV (';'-gescheiden, datums als 'd-m-jjjj'). Het aantal bestanden schaalt mee.
+    """
+    doelmap = _doelmap("invoerapplicatie", schaal)
+    rng = np.random.default_rng(seed)
+    indicatoren = ["R_118a", "R_119a", "R_120a", "R_121a", "R_122a", "R_124a"]
+
+    paden = []
+    for i in range(INVOERAPPLICATIE_BESTANDEN * schaal):
+        jaar, seizoen = 2025 + i // 2, ["Voorjaar", "Najaar"][i % 2]
+        extensie = "csv" if i % 3 == 1 else "xlsx"
+        pad = os.path.join(doelmap, f"Invoerapplicatie Leefbare steden en dorpen - {seizoen} {jaar}.{extensie}")
+        paden.append(pad)
+        if os.path.exists(pad):
+            continue
+
+        maand = 2 if seizoen == "Voorjaar" else 9
+        invoerdatum = pd.Timestamp(jaar, maand, 1) + pd.to_timedelta(rng.integers(0, 28, len(indicatoren)), unit="D")
+        peildatum = pd.Series(pd.Timestamp(jaar, maand, 1) - pd.Timedelta(days=1), index=range(len(indicatoren)))
+        peildatum[rng.random(len(indicatoren)) < 0.7] = pd.NaT
+        df = pd.DataFrame({
+            "Indicator_nr": indicatoren,
+            "Invoerveld": rng.integers(0, 100, len(indicatoren)).astype(str),
+            "Eenheid": "verleende subsidies",
+            "Toelichting van de gegevens": "Synthetische toelichting voor de benchmark.",
+            "Bron": "Benchmark",
+            "Datum van invoer": invoerdatum,
+            "Peildatum (indien afwijkend van datum van invoer)": peildatum,
+            "Itemtype": "Item",
+        })
+        if extensie == "csv":
+            for kolom in ["Datum van invoer", "Peildatum (indien afwijkend van datum van invoer)"]:
+                df[kolom] = df[kolom].apply(lambda x: f"{x.day}-{x.month}-{x.year}" if pd.notna(x) else "")
+            df.to_csv(pad, sep=";", index=False, encoding="utf-8-sig")
+        else:
+            df.to_excel(pad, index=False)
+    return paden
+
+
+def maak_cbs_37230ned(schaal):
+    """
+    Antwoord van `download_cbs_data` voor 37230NED (Nederland en de Limburgse COROP-regio's,
+    met regiocodes): jaartotalen en maanden. Bij een hogere schaal wordt de reeks herhaald.
+    """
+    perioden = [str(jaar) for jaar in CBS_JAREN] + [f"{jaar} {maand}" for jaar in CBS_JAREN for maand in MAANDEN]
+    index = pd.MultiIndex.from_product([["nl00"] + COROP_CODES, perioden], names=["RegioS", "Perioden"])
+    df = index.to_frame(index=False)
+    df["BevolkingAanHetEindeVanDePeriode_15"] = np.where(df["RegioS"] == "nl00", 17_900_000, 270_000)
+    return pd.concat([df] * schaal, ignore_index=True)
@@ -0,0 +1,170 @@
+"""
+Aggregatie van buurtdata naar alle geografische niveaus van het dataportaal.
+
+Met één aanroep worden buurtwaarden samengevat per wijk, gemeente, COROP-gebied,
+provincie en Nederland, bijv.:
+
+    from pipeline_scripts.aggregatie import aggregeer_geoniveaus
+
+    df = aggregeer_geoniveaus(
+        df_buurt, ["lbm", "fys"], groep_kolommen=["jaar"], gewicht_kolom="inwoners"
+    )
+
+Over de rijen wordt één keer gegroepeerd, op het laagste gevraagde niveau. Daar worden
+per groep de deelsommen bewaard (som van gewicht x waarde en som van de gewichten);
+de hogere niveaus worden uit die kleine tabel opgeteld via de hiërarchie in de
+BU_WK_GM-referentie. Een gewogen gemiddelde is daardoor op elk niveau exact het
+gemiddelde over de onderliggende buurtrijen, niet een gemiddelde van gemiddelden.
+"""
+import pandas as pd
+
+from pipeline_scripts.geo_referentie import GEO_HIERARCHIE, laad_geo_referentie
+from pipeline_scripts.schema import pas_indicator_schema_toe
+
+# Geolevel van het dataportaal per niveau, van laag naar hoog
+GEOLEVEL_PER_NIVEAU = {
+    "buurt": "buurt_id",
+    "wijk": "wijk_id",
+    "gemeente": "gemeente_id",
+    "corop": "corop_id",
+    "provincie": "prov_id",
+    "nederland": "nederland",
+}
+
+# Regiocode van Nederland
+CODE_NEDERLAND = "nl00"
+
+# Groep voor buurten die niet in de referentie staan; die tellen alleen mee voor Nederland
+BUITEN_REFERENTIE = "_BUITEN_REFERENTIE"
+
+METHODEN = ("gemiddelde", "som")
+
+
+def _niveau_codes(geo_referentie, van_niveau, naar_niveau):
+    """Mapping van de codes van `van_niveau` naar die van het (hogere) `naar_niveau`, in hoofdletters."""
+    if naar_niveau == "nederland":
+        return None
+    van_kolom, naar_kolom = GEO_HIERARCHIE[van_niveau][0], GEO_HIERARCHIE[naar_niveau][0]
+    koppeling = geo_referentie.buurten[[van_kolom, naar_kolom]].dropna().drop_duplicates(van_kolom)
+    return pd.Series(
+        koppeling[naar_kolom].astype(str).str.upper().to_numpy(),
+        index=koppeling[van_kolom].astype(str).str.upper().to_numpy(),
+    )
+
+
+def aggregeer_geoniveaus(
+    df,
+    waarde_kolommen,
+    niveaus=None,
+    bu_code_kolom="bu_code",
+    groep_kolommen=None,
+    gewicht_kolom=None,
+    methode="gemiddelde",
+    geo_referentie=None,
+):
+    """
+    Aggregeert buurtdata naar meerdere geografische niveaus in één keer.
+
+    Args:
+        df (pd.DataFrame): Data met één rij per buurt (en eventueel per jaar e.d.), met
+            gecorrigeerde buurtcodes (zie `corrigeer_bu_codes`)
+        waarde_kolommen (list): Kolommen die geaggregeerd worden, bijv. ['lbm', 'fys']
+        niveaus (list, optional): Niveaus uit `GEOLEVEL_PER_NIVEAU`. Standaard alle niveaus
+            behalve buurt.
+        bu_code_kolom (str, optional): Kolom met de buurtcodes
+        groep_kolommen (list, optional): Kolommen waarop daarnaast gegroepeerd wordt, bijv. ['jaar']
+        gewicht_kolom (str, optional): Kolom met gewichten, bijv. inwoners of woningen per buurt.
+            Standaard telt elke rij even zwaar.
+        methode (str, optional): 'gemiddelde' voor een (gewogen) gemiddelde, 'som' voor een
+            (gewogen) som, bijv. voor aantallen
+        geo_referentie (GeoReferentie, optional): Standaard de gedeelde referentie
+
+    Returns:
+        pd.DataFrame: Kolommen 'geoitem', 'geolevel', de groepkolommen en de waardekolommen,
+            per niveau in de volgorde van `niveaus`. Een waarde is leeg als er in de groep
+            geen enkele (gewogen) buurtwaarde was. Buurten die niet in de referentie
+            voorkomen (bijv. buiten Limburg), tellen alleen mee voor Nederland.
+
+    Raises:
+        ValueError: Bij een onbekend niveau of een onbekende methode
+        KeyError: Als een van de opgegeven kolommen ontbreekt
+    """
+    niveaus = list(niveaus or [niveau for niveau in GEOLEVEL_PER_NIVEAU if niveau != "buurt"])
+    onbekend = [niveau for niveau in niveaus if niveau not in GEOLEVEL_PER_NIVEAU]
+    if onbekend:
+        raise ValueError(f"Onbekende geografische niveaus: {', '.join(onbekend)}. Kies uit: {', '.join(GEOLEVEL_PER_NIVEAU)}")
+    if methode not in METHODEN:
+        raise ValueError(f"Onbekende methode '{methode}'. Kies uit: {', '.join(METHODEN)}")
+    groep_kolommen = list(groep_kolommen or [])
+    ontbrekend = [
+        kolom for kolom in [bu_code_kolom, *groep_kolommen, *waarde_kolommen, *([gewicht_kolom] if gewicht_kolom else [])]
+        if kolom not in df.columns
+    ]
+    if ontbrekend:
+        raise KeyError(f"De volgende kolommen ontbreken in het DataFrame: {', '.join(ontbrekend)}")
+    if geo_referentie is None:
+        geo_referentie = laad_geo_referentie()
+
+    # Laagste gevraagde niveau: daarop wordt één keer over alle rijen gegroepeerd
+    volgorde = list(GEOLEVEL_PER_NIVEAU)
+    basis = min(niveaus, key=volgorde.index)
+
+    bu_codes = df[bu_code_kolom].astype(str).str.upper()
+    if basis == "nederland":
+        basis_codes = pd.Series(CODE_NEDERLAND.upper(), index=df.index)
+    elif basis == "buurt":
+        basis_codes = bu_codes.where(bu_codes.isin(geo_referentie.bu_codes))
+    else:
+        basis_codes = bu_codes.map(_niveau_codes(geo_referentie, "buurt", basis))
+    buiten_referentie = int(basis_codes.isna().sum())
+    if buiten_referentie and niveaus != ["nederland"]:
+        print(f"Waarschuwing: {buiten_referentie} rijen met buurtcodes buiten de referentie tellen alleen mee voor Nederland")
+    basis_codes = basis_codes.fillna(BUITEN_REFERENTIE)
+
+    # Deelsommen per rij: gewicht x waarde, het gewicht en het aantal waarden (alleen waar beide bekend zijn)
+    gewicht = df[gewicht_kolom].astype(float) if gewicht_kolom else pd.Series(1.0, index=df.index)
+    deelsommen = {"_code": basis_codes}
+    for kolom in groep_kolommen:
+        deelsommen[kolom] = df[kolom]
+    for kolom in waarde_kolommen:
+        geldig = df[kolom].notna() & gewicht.notna()
+        deelsommen[f"{kolom}__teller"] = (df[kolom] * gewicht).where(geldig, 0.0)
+        deelsommen[f"{kolom}__noemer"] = gewicht.where(geldig, 0.0)
+        deelsommen[f"{kolom}__aantal"] = geldig.astype("int64")
+    sleutels = ["_code", *groep_kolommen]
+    basis_sommen = (
+        pd.DataFrame(deelsommen)
+        .groupby(sleutels, sort=True, observed=True, dropna=False)
+        .sum()
+        .reset_index()
+    )
+
+    resultaten = []
+    for niveau in niveaus:
+        if niveau == basis:
+            sommen = basis_sommen[basis_sommen["_code"] != BUITEN_REFERENTIE]
+        else:
+            sommen = basis_sommen.copy()
+            mapping = _niveau_codes(geo_referentie, basis, niveau)
+            sommen["_code"] = CODE_NEDERLAND.upper() if mapping is None else sommen["_code"].map(mapping)
+            sommen = (
+                sommen.dropna(subset=["_code"])
+                .groupby(sleutels, sort=True, observed=True, dropna=False)
+                .sum()
+                .reset_index()
+            )
+
+        resultaat = pd.DataFrame({
+            "geoitem": sommen["_code"].str.lower(),
+            "geolevel": GEOLEVEL_PER_NIVEAU[niveau],
+            **{kolom: sommen[kolom] for kolom in groep_kolommen},
+        })
+        for kolom in waarde_kolommen:
+            if methode == "gemiddelde":
+                noemer = sommen[f"{kolom}__noemer"]
+                resultaat[kolom] = sommen[f"{kolom}__teller"] / noemer.where(noemer != 0)
+            else:
+                resultaat[kolom] = sommen[f"{kolom}__teller"].where(sommen[f"{kolom}__aantal"] > 0)
+        resultaten.append(resultaat)
+
+    return pas_indicator_schema_toe(pd.concat(resultaten, ignore_index=True))
@@ -0,0 +1,349 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:  # niet beschikbaar op Windows
+    fcntl = None
+
+from pipeline_scripts.profilering import meet_stap
+
+# Standaardlocatie van de cache met ingelezen bronbestanden (in de root van de repository)
+CACHE_MAP = Path(os.environ.get(
+    "BESTAND_CACHE_MAP",
+    Path(__file__).resolve().parents[1] / ".cache" / "bestanden"
+))
+
+HASH_INDEX_BESTAND = "hashes.json"
+
+# Cachebestanden die langer dan dit aantal dagen niet gebruikt zijn, worden verwijderd,
+# en boven deze totale grootte eerst de minst recent gebruikte (zie `ruim_cache_op`)
+MAX_LEEFTIJD_DAGEN = 30
+MAX_CACHE_GROOTTE_MB = 2048
+
+# Extensies van de cachebestanden met DataFrames (zie `schrijf_cache`)
+CACHE_EXTENSIES = (".parquet", ".pkl")
+
+# Beschermt de hash-index tegen gelijktijdige updates vanuit meerdere threads (zie ook `_hash_index_slot`)
+_HASH_SLOT = threading.RLock()
+
+# Ingelezen bestanden die in het geheugen van dit proces bewaard blijven (zie `houd_in_geheugen`)
+_GEHEUGEN = OrderedDict()
+_GEHEUGEN_MAX = 0
+_GEHEUGEN_SLOT = threading.Lock()
+
+
+def _cache_actief():
+    """De cache kan worden uitgeschakeld met de omgevingsvariabele 'BESTAND_CACHE=0'."""
+    return os.environ.get("BESTAND_CACHE", "1").lower() not in ("0", "false", "nee")
+
+
+def _lees_hash_index(cache_map):
+    try:
+        with open(cache_map / HASH_INDEX_BESTAND, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+@contextmanager
+def _hash_index_slot(cache_map):
+    """
+    Slot op de hash-index over threads én processen heen (de runner en de watch-modus delen
+    de cache tussen processen), zodat gelijktijdige updates elkaar niet overschrijven.
+    Zonder `fcntl` (Windows) geldt alleen het slot tussen threads.
+    """
+    with _HASH_SLOT:
+        if fcntl is None:
+            yield
+            return
+        cache_map.mkdir(parents=True, exist_ok=True)
+        with open(cache_map / f"{HASH_INDEX_BESTAND}.lock", "w") as slot:
+            fcntl.flock(slot, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(slot, fcntl.LOCK_UN)
+
+
+def _schrijf_hash_index(cache_map, index):
+    cache_map.mkdir(parents=True, exist_ok=True)
+    tijdelijk_pad = cache_map / f"{HASH_INDEX_BESTAND}.{os.getpid()}.tmp"
+    with open(tijdelijk_pad, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tijdelijk_pad, cache_map / HASH_INDEX_BESTAND)
+
+
+def bereken_bestand_hash(pad, cache_map=None):
+    """
+    Berekent de SHA-256 hash van de inhoud van een bestand.
+
+    De hash wordt bewaard samen met de grootte en wijzigingstijd van het bestand,
+    zodat een ongewijzigd bestand niet opnieuw volledig gelezen hoeft te worden.
+
+    Args:
+        pad (str): Pad naar het bestand
+        cache_map (str of Path, optional): Map van de cache. Standaard `CACHE_MAP`.
+
+    Returns:
+        str: De hexadecimale SHA-256 hash van de bestandsinhoud
+
+    Raises:
+        FileNotFoundError: Als het bestand niet bestaat
+    """
+    cache_map = Path(cache_map) if cache_map else CACHE_MAP
+    pad = os.path.abspath(pad)
+    stat = os.stat(pad)
+
+    with _HASH_SLOT:
+        bekend = _lees_hash_index(cache_map).get(pad)
+    if bekend and bekend["grootte"] == stat.st_size and bekend["mtime_ns"] == stat.st_mtime_ns:
+        return bekend["hash"]
+
+    sha = hashlib.sha256()
+    with open(pad, "rb") as f:
+        for blok in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(blok)
+    bestand_hash = sha.hexdigest()
+
+    with _hash_index_slot(cache_map):
+        index = _lees_hash_index(cache_map)
+        index[pad] = {"grootte": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": bestand_hash}
+        _schrijf_hash_index(cache_map, index)
+    return bestand_hash
+
+
+def _sleutel(bestand_hash, lees_functie, kwargs):
+    argumenten = json.dumps(kwargs, sort_keys=True, default=str)
+    return hashlib.sha256(f"{bestand_hash}|{lees_functie}|{argumenten}".encode("utf-8")).hexdigest()[:24]
+
+
+def _tijdelijk_pad(pad):
+    # Per proces een eigen tijdelijk bestand; met `os.replace` verschijnt het eindbestand in één keer
+    return pad.with_name(f"{pad.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _lees_parquet(pad):
+    """
+    Leest een Parquet-cachebestand. Categorische kolommen met niet-tekstuele categorieën
+    (bijv. jaartallen in 'period') komen uit Parquet terug als gewone kolom; die worden
+    volgens de pandas-metadata in het bestand weer categorisch gemaakt.
+    """
+    df = pd.read_parquet(pad)
+    for kolom in (pq.read_schema(pad).pandas_metadata or {}).get("columns", []):
+        naam = kolom["name"]
+        if kolom["pandas_type"] == "categorical" and naam in df.columns and not isinstance(df[naam].dtype, pd.CategoricalDtype):
+            df[naam] = df[naam].astype(pd.CategoricalDtype(ordered=kolom["metadata"]["ordered"]))
+    return df
+
+
+def schrijf_cache(df, basis_pad):
+    """
+    Slaat een DataFrame op als '<basis_pad>.parquet', in te lezen met `lees_cache`. Kan
+    Parquet het DataFrame niet zonder verlies bewaren (bijv. kolommen met gemengde types of
+    niet-tekstuele kolomnamen), dan wordt teruggevallen op '<basis_pad>.pkl'. Beide worden
+    eerst naar een tijdelijk bestand geschreven, zodat een ander proces nooit een half
+    geschreven cachebestand inleest.
+    """
+    parquet_pad = basis_pad.with_suffix(".parquet")
+    tijdelijk = _tijdelijk_pad(parquet_pad)
+    try:
+        df.to_parquet(tijdelijk)
+        if _lees_parquet(tijdelijk).equals(df):
+            os.replace(tijdelijk, parquet_pad)
+            basis_pad.with_suffix(".pkl").unlink(missing_ok=True)
+            return
+        reden = "het DataFrame komt niet ongewijzigd terug uit Parquet"
+    except (pa.ArrowException, ValueError, TypeError) as e:
+        reden = f"Parquet kan het DataFrame niet opslaan ({type(e).__name__})"
+    finally:
+        tijdelijk.unlink(missing_ok=True)
+
+    print(f"Let op: {basis_pad.name} wordt als pickle gecachet, want {reden}")
+    pickle_pad = basis_pad.with_suffix(".pkl")
+    tijdelijk = _tijdelijk_pad(pickle_pad)
+    with open(tijdelijk, "wb") as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tijdelijk, pickle_pad)
+    # Een oudere Parquet-versie onder dezelfde naam zou bij het lezen voorgaan
+    parquet_pad.unlink(missing_ok=True)
+
+
+def lees_cache(basis_pad):
+    """
+    Leest een DataFrame dat met `schrijf_cache` is opgeslagen, of geeft None als er (nog)
+    geen cachebestand is. Het bestand wordt als gebruikt gemarkeerd (wijzigingstijd), zodat
+    `ruim_cache_op` de minst recent gebruikte bestanden eerst verwijdert.
+    """
+    try:
+        parquet_pad = basis_pad.with_suffix(".parquet")
+        if parquet_pad.exists():
+            df = _lees_parquet(parquet_pad)
+            os.utime(parquet_pad)
+            return df
+        pickle_pad = basis_pad.with_suffix(".pkl")
+        if pickle_pad.exists():
+            with open(pickle_pad, "rb") as f:
+                df = pickle.load(f)
+            os.utime(pickle_pad)
+            return df
+    except FileNotFoundError:
+        # Tussentijds opgeruimd door een ander proces
+        pass
+    return None
+
+
+def ruim_cache_op(cache_map=None, max_leeftijd_dagen=MAX_LEEFTIJD_DAGEN, max_grootte_mb=MAX_CACHE_GROOTTE_MB):
+    """
+    Verwijdert cachebestanden die langer dan `max_leeftijd_dagen` niet gebruikt zijn en,
+    indien de cache daarna nog te groot is, de minst recent gebruikte bestanden. Vermeldingen
+    in de hash-index van bronbestanden die niet meer bestaan, vallen ook weg.
+
+    Args:
+        cache_map (str of Path, optional): Map van de cache. Standaard `CACHE_MAP`.
+        max_leeftijd_dagen (float, optional): Maximale tijd sinds het laatste gebruik.
+        max_grootte_mb (int, optional): Maximale totale grootte van de cache in megabytes.
+
+    Returns:
+        int: Het aantal verwijderde cachebestanden
+    """
+    cache_map = Path(cache_map) if cache_map else CACHE_MAP
+    if not cache_map.exists():
+        return 0
+
+    bestanden = []
+    for pad in cache_map.iterdir():
+        if pad.suffix not in CACHE_EXTENSIES:
+            continue
+        try:
+            stat = pad.stat()
+        except FileNotFoundError:
+            continue
+        bestanden.append((stat.st_mtime, stat.st_size, pad))
+
+    # Stap 1: Verwijder bestanden die te lang niet gebruikt zijn
+    grens = time.time() - max_leeftijd_dagen * 24 * 60 * 60
+    verwijderd = [item for item in bestanden if item[0] < grens]
+    bestanden = sorted(item for item in bestanden if item[0] >= grens)
+
+    # Stap 2: Houd de totale grootte onder de limiet (least recently used eerst weg)
+    totale_grootte = sum(grootte for _, grootte, _ in bestanden)
+    while bestanden and totale_grootte > max_grootte_mb * 1024 * 1024:
+        item = bestanden.pop(0)
+        totale_grootte -= item[1]
+        verwijderd.append(item)
+
+    for _, _, pad in verwijderd:
+        pad.unlink(missing_ok=True)
+
+    with _hash_index_slot(cache_map):
+        index = _lees_hash_index(cache_map)
+        bestaand = {pad: info for pad, info in index.items() if os.path.exists(pad)}
+        if len(bestaand) != len(index):
+            _schrijf_hash_index(cache_map, bestaand)
+    return len(verwijderd)
+
+
+def houd_in_geheugen(max_bestanden=64):
+    """
+    Bewaart de laatst ingelezen bronbestanden ook in het geheugen van het proces, zodat een
+    langlopend proces (zoals de watch-modus) ongewijzigde bestanden niet opnieuw van schijf
+    hoeft te laden. Bij een gewijzigd bestand hoort een andere hash en dus een nieuwe sleutel.
+
+    Args:
+        max_bestanden (int, optional): Maximaal aantal bewaarde DataFrames; 0 schakelt het uit
+    """
+    global _GEHEUGEN_MAX
+    with _GEHEUGEN_SLOT:
+        _GEHEUGEN_MAX = max_bestanden
+        while len(_GEHEUGEN) > max_bestanden:
+            _GEHEUGEN.popitem(last=False)
+
+
+def _uit_geheugen(sleutel):
+    with _GEHEUGEN_SLOT:
+        if sleutel not in _GEHEUGEN:
+            return None
+        _GEHEUGEN.move_to_end(sleutel)
+        # Een kopie, zodat een transformatie die het DataFrame aanpast de bewaarde versie niet raakt
+        return _GEHEUGEN[sleutel].copy()
+
+
+def _onthoud(sleutel, df):
+    with _GEHEUGEN_SLOT:
+        if not _GEHEUGEN_MAX:
+            return
+        _GEHEUGEN[sleutel] = df.copy()
+        while len(_GEHEUGEN) > _GEHEUGEN_MAX:
+            _GEHEUGEN.popitem(last=False)
+
+
+def _lees_met_cache(pad, lees_functie, kwargs, cache_map=None):
+    if not _cache_actief():
+        return lees_functie(pad, **kwargs)
+
+    cache_map = Path(cache_map) if cache_map else CACHE_MAP
+    bestand_hash = bereken_bestand_hash(pad, cache_map=cache_map)
+    basis_pad = cache_map / _sleutel(bestand_hash, lees_functie.__name__, kwargs)
+
+    df = _uit_geheugen(basis_pad.name)
+    if df is not None:
+        return df
+
+    df = lees_cache(basis_pad)
+    if df is None:
+        df = lees_functie(pad, **kwargs)
+        cache_map.mkdir(parents=True, exist_ok=True)
+        schrijf_cache(df, basis_pad)
+        ruim_cache_op(cache_map)
+    _onthoud(basis_pad.name, df)
+    return df
+
+
+@meet_stap
+def lees_excel(pad, cache_map=None, **kwargs):
+    """
+    Leest een Excel-bestand in zoals `pd.read_excel`, met een cache op schijf.
+
+    Elke combinatie van bestandsinhoud (hash) en leesargumenten (bijv. `sheet_name`,
+    `skiprows`) wordt één keer geparsed en als Parquet-bestand bewaard. Volgende
+    runs lezen dat bestand in plaats van het Excel-bestand opnieuw te parsen.
+
+    Args:
+        pad (str): Pad naar het Excel-bestand
+        cache_map (str of Path, optional): Map van de cache. Standaard `CACHE_MAP`.
+        **kwargs: Argumenten voor `pd.read_excel`
+
+    Returns:
+        pd.DataFrame: Het ingelezen DataFrame
+
+    Raises:
+        FileNotFoundError: Als het Excel-bestand niet gevonden kan worden
+    """
+    if kwargs.get("sheet_name", 0) is None or isinstance(kwargs.get("sheet_name"), list):
+        # Meerdere werkbladen tegelijk levert een dict op; die wordt niet gecachet
+        return pd.read_excel(pad, **kwargs)
+    return _lees_met_cache(pad, pd.read_excel, kwargs, cache_map=cache_map)
+
+
+@meet_stap
+def lees_csv(pad, cache_map=None, **kwargs):
+    """
+    Leest een CSV-bestand in zoals `pd.read_csv`, met een cache op schijf.
+    Zie `lees_excel` voor de werking van de cache.
+    """
+    if kwargs.get("chunksize") or kwargs.get("iterator"):
+        # Streamend inlezen wordt niet gecachet
+        return pd.read_csv(pad, **kwargs)
+    return _lees_met_cache(pad, pd.read_csv, kwargs, cache_map=cache_map)
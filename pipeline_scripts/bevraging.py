@@ -0,0 +1,362 @@
+"""
+Lokale bevragingsservice voor de gepubliceerde indicatoren.
+
+Leest alle CSV-bestanden uit 'publicatie_bestanden/<team>/' in een index in het geheugen
+en beantwoordt daarop selecties: één regio door de tijd, één periode over alle regio's,
+of meerdere indicatoren tegelijk. Werkt volledig offline op de bestanden die de pipeline
+oplevert. Starten vanuit de root van de repository:
+
+    python -m pipeline_scripts.bevraging --poort 8765
+
+Voorbeelden van verzoeken:
+
+    GET /indicatoren
+    GET /selectie?indicator=MO_10a,D_39a&geoitem=cr37
+    GET /selectie?indicator=R_118a&period=m6y2025
+    GET /selectie?indicator=MO_12d&geoitem=cr38&laatste=5
+    GET /selectie?indicator=D_40a&van=2015&tot=2020
+    GET /ververs
+
+Of rechtstreeks vanuit Python:
+
+    from pipeline_scripts.bevraging import IndicatorIndex
+
+    index = IndicatorIndex()
+    index.selecteer(["MO_10a"], geoitems=["cr37"])
+"""
+import argparse
+import csv
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from pipeline_scripts.periode import PeriodeIndex
+from pipeline_scripts.registry import ROOT_MAP
+from pipeline_scripts.schema import DIMENSIE_PREFIX
+
+PUBLICATIE_MAP = ROOT_MAP / "publicatie_bestanden"
+
+# Sleutelkolommen van een indicator in lang formaat; de overige kolom (naast 'dim_*') is de waarde
+SLEUTEL_KOLOMMEN = ("geoitem", "geolevel", "period")
+
+STANDAARD_POORT = 8765
+
+
+def _scheidingsteken(kopregel):
+    # De pipeline schrijft ';' met decimale komma's; sommige (tekst)indicatoren zijn met ',' gescheiden
+    return ";" if kopregel.count(";") >= kopregel.count(",") else ","
+
+
+def _waarde(tekst, decimale_komma):
+    """Zet een celwaarde om naar een getal waar mogelijk; tekstwaarden blijven tekst."""
+    if tekst == "":
+        return None
+    try:
+        return int(tekst)
+    except ValueError:
+        pass
+    try:
+        return float(tekst.replace(",", ".") if decimale_komma else tekst)
+    except ValueError:
+        return tekst
+
+
+@dataclass
+class Indicator:
+    """
+    Eén ingelezen indicator met zijn indexen.
+
+    Attributes:
+        code (str): Indicatorcode zoals in de bestandsnaam, bijv. 'MO_10a'
+        team (str): Naam van het team
+        pad (Path): Het CSV-bestand
+        versie (tuple): (grootte, mtime_ns) van het bestand bij het inlezen
+        waardekolom (str): Naam van de waardekolom in het bestand, bijv. 'mo_11a'
+        rijen (list): Eén dict per rij met 'geoitem', 'geolevel', 'period', de 'dim_*'-kolommen en 'waarde'
+        per_geoitem, per_periode, per_geolevel (dict): Posities van de rijen per sleutelwaarde
+        per_sleutel (dict): Posities van de rijen per (geoitem, geolevel, period)
+        periode_index (PeriodeIndex): Gesorteerde index voor bereiken en de laatste N perioden
+    """
+    code: str
+    team: str
+    pad: Path
+    versie: tuple
+    waardekolom: str
+    rijen: List[dict]
+    per_geoitem: Dict[str, List[int]] = field(default_factory=dict)
+    per_periode: Dict[str, List[int]] = field(default_factory=dict)
+    per_geolevel: Dict[str, List[int]] = field(default_factory=dict)
+    per_sleutel: Dict[tuple, List[int]] = field(default_factory=dict)
+    periode_index: Optional[PeriodeIndex] = None
+
+    @classmethod
+    def lees(cls, pad, team):
+        """
+        Leest een gepubliceerd CSV-bestand in en bouwt de indexen op.
+
+        Raises:
+            ValueError: Als het bestand niet de kolommen 'geoitem', 'geolevel' en 'period' heeft
+        """
+        pad = Path(pad)
+        stat = pad.stat()
+        with open(pad, "r", encoding="utf-8", newline="") as f:
+            scheidingsteken = _scheidingsteken(f.readline())
+            f.seek(0)
+            lezer = csv.reader(f, delimiter=scheidingsteken)
+            kolommen = next(lezer)
+            regels = list(lezer)
+
+        ontbrekend = [kolom for kolom in SLEUTEL_KOLOMMEN if kolom not in kolommen]
+        overig = [kolom for kolom in kolommen if kolom not in SLEUTEL_KOLOMMEN and not kolom.startswith(DIMENSIE_PREFIX)]
+        if ontbrekend or len(overig) != 1:
+            raise ValueError(
+                f"{pad.name} is geen indicator in lang formaat (kolommen: {', '.join(kolommen)})"
+            )
+        waardekolom = overig[0]
+        dimensies = [kolom for kolom in kolommen if kolom.startswith(DIMENSIE_PREFIX)]
+        positie = {kolom: i for i, kolom in enumerate(kolommen)}
+
+        indicator = cls(pad.stem, team, pad, (stat.st_size, stat.st_mtime_ns), waardekolom, [])
+        for regel in regels:
+            if not regel:
+                continue
+            rij = {kolom: regel[positie[kolom]] for kolom in (*SLEUTEL_KOLOMMEN, *dimensies)}
+            rij["waarde"] = _waarde(regel[positie[waardekolom]], scheidingsteken == ";")
+            nummer = len(indicator.rijen)
+            indicator.rijen.append(rij)
+            indicator.per_geoitem.setdefault(rij["geoitem"].lower(), []).append(nummer)
+            indicator.per_periode.setdefault(rij["period"].lower(), []).append(nummer)
+            indicator.per_geolevel.setdefault(rij["geolevel"].lower(), []).append(nummer)
+            sleutel = (rij["geoitem"].lower(), rij["geolevel"].lower(), rij["period"].lower())
+            indicator.per_sleutel.setdefault(sleutel, []).append(nummer)
+        indicator.periode_index = PeriodeIndex([rij["period"] for rij in indicator.rijen])
+        return indicator
+
+    def selecteer(self, geoitems=None, geolevels=None, perioden=None, laatste=None, van=None, tot=None):
+        """
+        Geeft de rijen terug die aan alle opgegeven filters voldoen, in de volgorde van het bestand.
+        Een filter dat niet is opgegeven (None), selecteert alles.
+
+        `laatste` (de laatste N perioden) en `van`/`tot` (een bereik van perioden, inclusief)
+        gaan via de `PeriodeIndex`, zodat ook gemengde notaties chronologisch vergeleken worden.
+        """
+        filters = [
+            (index, {str(w).lower() for w in waarden})
+            for index, waarden in ((self.per_geoitem, geoitems), (self.per_periode, perioden), (self.per_geolevel, geolevels))
+            if waarden is not None
+        ]
+        periode_filter = laatste is not None or van is not None or tot is not None
+        if geoitems is not None and geolevels is not None and perioden is not None and not periode_filter:
+            # Volledige sleutel: direct opzoeken
+            posities = {
+                nummer
+                for geoitem in filters[0][1] for geolevel in filters[2][1] for periode in filters[1][1]
+                for nummer in self.per_sleutel.get((geoitem, geolevel, periode), ())
+            }
+            return [self.rijen[nummer] for nummer in sorted(posities)]
+        if not filters and not periode_filter:
+            return list(self.rijen)
+
+        # Begin bij het filter met de minste rijen en houd alleen de overlap over
+        kandidaten = [set().union(*(index.get(w, ()) for w in waarden)) for index, waarden in filters]
+        if laatste is not None:
+            kandidaten.append(set(self.periode_index.laatste(laatste).tolist()))
+        if van is not None or tot is not None:
+            kandidaten.append(set(self.periode_index.bereik(van, tot).tolist()))
+        posities = set.intersection(*sorted(kandidaten, key=len))
+        return [self.rijen[nummer] for nummer in sorted(posities)]
+
+    def beschrijving(self):
+        return {
+            "indicator": self.code,
+            "team": self.team,
+            "waardekolom": self.waardekolom,
+            "rijen": len(self.rijen),
+            "geolevels": sorted({rij["geolevel"] for rij in self.rijen}),
+            "perioden": list(dict.fromkeys(rij["period"] for rij in self.rijen)),
+        }
+
+
+class IndicatorIndex:
+    """
+    Index in het geheugen over alle gepubliceerde indicatoren van alle teams.
+
+    Bij `ververs` worden alleen bestanden die nieuw zijn of waarvan de grootte of
+    wijzigingstijd is veranderd opnieuw ingelezen; verwijderde bestanden vallen weg.
+    """
+
+    def __init__(self, publicatie_map=PUBLICATIE_MAP):
+        self.publicatie_map = Path(publicatie_map)
+        self.indicatoren = {}
+        self._slot = threading.Lock()
+        self.ververs()
+
+    def ververs(self):
+        """
+        Leest nieuwe en gewijzigde indicatoren (opnieuw) in.
+
+        Returns:
+            dict: Lijsten met de indicatorcodes die 'toegevoegd', 'gewijzigd' en 'verwijderd' zijn
+        """
+        with self._slot:
+            wijzigingen = {"toegevoegd": [], "gewijzigd": [], "verwijderd": []}
+            nieuw = dict(self.indicatoren)
+            gevonden = set()
+            for pad in sorted(self.publicatie_map.glob("*/*.csv")):
+                code, team = pad.stem, pad.parent.name
+                stat = pad.stat()
+                if code.lower() in gevonden:
+                    print(f"Waarschuwing: Indicator {code} komt bij meerdere teams voor; die van '{nieuw[code.lower()].team}' wordt gebruikt")
+                    continue
+                gevonden.add(code.lower())
+                bekend = nieuw.get(code.lower())
+                if bekend is not None and bekend.pad == pad and bekend.versie == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                try:
+                    nieuw[code.lower()] = Indicator.lees(pad, team)
+                except ValueError as e:
+                    print(f"Waarschuwing: {e}; overgeslagen")
+                    nieuw.pop(code.lower(), None)
+                    continue
+                wijzigingen["gewijzigd" if bekend is not None else "toegevoegd"].append(code)
+
+            for sleutel in [sleutel for sleutel in nieuw if sleutel not in gevonden]:
+                wijzigingen["verwijderd"].append(nieuw.pop(sleutel).code)
+            # In één keer vervangen, zodat lopende verzoeken een consistente index zien
+            self.indicatoren = nieuw
+        return wijzigingen
+
+    def selecteer(self, indicatoren=None, geoitems=None, geolevels=None, perioden=None, laatste=None, van=None, tot=None):
+        """
+        Selecteert rijen uit één of meer indicatoren.
+
+        Args:
+            indicatoren (list, optional): Indicatorcodes, bijv. ['MO_10a', 'D_39a']. Standaard alle.
+            geoitems (list, optional): Regiocodes, bijv. ['cr37', 'nl00']
+            geolevels (list, optional): Geografische niveaus, bijv. ['corop_id']
+            perioden (list, optional): Perioden, bijv. ['2024'] of ['m6y2025']
+            laatste (int, optional): Alleen de laatste N perioden van elke indicator
+            van, tot (str, optional): Alleen perioden die beginnen tussen het begin van `van` en het einde
+                van `tot` (inclusief), bijv. '2015' en '2020'
+
+        Returns:
+            dict: Mapping van indicatorcode naar een lijst rijen (dicts)
+
+        Raises:
+            KeyError: Als een indicator niet gepubliceerd is
+            ValueError: Als `van` of `tot` geen bekende periode is
+        """
+        index = self.indicatoren
+        codes = [code.lower() for code in indicatoren] if indicatoren else list(index)
+        onbekend = [code for code in (indicatoren or []) if code.lower() not in index]
+        if onbekend:
+            raise KeyError(f"Onbekende indicator(en): {', '.join(onbekend)}")
+        return {
+            index[code].code: index[code].selecteer(
+                geoitems=geoitems, geolevels=geolevels, perioden=perioden, laatste=laatste, van=van, tot=tot
+            )
+            for code in codes
+        }
+
+    def beschrijving(self):
+        return [indicator.beschrijving() for indicator in self.indicatoren.values()]
+
+
+def _lijst(parameters, naam):
+    # Zowel ?indicator=a&indicator=b als ?indicator=a,b
+    waarden = [waarde for tekst in parameters.get(naam, []) for waarde in tekst.split(",") if waarde]
+    return waarden or None
+
+
+def maak_handler(index, ververs_interval=5.0):
+    """
+    Maakt de request-handler voor de HTTP-server. Is de vorige controle langer dan
+    `ververs_interval` seconden geleden, dan wordt de index vóór het verzoek ververst
+    (0 = alleen via /ververs).
+    """
+    laatste_controle = [time.monotonic()]
+
+    class BevragingHandler(BaseHTTPRequestHandler):
+        def _antwoord(self, status, inhoud):
+            data = json.dumps(inhoud, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parameters = parse_qs(url.query)
+            if url.path == "/ververs":
+                laatste_controle[0] = time.monotonic()
+                return self._antwoord(200, index.ververs())
+            if ververs_interval and time.monotonic() - laatste_controle[0] > ververs_interval:
+                laatste_controle[0] = time.monotonic()
+                index.ververs()
+
+            if url.path == "/indicatoren":
+                return self._antwoord(200, index.beschrijving())
+            if url.path == "/selectie":
+                start = time.perf_counter()
+                try:
+                    laatste = parameters.get("laatste", [None])[0]
+                    resultaten = index.selecteer(
+                        indicatoren=_lijst(parameters, "indicator"),
+                        geoitems=_lijst(parameters, "geoitem"),
+                        geolevels=_lijst(parameters, "geolevel"),
+                        perioden=_lijst(parameters, "period"),
+                        laatste=int(laatste) if laatste is not None else None,
+                        van=parameters.get("van", [None])[0],
+                        tot=parameters.get("tot", [None])[0],
+                    )
+                except KeyError as e:
+                    return self._antwoord(404, {"fout": e.args[0]})
+                except ValueError as e:
+                    return self._antwoord(400, {"fout": str(e)})
+                return self._antwoord(200, {
+                    "resultaten": resultaten,
+                    "duur_ms": round((time.perf_counter() - start) * 1000, 3),
+                })
+            return self._antwoord(404, {"fout": f"Onbekend pad: {url.path}"})
+
+        def log_message(self, format, *args):
+            # Geen regel per verzoek op het scherm
+            pass
+
+    return BevragingHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--map", default=str(PUBLICATIE_MAP), help="Map met de CSV-bestanden per team")
+    parser.add_argument("--host", default="127.0.0.1", help="Adres waarop de service luistert (standaard alleen lokaal)")
+    parser.add_argument("--poort", type=int, default=STANDAARD_POORT)
+    parser.add_argument(
+        "--ververs-interval", type=float, default=5.0,
+        help="Controleer bij een verzoek op gewijzigde bestanden als dit aantal seconden verstreken is (0 = uit)"
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = IndicatorIndex(args.map)
+    rijen = sum(len(indicator.rijen) for indicator in index.indicatoren.values())
+    print(f"{len(index.indicatoren)} indicatoren ({rijen} rijen) ingelezen in {time.perf_counter() - start:.2f} s")
+
+    server = ThreadingHTTPServer((args.host, args.poort), maak_handler(index, args.ververs_interval))
+    print(f"Bevragingsservice actief op http://{args.host}:{args.poort}/ (Ctrl+C om te stoppen)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nBevragingsservice gestopt")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+from functools import cached_property, lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from pipeline_scripts.bestand_cache import lees_excel
+
+DATA_MAP = Path(__file__).resolve().parents[1] / "data"
+
+# Standaardlocaties van de referentiebestanden met buurtcodes
+STANDAARD_PAD_BUURTCODES = DATA_MAP / "Buurtcodes" / "BU_WK_GM_codes.xls"
+STANDAARD_PAD_CORRECTIES = DATA_MAP / "Buurtcodes" / "bu_code_correcties.xlsx"
+
+# Geografische hiërarchie van laag naar hoog, met de bijbehorende code- en naamkolommen
+GEO_HIERARCHIE = {
+    "buurt": ("BU_CODE", "BU_NAAM"),
+    "wijk": ("WK_CODE", "WK_NAAM"),
+    "gemeente": ("GEM_CODE", "GEM_NAAM"),
+    "corop": ("COROP_CODE", "COROP_NAAM"),
+    "provincie": ("PROV_CODE", "PROV_NAAM"),
+}
+
+
+@lru_cache(maxsize=None)
+def _laad_buurtcodes(pad):
+    try:
+        buurten = lees_excel(pad)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Het bestand met Limburgse buurtcodes kon niet worden gevonden op het pad: {pad}")
+    if "BU_CODE" not in buurten.columns:
+        raise KeyError("Het Excel-bestand moet een kolom 'BU_CODE' bevatten met de Limburgse buurtcodes")
+    return buurten
+
+
+@lru_cache(maxsize=None)
+def _laad_correcties(pad):
+    try:
+        correctie_df = lees_excel(pad)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Het correctiebestand kon niet worden gevonden op het pad: {pad}")
+    correctie_dict = correctie_df.set_index("BUURT_CODE")["BUURT_CODE_CORRECTIE"].to_dict()
+    # Zet alle waardes om naar hoofdletters voor consistentie
+    return {key.upper(): value.upper() for key, value in correctie_dict.items()}
+
+
+class GeoReferentie:
+    """
+    Geografische referentie van buurt -> wijk -> gemeente -> COROP -> provincie.
+
+    De referentiebestanden worden pas ingelezen wanneer ze voor het eerst nodig zijn,
+    en de opzoektabellen (hash-indexen op buurtcode) worden één keer opgebouwd.
+    Gebruik `laad_geo_referentie` om per proces één gedeelde instantie op te halen.
+
+    Args:
+        pad_buurtcodes (str): Pad naar het Excel-bestand met de BU_WK_GM-codes
+        pad_correcties (str): Pad naar het Excel-bestand met buurtcode correcties
+    """
+
+    def __init__(self, pad_buurtcodes=STANDAARD_PAD_BUURTCODES, pad_correcties=STANDAARD_PAD_CORRECTIES):
+        self.pad_buurtcodes = os.path.abspath(pad_buurtcodes)
+        self.pad_correcties = os.path.abspath(pad_correcties)
+
+    @cached_property
+    def buurten(self):
+        """DataFrame met één rij per buurt, geïndexeerd op BU_CODE."""
+        return _laad_buurtcodes(self.pad_buurtcodes).set_index("BU_CODE", drop=False)
+
+    @cached_property
+    def bu_codes(self):
+        """Hash-index met alle buurtcodes uit de referentie."""
+        return pd.Index(self.buurten.index.unique())
+
+    @cached_property
+    def correcties(self):
+        """Mapping van verouderde naar gecorrigeerde buurtcodes (in hoofdletters)."""
+        return _laad_correcties(self.pad_correcties)
+
+    def mapping(self, kolom):
+        """
+        Geeft een Series (geïndexeerd op BU_CODE) terug waarmee buurtcodes naar
+        de opgegeven kolom vertaald kunnen worden, bijv. 'COROP_NAAM' of 'GEM_CODE'.
+
+        Raises:
+            KeyError: Als de kolom niet in het referentiebestand voorkomt
+        """
+        if kolom not in self.buurten.columns:
+            raise KeyError(f"Het Excel-bestand moet de volgende kolommen bevatten: BU_CODE, {kolom}")
+        return self.buurten[kolom]
+
+    def niveau_mapping(self, niveau, naam=False):
+        """
+        Mapping van buurtcode naar de code (of naam) van een hoger geografisch niveau,
+        bijv. `niveau_mapping('corop')` of `niveau_mapping('gemeente', naam=True)`.
+        """
+        code_kolom, naam_kolom = GEO_HIERARCHIE[niveau]
+        return self.mapping(naam_kolom if naam else code_kolom)
+
+
+@lru_cache(maxsize=None)
+def _laad_geo_referentie(pad_buurtcodes, pad_correcties):
+    return GeoReferentie(pad_buurtcodes, pad_correcties)
+
+
+def wis_geo_referentie_cache():
+    """
+    Vergeet de ingelezen referentiebestanden in dit proces, zodat een volgende aanroep van
+    `laad_geo_referentie` gewijzigde bestanden opnieuw inleest (bijv. in de watch-modus).
+    """
+    _laad_buurtcodes.cache_clear()
+    _laad_correcties.cache_clear()
+    _laad_geo_referentie.cache_clear()
+
+
+def laad_geo_referentie(pad_buurtcodes=None, pad_correcties=None):
+    """
+    Geeft de gedeelde GeoReferentie voor de opgegeven referentiebestanden terug.
+
+    Per proces bestaat er één instantie per combinatie van (absolute) paden,
+    zodat alle helpers dezelfde, eenmalig ingelezen referentiedata gebruiken.
+
+    Args:
+        pad_buurtcodes (str, optional): Pad naar BU_WK_GM_codes.xls. Standaard het bestand in data/Buurtcodes.
+        pad_correcties (str, optional): Pad naar bu_code_correcties.xlsx. Standaard het bestand in data/Buurtcodes.
+
+    Returns:
+        GeoReferentie: De gedeelde geografische referentie
+    """
+    return _laad_geo_referentie(
+        os.path.abspath(pad_buurtcodes or STANDAARD_PAD_BUURTCODES),
+        os.path.abspath(pad_correcties or STANDAARD_PAD_CORRECTIES),
+    )
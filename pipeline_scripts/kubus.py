@@ -0,0 +1,303 @@
+"""
+Indicatorkubus: basismaten per regio en periode in één NumPy-array, met afgeleide
+indicatoren als rekenregels.
+
+Verhoudingen zoals D_41a (betaalbare toevoegingen / D_40a) en het woningtekort als
+percentage van de woningvoorraad (MO_11a) zijn bewerkingen op maten van dezelfde regio en
+periode. In de kubus (geoitem x periode x maat) is zo'n indicator één array-bewerking
+over alle cellen tegelijk, in plaats van een eigen merge per bestand:
+
+    from pipeline_scripts.kubus import IndicatorKubus
+
+    kubus = IndicatorKubus.uit_dataframes([totalen], maten=["betaalbaar", "d_40a"])
+    kubus.voeg_toe("d_41a = betaalbaar / d_40a * 100")
+    df_d_41a = kubus.naar_dataframe("d_41a")
+
+Een rekenregel is een Python-expressie met alleen maten, getallen, de operatoren
++ - * / ** , vergelijkingen, `and`/`or`/`not` en de functies uit `FUNCTIES`. Andere
+constructies (attributen, indexering, andere functies) worden geweigerd.
+"""
+import ast
+
+import numpy as np
+import pandas as pd
+
+# Functies die in een rekenregel gebruikt mogen worden
+FUNCTIES = {
+    "abs": np.abs,
+    "als": np.where,        # als(voorwaarde, waarde_indien_waar, waarde_anders)
+    "min": np.fmin,
+    "max": np.fmax,
+    "isleeg": np.isnan,
+    "afronden": np.round,
+    "wortel": np.sqrt,
+    "log": np.log,
+}
+
+CONSTANTEN = {"leeg": np.nan}
+
+_OPERATOREN = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+}
+
+_VERGELIJKINGEN = {
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+_TOEGESTAAN = (
+    ast.Module, ast.Expr, ast.Assign, ast.Name, ast.Load, ast.Store, ast.Constant,
+    ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.Call,
+    ast.USub, ast.UAdd, ast.Not, ast.And, ast.Or,
+    *_OPERATOREN, *_VERGELIJKINGEN,
+)
+
+
+def ontleed_rekenregel(regel):
+    """
+    Ontleedt een rekenregel en controleert of alleen toegestane constructies voorkomen.
+
+    Args:
+        regel (str): Bijv. 'd_41a = betaalbaar / d_40a * 100', of alleen de expressie
+
+    Returns:
+        tuple: (naam of None, ast-expressie)
+
+    Raises:
+        ValueError: Bij een ongeldige of niet-toegestane rekenregel
+    """
+    try:
+        boom = ast.parse(regel.strip(), mode="exec")
+    except SyntaxError as e:
+        raise ValueError(f"Ongeldige rekenregel '{regel}': {e.msg}")
+    if len(boom.body) != 1:
+        raise ValueError(f"Een rekenregel bevat precies één expressie: '{regel}'")
+
+    for knoop in ast.walk(boom):
+        if not isinstance(knoop, _TOEGESTAAN):
+            raise ValueError(f"Niet toegestaan in rekenregel '{regel}': {type(knoop).__name__}")
+        if isinstance(knoop, ast.Constant) and (isinstance(knoop.value, bool) or not isinstance(knoop.value, (int, float))):
+            raise ValueError(f"Alleen getallen zijn toegestaan als constante in rekenregel '{regel}': {knoop.value!r}")
+        if isinstance(knoop, ast.Call):
+            if not isinstance(knoop.func, ast.Name) or knoop.func.id not in FUNCTIES or knoop.keywords:
+                raise ValueError(
+                    f"Onbekende functie in rekenregel '{regel}'. Toegestaan: {', '.join(FUNCTIES)}"
+                )
+
+    opdracht = boom.body[0]
+    if isinstance(opdracht, ast.Expr):
+        return None, opdracht.value
+    if len(opdracht.targets) != 1 or not isinstance(opdracht.targets[0], ast.Name):
+        raise ValueError(f"Links van '=' staat één naam in rekenregel '{regel}'")
+    return opdracht.targets[0].id, opdracht.value
+
+
+class IndicatorKubus:
+    """
+    Maten per regio en periode als één array van vorm (geoitems, perioden, maten), met
+    NaN voor ontbrekende waarden. `aanwezig` geeft aan voor welke (geoitem, periode)
+    cellen er brondata was.
+
+    Attributes:
+        geoitems (pd.Index): De regio's, in volgorde van eerste voorkomen
+        perioden (pd.Index): De perioden, in volgorde van eerste voorkomen
+        maten (list): Namen van de maten (basis én afgeleid)
+        waarden (np.ndarray): float64-array met vorm (len(geoitems), len(perioden), len(maten))
+        aanwezig (np.ndarray): bool-array met vorm (len(geoitems), len(perioden))
+        geo_kolom, periode_kolom (str): Kolomnamen voor regio en periode
+        geo_kenmerken (pd.DataFrame): Kolommen die per regio vastliggen (bijv. 'geolevel')
+    """
+
+    def __init__(self, geoitems, perioden, maten, waarden, aanwezig, geo_kolom="geoitem",
+                 periode_kolom="period", geo_kenmerken=None):
+        self.geoitems = pd.Index(geoitems)
+        self.perioden = pd.Index(perioden)
+        self.maten = list(maten)
+        self.waarden = waarden
+        self.aanwezig = aanwezig
+        self.geo_kolom = geo_kolom
+        self.periode_kolom = periode_kolom
+        self.geo_kenmerken = geo_kenmerken if geo_kenmerken is not None else pd.DataFrame(index=self.geoitems)
+
+    @classmethod
+    def uit_dataframes(cls, dataframes, maten=None, geo_kolom="geoitem", periode_kolom="period", geo_kenmerken=None):
+        """
+        Bouwt een kubus uit één of meer DataFrames in lang formaat. Elk DataFrame levert
+        zijn eigen maten aan, bijv. de woningvoorraad uit het ene bestand en de woningbehoefte
+        uit het andere; ze hoeven niet eerst samengevoegd te worden.
+
+        Args:
+            dataframes (list): DataFrames met een regio- en periodekolom en één kolom per maat
+            maten (list, optional): Maten die worden overgenomen. Standaard alle overige kolommen.
+            geo_kolom (str, optional): Kolom met de regio
+            periode_kolom (str, optional): Kolom met de periode
+            geo_kenmerken (list, optional): Kolommen die per regio vastliggen (bijv. 'geolevel');
+                die komen terug in `naar_dataframe`
+
+        Returns:
+            IndicatorKubus: De kubus
+
+        Raises:
+            ValueError: Als dezelfde maat voor een regio en periode meerdere waarden heeft
+        """
+        geo_kenmerken = list(geo_kenmerken or [])
+        sleutels = [geo_kolom, periode_kolom]
+        alle_maten = []
+        for df in dataframes:
+            for kolom in df.columns:
+                if kolom not in sleutels and kolom not in geo_kenmerken and kolom not in alle_maten:
+                    if maten is None or kolom in maten:
+                        alle_maten.append(kolom)
+        maten = [maat for maat in maten if maat in alle_maten] if maten is not None else alle_maten
+
+        geoitems = pd.Index(pd.unique(pd.concat([df[geo_kolom] for df in dataframes], ignore_index=True).dropna()))
+        perioden = pd.Index(pd.unique(pd.concat([df[periode_kolom] for df in dataframes], ignore_index=True).dropna()))
+        waarden = np.full((len(geoitems), len(perioden), len(maten)), np.nan)
+        aanwezig = np.zeros((len(geoitems), len(perioden)), dtype=bool)
+        gevuld = np.zeros(waarden.shape, dtype=bool)
+
+        kenmerken = []
+        for df in dataframes:
+            df = df.dropna(subset=sleutels)
+            geo_pos = geoitems.get_indexer(df[geo_kolom])
+            periode_pos = perioden.get_indexer(df[periode_kolom])
+            aanwezig[geo_pos, periode_pos] = True
+            dubbele_rijen = pd.DataFrame({"geo": geo_pos, "periode": periode_pos}).duplicated().any()
+            for maat in maten:
+                if maat not in df.columns:
+                    continue
+                i = maten.index(maat)
+                if dubbele_rijen or gevuld[geo_pos, periode_pos, i].any():
+                    raise ValueError(f"De maat '{maat}' heeft meerdere waarden voor dezelfde {geo_kolom} en {periode_kolom}")
+                waarden[geo_pos, periode_pos, i] = pd.to_numeric(df[maat]).to_numpy(dtype=float, na_value=np.nan)
+                gevuld[geo_pos, periode_pos, i] = True
+            aanwezige_kenmerken = [kenmerk for kenmerk in geo_kenmerken if kenmerk in df.columns]
+            if aanwezige_kenmerken:
+                kenmerken.append(df[[geo_kolom, *aanwezige_kenmerken]])
+
+        geo_tabel = None
+        if kenmerken:
+            # Per regio de eerste bekende waarde van elk kenmerk
+            geo_tabel = (
+                pd.concat(kenmerken, ignore_index=True)
+                .groupby(geo_kolom, sort=False, observed=True)
+                .first()
+                .reindex(geoitems)
+            )
+        return cls(geoitems, perioden, maten, waarden, aanwezig, geo_kolom, periode_kolom, geo_tabel)
+
+    def __getitem__(self, maat):
+        """De waarden van één maat als array van vorm (geoitems, perioden)."""
+        if maat not in self.maten:
+            raise KeyError(f"Onbekende maat '{maat}'. Beschikbaar: {', '.join(self.maten)}")
+        return self.waarden[:, :, self.maten.index(maat)]
+
+    def _evalueer(self, knoop):
+        if isinstance(knoop, ast.Constant):
+            return float(knoop.value)
+        if isinstance(knoop, ast.Name):
+            if knoop.id in self.maten:
+                return self[knoop.id]
+            if knoop.id in CONSTANTEN:
+                return CONSTANTEN[knoop.id]
+            raise KeyError(f"Onbekende maat '{knoop.id}'. Beschikbaar: {', '.join(self.maten)}")
+        if isinstance(knoop, ast.BinOp):
+            return _OPERATOREN[type(knoop.op)](self._evalueer(knoop.left), self._evalueer(knoop.right))
+        if isinstance(knoop, ast.UnaryOp):
+            waarde = self._evalueer(knoop.operand)
+            if isinstance(knoop.op, ast.Not):
+                return np.logical_not(waarde)
+            return np.negative(waarde) if isinstance(knoop.op, ast.USub) else waarde
+        if isinstance(knoop, ast.BoolOp):
+            functie = np.logical_and if isinstance(knoop.op, ast.And) else np.logical_or
+            resultaat = self._evalueer(knoop.values[0])
+            for waarde in knoop.values[1:]:
+                resultaat = functie(resultaat, self._evalueer(waarde))
+            return resultaat
+        if isinstance(knoop, ast.Compare):
+            links, resultaat = self._evalueer(knoop.left), True
+            for operator, rechts_knoop in zip(knoop.ops, knoop.comparators):
+                rechts = self._evalueer(rechts_knoop)
+                resultaat = np.logical_and(resultaat, _VERGELIJKINGEN[type(operator)](links, rechts))
+                links = rechts
+            return resultaat
+        if isinstance(knoop, ast.Call):
+            return FUNCTIES[knoop.func.id](*(self._evalueer(argument) for argument in knoop.args))
+        raise ValueError(f"Niet toegestaan in een rekenregel: {type(knoop).__name__}")
+
+    def bereken(self, expressie):
+        """
+        Evalueert een expressie over alle cellen van de kubus tegelijk. Delen door nul
+        levert NaN of inf op, zonder waarschuwing.
+
+        Returns:
+            np.ndarray: float64-array met vorm (geoitems, perioden)
+        """
+        _, boom = ontleed_rekenregel(expressie)
+        return self._bereken_boom(boom)
+
+    def _bereken_boom(self, boom):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            resultaat = self._evalueer(boom)
+        return np.broadcast_to(np.asarray(resultaat, dtype=float), self.aanwezig.shape)
+
+    def voeg_toe(self, *rekenregels):
+        """
+        Voegt afgeleide maten toe, bijv. `voeg_toe("d_41a = betaalbaar / d_40a * 100")`.
+        Regels worden op volgorde berekend; een regel kan een eerder toegevoegde maat gebruiken.
+        Een bestaande maat met dezelfde naam wordt overschreven.
+
+        Returns:
+            IndicatorKubus: De kubus zelf
+
+        Raises:
+            ValueError: Als een rekenregel geen naam heeft of niet is toegestaan
+            KeyError: Als een rekenregel een onbekende maat gebruikt
+        """
+        for regel in rekenregels:
+            naam, boom = ontleed_rekenregel(regel)
+            if naam is None:
+                raise ValueError(f"Een afgeleide maat heeft de vorm 'naam = expressie': '{regel}'")
+            resultaat = self._bereken_boom(boom)
+            if naam in self.maten:
+                self.waarden[:, :, self.maten.index(naam)] = resultaat
+            else:
+                self.waarden = np.concatenate([self.waarden, resultaat[:, :, np.newaxis]], axis=2)
+                self.maten.append(naam)
+        return self
+
+    def naar_dataframe(self, maat, waar=None, kolom=None):
+        """
+        Zet één maat terug naar lang formaat: regio, de regiokenmerken, periode en de waarde,
+        per regio en daarbinnen per periode (in volgorde van eerste voorkomen).
+
+        Args:
+            maat (str): De maat, bijv. 'd_41a'
+            waar (str, optional): Expressie die bepaalt welke cellen worden opgenomen, bijv.
+                'heeft_betaalbaar'. Standaard alle cellen met brondata en een waarde (niet NaN).
+            kolom (str, optional): Naam van de waardekolom. Standaard de naam van de maat.
+
+        Returns:
+            pd.DataFrame: Kolommen `geo_kolom`, de regiokenmerken, `periode_kolom` en de waarde
+        """
+        waarden = self[maat]
+        if waar is None:
+            selectie = self.aanwezig & ~np.isnan(waarden)
+        else:
+            selectie = self.aanwezig & (np.nan_to_num(self.bereken(waar)) != 0)
+        geo_pos, periode_pos = np.nonzero(selectie)
+
+        resultaat = {self.geo_kolom: self.geoitems.take(geo_pos).to_numpy()}
+        for kenmerk in self.geo_kenmerken.columns:
+            resultaat[kenmerk] = self.geo_kenmerken[kenmerk].to_numpy()[geo_pos]
+        resultaat[self.periode_kolom] = self.perioden.take(periode_pos).to_numpy()
+        resultaat[kolom or maat] = waarden[geo_pos, periode_pos]
+        return pd.DataFrame(resultaat)
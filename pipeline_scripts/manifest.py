@@ -0,0 +1,188 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+import types
+from pathlib import Path
+
+from api_scripts.cbs_cache import haal_tabel_wijzigingsdatum
+from pipeline_scripts.bestand_cache import bereken_bestand_hash, lees_cache, schrijf_cache
+from pipeline_scripts.registry import ROOT_MAP
+
+# Standaardlocatie van de build-manifesten en de bewaarde uitvoer per stap
+MANIFEST_MAP = Path(os.environ.get("MANIFEST_MAP", ROOT_MAP / ".cache" / "manifest"))
+
+
+def _hash_tekst(tekst):
+    return hashlib.sha256(tekst.encode("utf-8")).hexdigest()
+
+
+def _code_onderdelen(functie, root_map, gezien):
+    """
+    Verzamelt de broncode van een functie en van alle functies uit de repository die
+    (direct of indirect) door de functie worden aangeroepen, plus de waarden van
+    eenvoudige constanten op moduleniveau (bijv. `REGIO_MAPPING`).
+    """
+    functie = inspect.unwrap(functie)
+    if not isinstance(functie, types.FunctionType):
+        return
+    try:
+        bronbestand = inspect.getsourcefile(functie)
+    except TypeError:
+        return
+    if not bronbestand or not os.path.abspath(bronbestand).startswith(str(root_map)):
+        # Functies uit pandas, numpy e.d. vallen buiten de vingerafdruk
+        return
+    sleutel = f"{functie.__module__}.{functie.__qualname__}"
+    if sleutel in gezien:
+        return
+    gezien[sleutel] = inspect.getsource(functie)
+
+    # Doorloop alle namen die in de functie (en geneste functies/lambda's) worden gebruikt
+    namen, codes = set(), [functie.__code__]
+    while codes:
+        code = codes.pop()
+        namen.update(code.co_names)
+        codes.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+
+    for naam in sorted(namen):
+        waarde = functie.__globals__.get(naam)
+        if isinstance(waarde, types.FunctionType) or hasattr(waarde, "__wrapped__"):
+            # Ook functies achter een decorator (bijv. `lru_cache`) worden meegenomen
+            _code_onderdelen(waarde, root_map, gezien)
+        elif isinstance(waarde, type) and waarde.__module__ not in ("builtins",):
+            try:
+                if os.path.abspath(inspect.getsourcefile(waarde)).startswith(str(root_map)):
+                    gezien[f"{waarde.__module__}.{waarde.__qualname__}"] = inspect.getsource(waarde)
+            except (TypeError, OSError):
+                pass
+        elif isinstance(waarde, (str, int, float, bool, tuple, list, dict)):
+            gezien[f"{functie.__module__}.{naam}"] = repr(waarde)
+
+
+def bereken_code_hash(functie, root_map=ROOT_MAP):
+    """
+    Berekent een hash van de transformatiecode van een stap: de stapfunctie zelf en alle
+    functies uit de repository die zij aanroept (bijv. uit `preprocessing.py` en `helpers.py`).
+    Een wijziging in een functie die de stap niet gebruikt, verandert de hash dus niet.
+    """
+    gezien = {}
+    _code_onderdelen(functie, Path(root_map).resolve(), gezien)
+    return _hash_tekst(json.dumps(gezien, sort_keys=True))
+
+
+def bereken_vingerafdruk(stap, root_map=ROOT_MAP, afhankelijkheden=None):
+    """
+    Berekent de vingerafdruk van een stap uit de inhoud van zijn invoerbestanden,
+    de versie (wijzigingsdatum) van de gebruikte CBS-tabellen en de transformatiecode.
+
+    Args:
+        stap (IndicatorStap): De stap
+        root_map (Path, optional): Root van de repository
+        afhankelijkheden (dict, optional): Vingerafdrukken van de stappen waarvan deze stap afhankelijk is
+
+    Returns:
+        dict: De onderdelen van de vingerafdruk en de totale hash onder de sleutel 'hash'.
+            De hash is None als de versie van een CBS-tabel niet bepaald kon worden.
+    """
+    invoer = {
+        os.path.relpath(pad, root_map).replace(os.sep, "/"): bereken_bestand_hash(pad)
+        for pad in stap.invoer_bestanden(root_map)
+    }
+
+    cbs_tabellen = {}
+    for table_code in stap.cbs_tabellen:
+        try:
+            cbs_tabellen[table_code] = haal_tabel_wijzigingsdatum(table_code)
+        except Exception as e:
+            print(f"Waarschuwing: Versie van CBS-tabel {table_code} kon niet worden bepaald: {e}")
+            cbs_tabellen[table_code] = None
+
+    onderdelen = {
+        "invoer": invoer,
+        "cbs_tabellen": cbs_tabellen,
+        "code": bereken_code_hash(stap.functie, root_map),
+        "indicatoren": sorted(stap.indicatoren),
+        "afhankelijk_van": {naam: (afhankelijkheden or {}).get(naam) for naam in stap.afhankelijk_van},
+    }
+    onbekend = any(versie is None for versie in cbs_tabellen.values()) or any(
+        vingerafdruk is None for vingerafdruk in onderdelen["afhankelijk_van"].values()
+    )
+    onderdelen["hash"] = None if onbekend else _hash_tekst(json.dumps(onderdelen, sort_keys=True))
+    return onderdelen
+
+
+class BuildManifest:
+    """
+    Build-manifest van één team: per stap de vingerafdruk van de laatste geslaagde run
+    en een kopie van de opgeleverde indicatoren, zodat een ongewijzigde stap kan worden
+    overgeslagen en zijn vorige uitvoer hergebruikt.
+
+    Het manifest staat in '<manifest_map>/<team>.json', de uitvoer per stap in
+    '<manifest_map>/<team>/<indicatorcode>.parquet'.
+    """
+
+    def __init__(self, team, manifest_map=None):
+        self.team = team
+        self.manifest_map = Path(manifest_map) if manifest_map else MANIFEST_MAP
+        self.pad = self.manifest_map / f"{team}.json"
+        self.uitvoer_map = self.manifest_map / team
+        try:
+            with open(self.pad, "r", encoding="utf-8") as f:
+                self.stappen = json.load(f).get("stappen", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.stappen = {}
+
+    def is_actueel(self, stap, vingerafdruk, output_map=None):
+        """
+        Geeft True terug als de stap met dezelfde vingerafdruk al eerder is gebouwd en
+        de bewaarde uitvoer (en eventueel de CSV-bestanden in `output_map`) nog bestaat.
+        """
+        vorige = self.stappen.get(stap.naam)
+        if vingerafdruk["hash"] is None or not vorige or vorige["hash"] != vingerafdruk["hash"]:
+            return False
+        if output_map and os.path.abspath(output_map) not in vorige.get("gepubliceerd_in", []):
+            return False
+        for code in vorige["uitvoer"]:
+            basis_pad = self.uitvoer_map / code
+            if not (basis_pad.with_suffix(".parquet").exists() or basis_pad.with_suffix(".pkl").exists()):
+                return False
+            if output_map and not os.path.exists(os.path.join(output_map, f"{code}.csv")):
+                return False
+        return True
+
+    def laad_uitvoer(self, stap):
+        """Laadt de bewaarde indicatoren van de vorige run van een stap."""
+        return {code: lees_cache(self.uitvoer_map / code) for code in self.stappen[stap.naam]["uitvoer"]}
+
+    def registreer(self, stap, vingerafdruk, uitvoer):
+        """Bewaart de uitvoer van een stap en legt de vingerafdruk vast in het manifest."""
+        self.uitvoer_map.mkdir(parents=True, exist_ok=True)
+        for code, df in uitvoer.items():
+            for oud_pad in (self.uitvoer_map / f"{code}.parquet", self.uitvoer_map / f"{code}.pkl"):
+                oud_pad.unlink(missing_ok=True)
+            schrijf_cache(df, self.uitvoer_map / code)
+
+        self.stappen[stap.naam] = {
+            **vingerafdruk,
+            "uitvoer": list(uitvoer),
+            "gebouwd_op": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "gepubliceerd_in": [],
+        }
+        self.opslaan()
+
+    def markeer_gepubliceerd(self, stap_namen, output_map):
+        """Legt vast dat de uitvoer van de gegeven stappen als CSV in `output_map` is weggeschreven."""
+        for naam in stap_namen:
+            gepubliceerd_in = self.stappen[naam].setdefault("gepubliceerd_in", [])
+            if os.path.abspath(output_map) not in gepubliceerd_in:
+                gepubliceerd_in.append(os.path.abspath(output_map))
+        self.opslaan()
+
+    def opslaan(self):
+        self.manifest_map.mkdir(parents=True, exist_ok=True)
+        tijdelijk_pad = self.pad.with_suffix(f".{os.getpid()}.tmp")
+        with open(tijdelijk_pad, "w", encoding="utf-8") as f:
+            json.dump({"team": self.team, "stappen": self.stappen}, f, indent=2)
+        os.replace(tijdelijk_pad, self.pad)
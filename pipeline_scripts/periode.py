@@ -0,0 +1,255 @@
+"""
+Gedeelde representatie van perioden als sorteerbare gehele getallen.
+
+De bronnen gebruiken verschillende notaties voor perioden: CBS-codes ('2024JJ00',
+'2024KW02', '2024MM05'), CBS-labels ('2024', '2024 mei', '2024 2e kwartaal'), losse
+jaartallen (2024 of '2024') en de maandnotatie van het dataportaal ('m5y2025'). Hier
+worden ze allemaal omgezet naar één code:
+
+    code = jaar * 1000 + startmaand * 10 + soort
+
+met soort 0 = jaar, 1 = halfjaar, 2 = kwartaal en 3 = maand. Zo is 2024 -> 2024010,
+2024 2e kwartaal -> 2024042 en mei 2024 -> 2024053. Op volgorde van de code staan de
+perioden op volgorde van hun begin; bij hetzelfde begin komt de langere periode eerst.
+
+    from pipeline_scripts.periode import PeriodeIndex, parseer_perioden
+
+    codes = parseer_perioden(df["period"])
+    index = PeriodeIndex(df["period"])
+    df.iloc[index.laatste(3, soort=JAAR)]
+"""
+import numpy as np
+import pandas as pd
+
+JAAR, HALFJAAR, KWARTAAL, MAAND = 0, 1, 2, 3
+
+# Lengte in maanden per soort periode
+MAANDEN_PER_SOORT = {JAAR: 12, HALFJAAR: 6, KWARTAAL: 3, MAAND: 1}
+
+# Soort per CBS-periodecode, bijv. '2024KW02'
+CBS_SOORTEN = {"JJ": JAAR, "HJ": HALFJAAR, "KW": KWARTAAL, "MM": MAAND}
+
+MAANDNAMEN = [
+    "januari", "februari", "maart", "april", "mei", "juni",
+    "juli", "augustus", "september", "oktober", "november", "december"
+]
+
+# Notaties die herkend worden: (regex met de groepen jaar, soort en volgnummer, vaste soort)
+_PATRONEN = [
+    (r"^(?P<jaar>\d{4})(?P<soort>JJ|HJ|KW|MM)(?P<nummer>\d{2})$", None),
+    (r"^(?P<jaar>\d{4})(?:\.0+)?$", JAAR),
+    (r"^m(?P<nummer>\d{1,2})y(?P<jaar>\d{4})$", MAAND),
+    (rf"^(?P<jaar>\d{{4}}) (?P<nummer>{'|'.join(MAANDNAMEN)})$", MAAND),
+    (r"^(?P<jaar>\d{4}) (?P<nummer>\d)e kwartaal$", KWARTAAL),
+    (r"^(?P<jaar>\d{4}) (?P<nummer>\d)e halfjaar$", HALFJAAR),
+]
+
+# Code voor een onbekende of ontbrekende periode in numpy-arrays; sorteert vóór alle perioden
+ONBEKEND = -1
+
+
+def maak_codes(jaar, startmaand, soort):
+    """Combineert jaar, startmaand (1-12) en soort (`JAAR` t/m `MAAND`) tot periodecodes."""
+    return np.asarray(jaar, dtype=np.int64) * 1000 + np.asarray(startmaand, dtype=np.int64) * 10 + soort
+
+
+def _parseer_uniek(teksten):
+    """Zet een Series met unieke teksten om naar een int64-array met codes (of `ONBEKEND`)."""
+    codes = np.full(len(teksten), ONBEKEND, dtype=np.int64)
+    teksten = teksten.str.strip()
+    open_ = np.ones(len(teksten), dtype=bool)
+
+    for patroon, vaste_soort in _PATRONEN:
+        if not open_.any():
+            break
+        delen = teksten[open_].str.extract(patroon, flags=0)
+        gevonden = delen["jaar"].notna().to_numpy()
+        if not gevonden.any():
+            continue
+        delen = delen[gevonden]
+        jaar = delen["jaar"].astype(np.int64).to_numpy()
+
+        if vaste_soort is None:
+            soort = delen["soort"].map(CBS_SOORTEN).to_numpy(dtype=np.int64)
+        else:
+            soort = np.full(len(delen), vaste_soort, dtype=np.int64)
+        if vaste_soort == JAAR:
+            nummer = np.ones(len(delen), dtype=np.int64)
+        elif vaste_soort == MAAND and not delen["nummer"].str.isdigit().all():
+            nummer = delen["nummer"].map({naam: i + 1 for i, naam in enumerate(MAANDNAMEN)}).to_numpy(dtype=np.int64)
+        else:
+            # CBS-jaarcodes hebben volgnummer 00
+            nummer = np.maximum(delen["nummer"].astype(np.int64).to_numpy(), 1)
+
+        lengte = np.array([MAANDEN_PER_SOORT[s] for s in range(4)])[soort]
+        startmaand = 1 + (nummer - 1) * lengte
+        geldig = startmaand + lengte - 1 <= 12
+
+        posities = np.flatnonzero(open_)[gevonden]
+        codes[posities[geldig]] = maak_codes(jaar[geldig], startmaand[geldig], soort[geldig])
+        open_[posities] = False
+    return codes
+
+
+def parseer_perioden(waarden):
+    """
+    Zet perioden in een van de bekende notaties om naar periodecodes.
+
+    Elke unieke waarde wordt één keer geparsed (met vectoriële regex-bewerkingen per
+    notatie), waarna de codes via de factorisatie over alle rijen worden verspreid.
+
+    Args:
+        waarden (iterable of pd.Series): Perioden, bijv. ['2024JJ00', 'm5y2025', 2023]
+
+    Returns:
+        pd.Series: Codes met dtype 'Int64'; leeg (NA) voor onbekende of ontbrekende perioden.
+            Een Series als invoer behoudt zijn index.
+    """
+    reeks = waarden if isinstance(waarden, pd.Series) else pd.Series(list(waarden), dtype=object)
+    posities, uniek = pd.factorize(reeks)
+    if isinstance(uniek, pd.CategoricalIndex):
+        uniek = uniek.astype(object)
+    uniek_codes = _parseer_uniek(pd.Series(np.asarray(uniek, dtype=object)).astype(str))
+
+    # Positie -1 (ontbrekende waarde) wijst naar het laatste element en wordt dus ONBEKEND
+    codes = np.append(uniek_codes, ONBEKEND)[posities]
+    return pd.Series(codes, index=reeks.index, name=reeks.name).astype("Int64").mask(codes == ONBEKEND)
+
+
+def _als_array(codes):
+    if isinstance(codes, pd.Series):
+        return codes.to_numpy(dtype=np.int64, na_value=ONBEKEND)
+    return np.asarray(codes, dtype=np.int64)
+
+
+def periode_jaar(codes):
+    return _als_array(codes) // 1000
+
+
+def periode_startmaand(codes):
+    return _als_array(codes) // 10 % 100
+
+
+def periode_soort(codes):
+    """Soort per code (`JAAR`, `HALFJAAR`, `KWARTAAL` of `MAAND`); `ONBEKEND` voor onbekende perioden."""
+    codes = _als_array(codes)
+    return np.where(codes == ONBEKEND, ONBEKEND, codes % 10)
+
+
+def formatteer_perioden(codes, notatie="cbs"):
+    """
+    Zet periodecodes terug om naar tekst.
+
+    Args:
+        codes (array-like): Periodecodes
+        notatie (str, optional): 'cbs' voor '2024JJ00', '2024KW02', '2024MM05'; 'portaal' voor
+            '2024' en 'm5y2024' (halfjaren en kwartalen blijven in de CBS-notatie)
+
+    Returns:
+        pd.Series: Teksten, leeg (NA) voor onbekende perioden
+    """
+    codes = _als_array(codes)
+    jaar, maand, soort = periode_jaar(codes), periode_startmaand(codes), periode_soort(codes)
+    lengte = np.array([MAANDEN_PER_SOORT[s] for s in range(4)])[np.clip(soort, 0, 3)]
+    nummer = np.where(soort == JAAR, 0, (maand - 1) // lengte + 1)
+    letters = np.array(list(CBS_SOORTEN))[np.clip(soort, 0, 3)]
+
+    jaar_tekst = pd.Series(jaar).astype(str)
+    tekst = jaar_tekst + pd.Series(letters) + pd.Series(nummer).astype(str).str.zfill(2)
+    if notatie == "portaal":
+        tekst = tekst.mask(soort == JAAR, jaar_tekst)
+        tekst = tekst.mask(soort == MAAND, "m" + pd.Series(maand).astype(str) + "y" + jaar_tekst)
+    elif notatie != "cbs":
+        raise ValueError(f"Onbekende notatie '{notatie}'. Kies uit: cbs, portaal")
+    return tekst.where(codes != ONBEKEND, None)
+
+
+def sorteer_perioden(waarden):
+    """
+    Sorteert perioden in chronologische volgorde (zie de module), bijv. 'm6y2025' vóór
+    'm10y2025'. Onbekende notaties komen achteraan, als tekst gesorteerd.
+    """
+    waarden = list(waarden)
+    codes = parseer_perioden(pd.Series(waarden, dtype=object)).to_numpy(dtype=np.int64, na_value=ONBEKEND)
+    bekend = sorted((code, i) for i, code in enumerate(codes) if code != ONBEKEND)
+    onbekend = sorted((str(waarden[i]), i) for i, code in enumerate(codes) if code == ONBEKEND)
+    return [waarden[i] for _, i in bekend + onbekend]
+
+
+class PeriodeIndex:
+    """
+    Gesorteerde index over de perioden van een tabel. Selecties op een bereik en op de
+    laatste N perioden zijn binaire zoekacties (O(log n)) in plaats van vergelijkingen
+    per rij. De resultaten zijn rijposities, te gebruiken met `df.iloc`.
+
+    Args:
+        perioden (iterable of pd.Series): De periodekolom, in een van de bekende notaties
+    """
+
+    def __init__(self, perioden):
+        codes = _als_array(parseer_perioden(perioden))
+        volgorde = np.argsort(codes, kind="stable")
+        gesorteerd = codes[volgorde]
+        # Onbekende perioden (ONBEKEND) staan vooraan en doen niet mee
+        begin = np.searchsorted(gesorteerd, 0)
+        self.codes = codes
+
+        # Per soort (en voor alle soorten samen): gesorteerde codes, rijposities en unieke codes
+        self._per_soort = {}
+        for soort in (None, JAAR, HALFJAAR, KWARTAAL, MAAND):
+            keuze = np.arange(begin, len(gesorteerd))
+            if soort is not None:
+                keuze = keuze[gesorteerd[keuze] % 10 == soort]
+            self._per_soort[soort] = (gesorteerd[keuze], volgorde[keuze], np.unique(gesorteerd[keuze]))
+
+    def __len__(self):
+        return len(self.codes)
+
+    @staticmethod
+    def _als_code(periode):
+        if isinstance(periode, (int, np.integer)) and periode >= 1_000_000:
+            return int(periode)
+        code = parseer_perioden([periode]).iloc[0]
+        if pd.isna(code):
+            raise ValueError(f"Onbekende periode: {periode!r}")
+        return int(code)
+
+    def perioden(self, soort=None):
+        """De unieke periodecodes (gesorteerd), eventueel van één soort."""
+        return self._per_soort[soort][2]
+
+    @staticmethod
+    def _einde_code(code):
+        """Hoogste code van een periode die begint vóór het einde van de periode `code`."""
+        lengte = MAANDEN_PER_SOORT[code % 10]
+        eindmaand = code // 10 % 100 + lengte - 1
+        return int(maak_codes(code // 1000, eindmaand, MAAND))
+
+    def bereik(self, van=None, tot=None, soort=None):
+        """
+        Rijposities met een periode die begint tussen het begin van `van` en het einde van
+        `tot` (beide inclusief). Met `tot='2024'` vallen dus ook 'm12y2024' en '2024KW04' binnen
+        het bereik.
+
+        Args:
+            van, tot (optional): Perioden in een bekende notatie of als code, bijv. '2020' of 'm6y2025'
+            soort (int, optional): Alleen perioden van deze soort, bijv. `JAAR`
+        """
+        codes, posities, _ = self._per_soort[soort]
+        links = 0 if van is None else np.searchsorted(codes, self._als_code(van), side="left")
+        rechts = len(codes) if tot is None else np.searchsorted(codes, self._einde_code(self._als_code(tot)), side="right")
+        return np.sort(posities[links:rechts])
+
+    def laatste(self, n=1, soort=None):
+        """Rijposities van de laatste `n` (verschillende) perioden, eventueel van één soort."""
+        codes, posities, uniek = self._per_soort[soort]
+        if n <= 0 or not len(uniek):
+            return np.array([], dtype=np.int64)
+        grens = uniek[-min(n, len(uniek))]
+        return np.sort(posities[np.searchsorted(codes, grens, side="left"):])
+
+    def gelijk_aan(self, periode):
+        """Rijposities met precies deze periode."""
+        code = self._als_code(periode)
+        codes, posities, _ = self._per_soort[None]
+        return np.sort(posities[np.searchsorted(codes, code, "left"):np.searchsorted(codes, code, "right")])
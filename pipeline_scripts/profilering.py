@@ -0,0 +1,300 @@
+"""
+Meting van looptijd, geheugengebruik, rijen en gelezen bytes per verwerkingsstap.
+
+Gebruik als decorator of als context manager:
+
+    @meet_stap
+    def transformeer_cbs_data(df, geolevel, hele_jaren=False):
+        ...
+
+    with meet("woningtekort inlezen"):
+        ...
+
+Elke meting wordt bewaard in het geheugen en, als `PROFIEL_BESTAND` is ingesteld
+(zie `start_profiel`), als één JSON-regel aan dat bestand toegevoegd. Werkprocessen
+erven de omgevingsvariabele en schrijven dus naar hetzelfde bestand.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:  # psutil is optioneel
+    psutil = None
+
+# Metingen van het huidige proces, in volgorde van afronden
+METINGEN = []
+
+# Naam van de meting waarbinnen de huidige meting valt (voor geneste stappen)
+_BOVENLIGGEND = contextvars.ContextVar("bovenliggend", default=None)
+
+# Interval in seconden waarmee het werkgeheugen tijdens lopende metingen wordt bemonsterd
+RSS_INTERVAL = 0.01
+
+
+def _huidige_rss_mb():
+    """
+    Huidig werkgeheugen (resident set size) van het proces in MB, of None als dat op dit
+    platform niet bekend is. Bewust niet de piek over de hele levensduur van het proces
+    (`ru_maxrss`): die zegt in een langlopend werkproces niets over één stap.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    return None
+
+
+def _gelezen_bytes():
+    """
+    Totaal aantal bytes dat het proces tot nu toe heeft gelezen (bestanden én netwerk),
+    of None als dat op dit platform niet bekend is.
+    """
+    if psutil is not None:
+        try:
+            io = psutil.Process().io_counters()
+            return getattr(io, "read_chars", io.read_bytes)
+        except (AttributeError, psutil.Error):
+            pass
+    try:
+        with open("/proc/self/io", "r") as f:
+            for regel in f:
+                if regel.startswith("rchar:"):
+                    return int(regel.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _tel_rijen(waarde):
+    """Telt het aantal rijen in een DataFrame, of in een tuple/lijst/dict van DataFrames."""
+    if isinstance(waarde, (pd.DataFrame, pd.Series)):
+        return len(waarde)
+    if isinstance(waarde, dict):
+        waarde = list(waarde.values())
+    if isinstance(waarde, (list, tuple)):
+        aantallen = [_tel_rijen(item) for item in waarde]
+        aantallen = [aantal for aantal in aantallen if aantal is not None]
+        return sum(aantallen) if aantallen else None
+    return None
+
+
+def _schrijf_meting(meting):
+    METINGEN.append(meting)
+    profiel_bestand = os.environ.get("PROFIEL_BESTAND")
+    if profiel_bestand:
+        # Eén korte regel per meting; meerdere processen kunnen veilig aan hetzelfde bestand toevoegen
+        with open(profiel_bestand, "a", encoding="utf-8") as f:
+            f.write(json.dumps(meting, default=str) + "\n")
+
+
+class Meting:
+    """Houdt de rijen en de piek van het werkgeheugen van een lopende meting bij; zie `meet`."""
+
+    def __init__(self):
+        self.rijen_in = None
+        self.rijen_uit = None
+        self.rss_piek = None
+
+
+class _RssBemonstering:
+    """
+    Achtergrondthread die de RSS van het proces bemonstert zolang er metingen lopen, en per
+    lopende meting de hoogste waarde bijhoudt. Na een fork begint het kindproces met een
+    eigen, lege bemonstering.
+    """
+
+    def __init__(self):
+        self._slot = threading.Condition()
+        self._actief = set()
+        self._thread = None
+
+    def registreer(self, meting, rss):
+        """Neemt een gemeten RSS mee in de piek van `meting`."""
+        if rss is None:
+            return
+        with self._slot:
+            self._verhoog(meting, rss)
+
+    @staticmethod
+    def _verhoog(meting, rss):
+        meting.rss_piek = rss if meting.rss_piek is None else max(meting.rss_piek, rss)
+
+    def start(self, meting):
+        with self._slot:
+            self._actief.add(meting)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._bemonster, name="rss-bemonstering", daemon=True)
+                self._thread.start()
+            self._slot.notify()
+
+    def stop(self, meting):
+        with self._slot:
+            self._actief.discard(meting)
+
+    def _bemonster(self):
+        while True:
+            with self._slot:
+                while not self._actief:
+                    self._slot.wait()
+            rss = _huidige_rss_mb()
+            if rss is not None:
+                with self._slot:
+                    for meting in self._actief:
+                        self._verhoog(meting, rss)
+            time.sleep(RSS_INTERVAL)
+
+    def na_fork(self):
+        self.__init__()
+
+
+_BEMONSTERING = _RssBemonstering()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_BEMONSTERING.na_fork)
+
+
+@contextmanager
+def meet(naam, rijen_in=None):
+    """
+    Context manager die looptijd, werkgeheugen, gelezen bytes en (optioneel) rijen meet.
+
+    Het werkgeheugen wordt vastgelegd als de RSS bij de start van de stap (`rss_start_mb`),
+    de groei tijdens de stap (`rss_groei_mb`, RSS aan het eind min die bij de start) en de
+    hoogste RSS tijdens de stap (`rss_piek_mb`). De piek wordt elke `RSS_INTERVAL` seconden
+    door een achtergrondthread bemonsterd, zodat ook geheugen dat binnen de stap weer wordt
+    vrijgegeven meetelt; pieken korter dan het interval kunnen gemist worden.
+
+    Args:
+        naam (str): Naam van de stap, bijv. 'preprocessing.transformeer_cbs_data'
+        rijen_in (int, optional): Aantal invoerrijen
+
+    Yields:
+        Meting: Object waarop `rijen_uit` (en eventueel `rijen_in`) gezet kan worden
+    """
+    meting = Meting()
+    meting.rijen_in = rijen_in
+    bovenliggend = _BOVENLIGGEND.get()
+    token = _BOVENLIGGEND.set(naam)
+    bytes_start = _gelezen_bytes()
+    rss_start = _huidige_rss_mb()
+    if rss_start is not None:
+        _BEMONSTERING.registreer(meting, rss_start)
+        _BEMONSTERING.start(meting)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield meting
+    except BaseException:
+        status = "fout"
+        raise
+    finally:
+        duur = time.perf_counter() - start
+        bytes_eind = _gelezen_bytes()
+        rss_eind = _huidige_rss_mb()
+        if rss_start is not None:
+            _BEMONSTERING.stop(meting)
+            _BEMONSTERING.registreer(meting, rss_eind)
+        _BOVENLIGGEND.reset(token)
+        _schrijf_meting({
+            "stap": naam,
+            "bovenliggend": bovenliggend,
+            "pid": os.getpid(),
+            "start": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duur_s": round(duur, 4),
+            "rss_start_mb": round(rss_start, 1) if rss_start is not None else None,
+            "rss_groei_mb": round(rss_eind - rss_start, 1) if rss_start is not None and rss_eind is not None else None,
+            "rss_piek_mb": round(meting.rss_piek, 1) if meting.rss_piek is not None else None,
+            "rijen_in": meting.rijen_in,
+            "rijen_uit": meting.rijen_uit,
+            "bytes_gelezen": bytes_eind - bytes_start if bytes_start is not None and bytes_eind is not None else None,
+            "status": status,
+        })
+
+
+def meet_stap(functie=None, *, naam=None):
+    """
+    Decorator die elke aanroep van de functie meet met `meet`. Het aantal rijen van
+    DataFrame-argumenten en van het resultaat wordt automatisch geteld.
+
+    Kan zonder argumenten (`@meet_stap`) of met een eigen naam (`@meet_stap(naam=...)`) worden gebruikt.
+    """
+    def decorator(f):
+        stapnaam = naam or f"{f.__module__}.{f.__name__}"
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            rijen_in = _tel_rijen(list(args) + list(kwargs.values()))
+            with meet(stapnaam, rijen_in=rijen_in) as meting:
+                resultaat = f(*args, **kwargs)
+                meting.rijen_uit = _tel_rijen(resultaat)
+            return resultaat
+        return wrapper
+
+    if functie is not None:
+        return decorator(functie)
+    return decorator
+
+
+def start_profiel(profiel_bestand):
+    """
+    Laat alle metingen (ook die in werkprocessen die hierna gestart worden) als JSON-regels
+    naar `profiel_bestand` schrijven. Een bestaand bestand wordt geleegd.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(profiel_bestand)), exist_ok=True)
+    open(profiel_bestand, "w").close()
+    os.environ["PROFIEL_BESTAND"] = str(profiel_bestand)
+    METINGEN.clear()
+
+
+def lees_profiel(profiel_bestand=None):
+    """Leest de metingen uit een profielbestand (standaard: het actieve bestand, anders de metingen in het geheugen)."""
+    profiel_bestand = profiel_bestand or os.environ.get("PROFIEL_BESTAND")
+    if not profiel_bestand:
+        return pd.DataFrame(METINGEN)
+    with open(profiel_bestand, "r", encoding="utf-8") as f:
+        return pd.DataFrame([json.loads(regel) for regel in f if regel.strip()])
+
+
+def toon_samenvatting(profiel_bestand=None):
+    """
+    Print een samenvattende tabel per stap: aantal aanroepen, totale en maximale looptijd,
+    grootste groei en hoogste piek van de RSS binnen één aanroep, rijen in/uit en gelezen bytes. Gesorteerd op totale looptijd.
+
+    Returns:
+        pd.DataFrame: De samenvatting
+    """
+    metingen = lees_profiel(profiel_bestand)
+    if metingen.empty:
+        print("Geen metingen beschikbaar.")
+        return metingen
+
+    samenvatting = (
+        metingen.groupby("stap")
+        .agg(
+            aanroepen=("duur_s", "size"),
+            totaal_s=("duur_s", "sum"),
+            max_s=("duur_s", "max"),
+            max_rss_groei_mb=("rss_groei_mb", "max"),
+            max_rss_piek_mb=("rss_piek_mb", "max"),
+            rijen_in=("rijen_in", lambda r: r.sum(min_count=1)),
+            rijen_uit=("rijen_uit", lambda r: r.sum(min_count=1)),
+            mb_gelezen=("bytes_gelezen", lambda b: b.sum() / (1024 * 1024)),
+            fouten=("status", lambda s: (s != "ok").sum()),
+        )
+        .astype({"rijen_in": "Int64", "rijen_uit": "Int64"})
+        .sort_values("totaal_s", ascending=False)
+    )
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.2f}".format):
+        print("\nProfiel per stap:")
+        print(samenvatting.to_string())
+    return samenvatting
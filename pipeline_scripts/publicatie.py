@@ -0,0 +1,224 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Map voor de machineleesbare overzichten van de wijzigingen van de laatste run. Die staan
+# bewust niet naast de CSV-bestanden, zodat een run zonder wijzigingen niets in git verandert.
+WIJZIGINGEN_MAP = Path(__file__).resolve().parents[1] / ".cache" / "wijzigingen"
+
+# Decimaalteken in de gepubliceerde CSV-bestanden, tenzij een indicator een ander heeft
+STANDAARD_DECIMAALTEKEN = ','
+
+# Standaardlocatie van de Parquet-dataset met alle gepubliceerde indicatoren
+PARQUET_MAP = Path(__file__).resolve().parents[1] / "publicatie_parquet"
+
+
+def _hash_bytes(inhoud):
+    return hashlib.sha256(inhoud).hexdigest()
+
+
+def _schrijf_csv_indien_gewijzigd(df, bestandspad, decimaalteken=STANDAARD_DECIMAALTEKEN):
+    """
+    Zet het DataFrame om naar de CSV-inhoud zoals die gepubliceerd wordt en schrijft het
+    bestand alleen weg als die inhoud afwijkt van het bestaande bestand.
+
+    Returns:
+        tuple: (status, hash) met status 'toegevoegd', 'gewijzigd' of 'ongewijzigd'
+    """
+    inhoud = df.to_csv(sep=';', decimal=decimaalteken, index=False).encode("utf-8")
+    nieuwe_hash = _hash_bytes(inhoud)
+
+    if os.path.exists(bestandspad):
+        with open(bestandspad, "rb") as f:
+            if _hash_bytes(f.read()) == nieuwe_hash:
+                return "ongewijzigd", nieuwe_hash
+        status = "gewijzigd"
+    else:
+        status = "toegevoegd"
+
+    with open(bestandspad, "wb") as f:
+        f.write(inhoud)
+    return status, nieuwe_hash
+
+
+def schrijf_publicatie_csvs(indicatoren_dict, output_map, max_workers=4, rapport_pad=None, decimaaltekens=None):
+    """
+    Schrijft alle indicatoren weg als CSV-bestanden voor het dataportaal.
+
+    Elk DataFrame wordt opgeslagen als '<indicatorcode>.csv' met ';' als scheidingsteken
+    en ',' als decimaalteken (of dat uit `decimaaltekens`), zonder index. Een bestand wordt alleen (opnieuw) geschreven
+    als de inhoud anders is dan die van het bestaande bestand (vergeleken via een SHA-256
+    hash), zodat ongewijzigde indicatoren niet opnieuw in git of het dataportaal belanden.
+    De bestanden worden gelijktijdig verwerkt.
+
+    Met `rapport_pad` (bijv. '.cache/wijzigingen/<team>.json', zie `WIJZIGINGEN_MAP`) staat
+    na afloop in dat bestand welke indicatoren zijn toegevoegd, gewijzigd of ongewijzigd
+    gebleven, met per indicator de hash van de inhoud.
+
+    Args:
+        indicatoren_dict (dict): Mapping van indicatorcode naar DataFrame
+        output_map (str): Map waarin de CSV-bestanden worden geschreven
+        max_workers (int, optional): Maximaal aantal bestanden dat tegelijk wordt verwerkt
+        rapport_pad (str of Path, optional): Bestand voor het overzicht van de wijzigingen.
+            Standaard wordt het overzicht alleen gemeld, niet weggeschreven.
+        decimaaltekens (dict, optional): Afwijkend decimaalteken per indicatorcode, bijv. {'MO_11a': '.'}
+
+    Returns:
+        dict: Mapping van indicatorcode naar het pad van het (bijgewerkte) bestand
+    """
+    os.makedirs(output_map, exist_ok=True)
+    te_schrijven = {}
+    for indicator, df in indicatoren_dict.items():
+        if not isinstance(df, pd.DataFrame):
+            print(f"Waarschuwing: Indicator {indicator} bevat geen geldig DataFrame en wordt overgeslagen")
+            continue
+        te_schrijven[indicator] = df
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            indicator: pool.submit(
+                _schrijf_csv_indien_gewijzigd, df, os.path.join(output_map, f"{indicator}.csv"),
+                (decimaaltekens or {}).get(indicator, STANDAARD_DECIMAALTEKEN)
+            )
+            for indicator, df in te_schrijven.items()
+        }
+
+        # Meld de bestanden in de volgorde van de indicatoren, niet in de volgorde van afronden
+        paden, wijzigingen, hashes = {}, {"toegevoegd": [], "gewijzigd": [], "ongewijzigd": []}, {}
+        for indicator, future in futures.items():
+            status, hashes[indicator] = future.result()
+            paden[indicator] = os.path.join(output_map, f"{indicator}.csv")
+            wijzigingen[status].append(indicator)
+            if status != "ongewijzigd":
+                print(f"{indicator} opgeslagen als: {paden[indicator]}")
+
+    if wijzigingen["ongewijzigd"]:
+        print(f"Ongewijzigd en niet opnieuw geschreven: {', '.join(wijzigingen['ongewijzigd'])}")
+
+    if rapport_pad:
+        rapport_pad = Path(rapport_pad)
+        rapport_pad.parent.mkdir(parents=True, exist_ok=True)
+        tijdelijk = rapport_pad.with_name(f"{rapport_pad.name}.{os.getpid()}.tmp")
+        with open(tijdelijk, "w", encoding="utf-8") as f:
+            json.dump({"tijdstip": time.strftime("%Y-%m-%dT%H:%M:%S"), **wijzigingen, "hashes": hashes}, f, indent=2)
+        os.replace(tijdelijk, rapport_pad)
+    return paden
+
+
+def _naar_arrow(df):
+    """
+    Zet een DataFrame om naar een Arrow-tabel met behoud van dtypes. Kolommen met
+    gemengde Python-types (bijv. getallen en tekst in één Invoerapplicatie-kolom)
+    kan Arrow niet opslaan; die worden als tekst bewaard.
+    """
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        df = df.copy()
+        for kolom in df.columns:
+            if df[kolom].dtype == object:
+                df[kolom] = df[kolom].map(lambda x: x if pd.isna(x) else str(x)).astype("string")
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def schrijf_publicatie_parquet(indicatoren_dict, team, dataset_map=None):
+    """
+    Schrijft de indicatoren van een team weg naar één gepartitioneerde Parquet-dataset,
+    naast de CSV-bestanden voor het dataportaal.
+
+    De dataset is gepartitioneerd op team en indicatorcode (Hive-stijl), zodat ook andere
+    tools (pyarrow.dataset, DuckDB, Spark) hem direct kunnen lezen:
+
+        <dataset_map>/team=<team>/indicator=<indicatorcode>/part-0.parquet
+
+    Een bestaande partitie van een indicator wordt vervangen.
+
+    Args:
+        indicatoren_dict (dict): Mapping van indicatorcode naar DataFrame
+        team (str): Naam van het team, bijv. 'Leefbare_steden_en_dorpen'
+        dataset_map (str of Path, optional): Root van de dataset. Standaard `PARQUET_MAP`.
+
+    Returns:
+        dict: Mapping van indicatorcode naar het pad van het geschreven bestand
+    """
+    dataset_map = Path(dataset_map) if dataset_map else PARQUET_MAP
+    paden = {}
+    for indicator, df in indicatoren_dict.items():
+        if not isinstance(df, pd.DataFrame):
+            continue
+        partitie = dataset_map / f"team={team}" / f"indicator={indicator}"
+        if partitie.exists():
+            shutil.rmtree(partitie)
+        partitie.mkdir(parents=True)
+        bestandspad = partitie / "part-0.parquet"
+        pq.write_table(_naar_arrow(df), bestandspad)
+        paden[indicator] = str(bestandspad)
+    print(f"{len(paden)} indicatoren opgeslagen in de Parquet-dataset: {dataset_map / f'team={team}'}")
+    return paden
+
+
+def _filterwaarden(waarden, arrow_type):
+    # Zet filterwaarden om naar het type van de kolom, bijv. perioden '2024' -> 2024
+    if pa.types.is_dictionary(arrow_type):
+        # Categorische kolommen (zie pipeline_scripts.schema) filteren op hun waarden
+        arrow_type = arrow_type.value_type
+    if pa.types.is_integer(arrow_type):
+        return [int(w) for w in waarden if str(w).lstrip("-").isdigit()]
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return [str(w) for w in waarden]
+    return list(waarden)
+
+
+def lees_publicatie_parquet(indicatoren=None, teams=None, geoitems=None, perioden=None, dataset_map=None):
+    """
+    Leest een deel van de Parquet-dataset in, zonder tekstbestanden te hoeven parsen.
+
+    Alleen de partities van de gevraagde teams en indicatoren worden geopend; filters op
+    regio (geoitem) en periode worden aan pyarrow doorgegeven.
+
+    Args:
+        indicatoren (list, optional): Indicatorcodes, bijv. ['MO_10a', 'D_40a']. Standaard alle.
+        teams (list, optional): Teamnamen. Standaard alle teams.
+        geoitems (list, optional): Regiocodes, bijv. ['cr37', 'nl00']. Standaard alle regio's.
+        perioden (list, optional): Perioden, bijv. [2024] of ['m6y2025']. Standaard alle perioden.
+        dataset_map (str of Path, optional): Root van de dataset. Standaard `PARQUET_MAP`.
+
+    Returns:
+        dict: Mapping van indicatorcode naar DataFrame (met de oorspronkelijke kolommen en dtypes)
+    """
+    dataset_map = Path(dataset_map) if dataset_map else PARQUET_MAP
+    gevraagd = {code.lower() for code in indicatoren} if indicatoren else None
+
+    resultaat = {}
+    for partitie in sorted(glob.glob(str(dataset_map / "team=*" / "indicator=*"))):
+        team = Path(partitie).parent.name.split("=", 1)[1]
+        indicator = Path(partitie).name.split("=", 1)[1]
+        if teams and team not in teams:
+            continue
+        if gevraagd is not None and indicator.lower() not in gevraagd:
+            continue
+
+        bestanden = sorted(glob.glob(os.path.join(partitie, "*.parquet")))
+        if not bestanden:
+            continue
+        schema = pq.read_schema(bestanden[0])
+        filters = []
+        for kolom, waarden in (("geoitem", geoitems), ("period", perioden)):
+            if waarden is not None and kolom in schema.names:
+                filters.append((kolom, "in", _filterwaarden(waarden, schema.field(kolom).type)))
+
+        df = pd.concat(
+            [pd.read_parquet(bestand, filters=filters or None) for bestand in bestanden],
+            ignore_index=True
+        )
+        resultaat[indicator] = df
+    return resultaat
@@ -0,0 +1,147 @@
+import glob
+import os
+from dataclasses import dataclass, field
+from graphlib import CycleError, TopologicalSorter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+ROOT_MAP = Path(__file__).resolve().parents[1]
+
+
+@dataclass
+class IndicatorStap:
+    """
+    Declaratie van één verwerkingsstap in de indicatorpipeline.
+
+    Een stap leest zijn invoer (bestanden en/of CBS-tabellen), roept een transformatie
+    uit `preprocessing.py` aan en levert één of meer indicatoren op.
+
+    Attributes:
+        naam (str): Unieke naam van de stap, bijv. 'leefbaarometer'
+        indicatoren (list): Indicatorcodes die de stap oplevert, bijv. ['MO_10a', 'D_39a', 'D_39aa']
+        functie (callable): Functie die een `StapContext` krijgt en een dict {indicatorcode: DataFrame} teruggeeft
+        invoer (list): Glob-patronen van invoerbestanden, relatief aan de root van de repository
+        cbs_tabellen (list): CBS-tabelcodes die de stap gebruikt, bijv. ['37230NED']
+        afhankelijk_van (list): Namen van stappen waarvan de resultaten nodig zijn
+        decimaalteken (dict): Decimaalteken per indicator in de gepubliceerde CSV, als dat afwijkt
+            van de standaard ',' (zie `publicatie.schrijf_publicatie_csvs`), bijv. {'MO_11a': '.'}
+    """
+    naam: str
+    indicatoren: List[str]
+    functie: Callable[["StapContext"], Dict[str, pd.DataFrame]]
+    invoer: List[str] = field(default_factory=list)
+    cbs_tabellen: List[str] = field(default_factory=list)
+    afhankelijk_van: List[str] = field(default_factory=list)
+    decimaalteken: Dict[str, str] = field(default_factory=dict)
+
+    def invoer_bestanden(self, root_map=ROOT_MAP):
+        """Geeft de (gesorteerde) bestanden terug die op de invoerpatronen van deze stap passen."""
+        bestanden = set()
+        for patroon in self.invoer:
+            bestanden.update(glob.glob(os.path.join(str(root_map), patroon)))
+        return sorted(bestanden)
+
+
+@dataclass
+class StapContext:
+    """
+    Context die een stap bij het uitvoeren meekrijgt.
+
+    Attributes:
+        root_map (Path): Root van de repository
+        invoer (list): Invoerbestanden van de stap (absolute paden)
+        resultaten (dict): Resultaten van de stappen waarvan deze stap afhankelijk is,
+            als {indicatorcode: DataFrame}
+        max_workers (int, optional): Aantal processen dat de stap zelf mag starten. Standaard
+            None: de stap bepaalt het zelf, en werkt serieel als hij al in een werkproces draait.
+    """
+    root_map: Path
+    invoer: List[str] = field(default_factory=list)
+    resultaten: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    max_workers: Optional[int] = None
+
+    @property
+    def data_map(self):
+        return self.root_map / "data"
+
+    def pad(self, *delen):
+        """Geeft een absoluut pad (als string) terug, relatief aan de root van de repository."""
+        return str(self.root_map.joinpath(*delen))
+
+
+def valideer_stappen(stappen):
+    """
+    Controleert of stapnamen en indicatorcodes uniek zijn en of alle afhankelijkheden bestaan.
+
+    Raises:
+        ValueError: Als een stapnaam of indicatorcode dubbel voorkomt, of een afhankelijkheid ontbreekt
+    """
+    namen, codes = set(), set()
+    for stap in stappen:
+        if stap.naam in namen:
+            raise ValueError(f"De stapnaam '{stap.naam}' komt meerdere keren voor in het register.")
+        namen.add(stap.naam)
+        dubbel = codes.intersection(stap.indicatoren)
+        if dubbel:
+            raise ValueError(f"De indicator(en) {', '.join(sorted(dubbel))} worden door meerdere stappen opgeleverd.")
+        codes.update(stap.indicatoren)
+
+    for stap in stappen:
+        ontbrekend = [naam for naam in stap.afhankelijk_van if naam not in namen]
+        if ontbrekend:
+            raise ValueError(f"Stap '{stap.naam}' is afhankelijk van onbekende stap(pen): {', '.join(ontbrekend)}")
+
+
+def selecteer_stappen(stappen, selectie=None):
+    """
+    Bepaalt welke stappen uitgevoerd moeten worden voor de gevraagde indicatoren of stappen,
+    inclusief alle (indirecte) afhankelijkheden.
+
+    Args:
+        stappen (list van IndicatorStap): Alle stappen in het register
+        selectie (list, optional): Indicatorcodes en/of stapnamen. Standaard alle stappen.
+
+    Returns:
+        list van IndicatorStap: De benodigde stappen in een geldige uitvoervolgorde
+
+    Raises:
+        KeyError: Als een gevraagde indicator of stap niet in het register voorkomt
+        ValueError: Als de afhankelijkheden een cyclus bevatten
+    """
+    valideer_stappen(stappen)
+    per_naam = {stap.naam: stap for stap in stappen}
+    per_indicator = {code.lower(): stap.naam for stap in stappen for code in stap.indicatoren}
+
+    if selectie:
+        te_doen = []
+        for item in selectie:
+            if item in per_naam:
+                te_doen.append(item)
+            elif item.lower() in per_indicator:
+                te_doen.append(per_indicator[item.lower()])
+            else:
+                raise KeyError(f"'{item}' is geen bekende indicator of stap in het register.")
+    else:
+        te_doen = list(per_naam)
+
+    # Voeg alle (indirecte) afhankelijkheden toe
+    benodigd = set()
+    while te_doen:
+        naam = te_doen.pop()
+        if naam not in benodigd:
+            benodigd.add(naam)
+            te_doen.extend(per_naam[naam].afhankelijk_van)
+
+    # Sorteer topologisch; bij gelijke rang in de volgorde van het register
+    graaf = TopologicalSorter({naam: per_naam[naam].afhankelijk_van for naam in benodigd})
+    try:
+        volgorde = list(graaf.static_order())
+    except CycleError as fout:
+        raise ValueError(f"De afhankelijkheden in het register bevatten een cyclus: {fout.args[1]}")
+    niveaus = {}
+    for naam in volgorde:
+        niveaus[naam] = 1 + max((niveaus[dep] for dep in per_naam[naam].afhankelijk_van), default=-1)
+    register_volgorde = {stap.naam: i for i, stap in enumerate(stappen)}
+    return [per_naam[naam] for naam in sorted(benodigd, key=lambda n: (niveaus[n], register_volgorde[n]))]
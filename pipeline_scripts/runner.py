@@ -0,0 +1,460 @@
+"""
+Runner voor de indicatorpipelines van de datateams.
+
+Vindt de teams in 'teams/' die een indicatorregister hebben ('teams/<team>/transformaties/
+indicatoren.py'), bepaalt welke stappen nodig zijn voor de gevraagde indicatoren en voert
+die in de juiste volgorde uit. Voorbeelden (vanuit de root van de repository):
+
+    python -m pipeline_scripts.runner                                   # alle teams
+    python -m pipeline_scripts.runner --team Leefbare_steden_en_dorpen
+    python -m pipeline_scripts.runner --team Leefbare_steden_en_dorpen MO_11a R_118a
+    python -m pipeline_scripts.runner --lijst
+    python -m pipeline_scripts.runner --forceer
+
+Stappen waarvan de invoerbestanden, CBS-tabellen en transformatiecode sinds de vorige
+run niet zijn gewijzigd, worden overgeslagen; hun vorige uitvoer wordt hergebruikt.
+
+Onafhankelijke stappen, ook van verschillende teams, worden parallel in dezelfde pool van
+processen uitgevoerd (`--max-workers`). Zo delen de teams in elk proces de eenmaal ingelezen
+referentiedata, en via '.cache/' de gedownloade CBS-tabellen en ingelezen bronbestanden.
+De uitvoer van elke stap komt in '.cache/logs/<team>/<stap>.log'. Mislukt een stap, dan
+worden alleen de stappen die ervan afhankelijk zijn overgeslagen; de rest gaat door.
+"""
+import argparse
+import contextlib
+import importlib.util
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from graphlib import TopologicalSorter
+from pathlib import Path
+
+import pandas as pd
+
+from pipeline_scripts.manifest import BuildManifest, bereken_vingerafdruk
+from pipeline_scripts.profilering import meet, start_profiel, toon_samenvatting
+from pipeline_scripts.publicatie import (
+    PARQUET_MAP, WIJZIGINGEN_MAP, schrijf_publicatie_csvs, schrijf_publicatie_parquet
+)
+from pipeline_scripts.registry import ROOT_MAP, StapContext, selecteer_stappen
+
+TEAMS_MAP = ROOT_MAP / "teams"
+LOG_MAP = ROOT_MAP / ".cache" / "logs"
+PROFIEL_MAP = ROOT_MAP / ".cache" / "profiel"
+
+# Per proces: de geladen registers en de eigen modules (bijv. `preprocessing`, `helpers`) per team
+_REGISTERS = {}
+_TEAM_MODULES = {}
+
+
+def team_map(team):
+    return TEAMS_MAP / team / "transformaties"
+
+
+def ontdek_teams(teams_map=TEAMS_MAP):
+    """Geeft (alfabetisch) de teams terug die een indicatorregister 'transformaties/indicatoren.py' hebben."""
+    return sorted(pad.parents[1].name for pad in Path(teams_map).glob("*/transformaties/indicatoren.py"))
+
+
+def lees_team_metadata(team):
+    """
+    Leest 'teams/<team>/metadata.csv' met de beschrijving van de indicatoren van het team.
+
+    Returns:
+        pd.DataFrame: De metadata, of None als het team geen metadata.csv heeft
+    """
+    pad = TEAMS_MAP / team / "metadata.csv"
+    if not pad.exists():
+        return None
+    # Het bestand is een Excel-export in Windows-codering (cp1252)
+    metadata = pd.read_csv(pad, sep=";", dtype=str, encoding="cp1252")
+    # De regels eindigen op ';', wat een lege laatste kolom oplevert
+    return metadata.loc[:, ~metadata.columns.str.startswith("Unnamed")]
+
+
+def controleer_metadata(team, stappen):
+    """
+    Meldt welke indicatoren uit het register (nog) niet in de metadata.csv van het team staan.
+
+    Returns:
+        list: De indicatorcodes zonder metadata
+    """
+    metadata = lees_team_metadata(team)
+    if metadata is None:
+        print(f"Waarschuwing: Het team '{team}' heeft geen metadata.csv")
+        return [code for stap in stappen for code in stap.indicatoren]
+    bekend = {code.lower() for code in metadata["Indicator code"].dropna()}
+    ontbrekend = [code for stap in stappen for code in stap.indicatoren if code.lower() not in bekend]
+    if ontbrekend:
+        print(f"Waarschuwing: Indicatoren van '{team}' zonder regel in metadata.csv: {', '.join(ontbrekend)}")
+    return ontbrekend
+
+
+def _module_van_team(module, map_):
+    bestand = getattr(module, "__file__", None)
+    return bool(bestand) and Path(bestand).resolve().is_relative_to(map_.resolve())
+
+
+def _activeer_team(team):
+    """
+    Maakt de modules van een team actief: zijn transformatiemap staat vooraan in `sys.path`
+    en `sys.modules` bevat zijn eigen `preprocessing`, `helpers` e.d. Teams gebruiken dezelfde
+    modulenamen; zonder deze wissel zou een tweede team in hetzelfde proces de modules van
+    het eerste team importeren.
+    """
+    eigen_map = str(team_map(team))
+    andere_mappen = {str(team_map(ander)) for ander in _TEAM_MODULES if ander != team}
+    sys.path[:] = [pad for pad in sys.path if pad not in andere_mappen and pad != eigen_map]
+    sys.path.insert(0, eigen_map)
+    if str(ROOT_MAP) not in sys.path:
+        sys.path.insert(1, str(ROOT_MAP))
+
+    for naam, module in list(sys.modules.items()):
+        if _module_van_team(module, TEAMS_MAP) and not _module_van_team(module, team_map(team)):
+            del sys.modules[naam]
+    sys.modules.update(_TEAM_MODULES.get(team, {}))
+
+
+def laad_team_register(team, herlaad=False):
+    """
+    Importeert het indicatorregister van een team en geeft de gedeclareerde stappen terug.
+
+    De transformatiemap van het team wordt vooraan in `sys.path` gezet, zodat het register
+    (net als de notebooks) `preprocessing` en `helpers` direct kan importeren. Per proces
+    wordt een register één keer geladen; de modules van verschillende teams blijven gescheiden.
+
+    Args:
+        team (str): Naam van de teammap
+        herlaad (bool, optional): Laad het register en de modules van het team opnieuw van schijf
+
+    Raises:
+        FileNotFoundError: Als het team geen 'indicatoren.py' heeft
+    """
+    register_pad = team_map(team) / "indicatoren.py"
+    if not register_pad.exists():
+        raise FileNotFoundError(f"Het team '{team}' heeft geen indicatorregister op het pad: {register_pad}")
+
+    _activeer_team(team)
+    if team in _REGISTERS and not herlaad:
+        return _REGISTERS[team]
+    for naam in _TEAM_MODULES.pop(team, {}):
+        sys.modules.pop(naam, None)
+
+    spec = importlib.util.spec_from_file_location(f"indicatoren_{team}", register_pad)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    _TEAM_MODULES[team] = {
+        naam: module for naam, module in sys.modules.items() if _module_van_team(module, team_map(team))
+    }
+    _REGISTERS[team] = module.STAPPEN
+    return module.STAPPEN
+
+
+def voer_stap_uit(stap, resultaten=None):
+    """
+    Voert één stap uit en controleert of de opgeleverde indicatoren geldige DataFrames zijn.
+
+    Returns:
+        dict: Mapping van indicatorcode naar DataFrame
+    """
+    context = StapContext(
+        root_map=ROOT_MAP,
+        invoer=stap.invoer_bestanden(ROOT_MAP),
+        resultaten=dict(resultaten or {}),
+    )
+    uitvoer = stap.functie(context)
+
+    for code, df in uitvoer.items():
+        if code not in stap.indicatoren:
+            raise KeyError(f"Stap '{stap.naam}' levert de niet-gedeclareerde indicator '{code}' op.")
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError(f"Stap '{stap.naam}' levert voor indicator '{code}' geen DataFrame op.")
+    return uitvoer
+
+
+def _voer_stap_uit_met_log(team, stap_naam, resultaten, log_pad, profiel_bestand=None):
+    """
+    Voert één stap uit (in een apart proces) en schrijft alle uitvoer en waarschuwingen
+    van de stap naar `log_pad`. Aan het proces worden alleen namen meegegeven; het
+    register wordt in het proces zelf opnieuw geladen.
+    """
+    if profiel_bestand:
+        # Een hergebruikt proces (zie de watch-modus) kent het profiel van deze run nog niet
+        os.environ["PROFIEL_BESTAND"] = str(profiel_bestand)
+    os.makedirs(os.path.dirname(log_pad), exist_ok=True)
+    with open(log_pad, "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        stap = next(stap for stap in laad_team_register(team) if stap.naam == stap_naam)
+        print(f"Stap '{stap_naam}' gestart om {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        start = time.perf_counter()
+        try:
+            with meet(f"stap:{stap_naam}") as meting:
+                uitvoer = voer_stap_uit(stap, resultaten)
+                meting.rijen_uit = sum(len(df) for df in uitvoer.values())
+        except Exception:
+            traceback.print_exc()
+            raise
+        print(f"Stap '{stap_naam}' klaar in {time.perf_counter() - start:.1f} s")
+    return uitvoer
+
+
+def _selecteer_per_team(teams, selectie):
+    """
+    Bepaalt per team de uit te voeren stappen. Bij meerdere teams wordt elke indicatorcode
+    of stapnaam uit de selectie gezocht in het register van elk team.
+
+    De selectie kan ook per team worden opgegeven, als {team: [stapnamen of indicatorcodes]};
+    dan worden alleen de teams in die mapping uitgevoerd.
+
+    Raises:
+        KeyError: Als een gevraagde indicator of stap bij geen enkel team voorkomt
+    """
+    if isinstance(selectie, dict):
+        return {
+            team: selecteer_stappen(laad_team_register(team), selectie[team]) for team in teams if team in selectie
+        }
+    if not selectie or len(teams) == 1:
+        return {team: selecteer_stappen(laad_team_register(team), selectie) for team in teams}
+
+    per_team, gevonden = {}, set()
+    for team in teams:
+        stappen = laad_team_register(team)
+        bekend = {stap.naam for stap in stappen} | {code.lower() for stap in stappen for code in stap.indicatoren}
+        eigen = [item for item in selectie if item in bekend or item.lower() in bekend]
+        gevonden.update(eigen)
+        if eigen:
+            per_team[team] = selecteer_stappen(stappen, eigen)
+    onbekend = [item for item in selectie if item not in gevonden]
+    if onbekend:
+        raise KeyError(f"{', '.join(repr(item) for item in onbekend)} is geen bekende indicator of stap in de registers.")
+    return per_team
+
+
+def voer_teams_uit(
+    teams=None, selectie=None, output_maps=None, schrijf=True, forceer=False, manifest_map=None, max_workers=None,
+    parquet_map=None, pool=None
+):
+    """
+    Voert de pipelines van één of meer teams uit voor de gevraagde indicatoren (of alle indicatoren).
+
+    De stappen van alle teams worden samen ingepland in één pool van processen. Stappen die
+    niet van elkaar afhankelijk zijn, lopen parallel. De processen worden hergebruikt, zodat
+    referentiedata (zoals de buurtcodes) per proces maar één keer wordt ingelezen, ook als
+    meerdere teams die nodig hebben. Mislukt een stap, dan worden de stappen die ervan
+    afhankelijk zijn overgeslagen; de overige stappen worden gewoon afgerond en weggeschreven.
+
+    Args:
+        teams (list, optional): Namen van teammappen. Standaard alle teams met een indicatorregister.
+        selectie (list of dict, optional): Indicatorcodes en/of stapnamen, eventueel per team
+            als {team: [...]}. Standaard alle stappen.
+        output_maps (dict, optional): Map voor de CSV-bestanden per team. Standaard 'publicatie_bestanden/<team>'.
+        schrijf (bool, optional): Schrijf de indicatoren weg als CSV indien `True`.
+        forceer (bool, optional): Voer alle geselecteerde stappen uit, ook als ze niet gewijzigd zijn.
+        manifest_map (str, optional): Map van de build-manifesten. Standaard '.cache/manifest'.
+        max_workers (int, optional): Maximaal aantal parallelle processen. Standaard het aantal cores.
+        parquet_map (str, optional): Schrijf de indicatoren ook naar de Parquet-dataset in deze map.
+        pool (ProcessPoolExecutor, optional): Bestaande pool waarvan de processen (en hun ingelezen
+            referentiedata) hergebruikt worden, zoals in de watch-modus. Standaard een nieuwe pool.
+
+    Returns:
+        dict: Per team een mapping van indicatorcode naar DataFrame
+
+    Raises:
+        FileNotFoundError: Als er geen teams met een indicatorregister zijn
+        RuntimeError: Als één of meer stappen mislukt zijn (nadat de overige stappen zijn afgerond)
+    """
+    teams = list(teams or ontdek_teams())
+    if not teams:
+        raise FileNotFoundError(f"Geen teams met een indicatorregister gevonden in {TEAMS_MAP}")
+    meerdere_teams = len(teams) > 1
+    stappen_per_team = _selecteer_per_team(teams, selectie)
+    teams = list(stappen_per_team)
+
+    output_maps = {
+        team: (output_maps or {}).get(team) or str(ROOT_MAP / "publicatie_bestanden" / team) for team in teams
+    }
+    manifesten = {team: BuildManifest(team, manifest_map) for team in teams}
+    per_stap = {(team, stap.naam): stap for team, stappen in stappen_per_team.items() for stap in stappen}
+    profiel_bestand = PROFIEL_MAP / ("alle_teams" if meerdere_teams else teams[0]) / f"{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+    start_profiel(profiel_bestand)
+
+    def label(sleutel):
+        return f"{sleutel[0]}/{sleutel[1]}" if meerdere_teams else sleutel[1]
+
+    if meerdere_teams:
+        for team in teams:
+            controleer_metadata(team, stappen_per_team[team])
+
+    # Vingerafdrukken in uitvoervolgorde, zodat die van afhankelijkheden al bekend zijn
+    vingerafdrukken = {}
+    for team, stappen in stappen_per_team.items():
+        _activeer_team(team)
+        for stap in stappen:
+            vingerafdrukken[(team, stap.naam)] = bereken_vingerafdruk(
+                stap, ROOT_MAP, {naam: vingerafdrukken[(team, naam)]["hash"] for naam in stap.afhankelijk_van}
+            )
+
+    indicatoren_per_team = {team: {} for team in teams}
+    mislukt, overgeslagen = {}, []
+    graaf = TopologicalSorter({
+        sleutel: [(sleutel[0], dep) for dep in stap.afhankelijk_van] for sleutel, stap in per_stap.items()
+    })
+    graaf.prepare()
+
+    def start_stap(sleutel):
+        team, naam = sleutel
+        stap = per_stap[sleutel]
+        indicatoren_dict = indicatoren_per_team[team]
+        voorvoegsel = f"[{team}] " if meerdere_teams else ""
+        if any((team, dep) in mislukt or (team, dep) in overgeslagen for dep in stap.afhankelijk_van):
+            print(f"{voorvoegsel}Overgeslagen (afhankelijkheid mislukt): {', '.join(stap.indicatoren)}")
+            overgeslagen.append(sleutel)
+            return None
+        schrijf_map = output_maps[team] if schrijf else None
+        if not forceer and manifesten[team].is_actueel(stap, vingerafdrukken[sleutel], schrijf_map):
+            print(f"{voorvoegsel}Ongewijzigd, vorige uitvoer hergebruikt: {', '.join(stap.indicatoren)}")
+            indicatoren_dict.update(manifesten[team].laad_uitvoer(stap))
+            return None
+        print(f"{voorvoegsel}Processing indicators: {', '.join(stap.indicatoren)}")
+        resultaten = {
+            code: indicatoren_dict[code]
+            for dep in stap.afhankelijk_van for code in per_stap[(team, dep)].indicatoren if code in indicatoren_dict
+        }
+        return pool.submit(_voer_stap_uit_met_log, team, naam, resultaten, str(LOG_MAP / team / f"{naam}.log"), profiel_bestand)
+
+    max_workers = max_workers or min(len(per_stap), os.cpu_count() or 1) or 1
+    with contextlib.nullcontext(pool) if pool else ProcessPoolExecutor(max_workers=max_workers) as pool:
+        lopend = {}
+        while graaf.is_active():
+            for sleutel in graaf.get_ready():
+                future = start_stap(sleutel)
+                if future is None:
+                    graaf.done(sleutel)
+                else:
+                    lopend[future] = sleutel
+            if not lopend:
+                continue
+
+            klaar, _ = wait(lopend, return_when=FIRST_COMPLETED)
+            for future in klaar:
+                sleutel = lopend.pop(future)
+                team, naam = sleutel
+                try:
+                    uitvoer = future.result()
+                except Exception as e:
+                    print(f"Fout in stap '{label(sleutel)}': {e} (zie {LOG_MAP / team / f'{naam}.log'})")
+                    mislukt[sleutel] = e
+                else:
+                    manifesten[team].registreer(per_stap[sleutel], vingerafdrukken[sleutel], uitvoer)
+                    indicatoren_per_team[team].update(uitvoer)
+                graaf.done(sleutel)
+
+    for team, stappen in stappen_per_team.items():
+        # Zet de indicatoren in de volgorde van het register, ongeacht welke stap het eerst klaar was
+        volgorde = [code for stap in stappen for code in stap.indicatoren]
+        indicatoren_dict = {code: indicatoren_per_team[team][code] for code in volgorde if code in indicatoren_per_team[team]}
+        indicatoren_per_team[team] = indicatoren_dict
+
+        print(f"\nControle van indicator dictionary{f' ({team})' if meerdere_teams else ''}:")
+        for key, value in indicatoren_dict.items():
+            print(f"Indicator {key}, bevat een DataFrame met shape {value.shape}")
+
+        if schrijf:
+            # Alleen indicatoren waarvan de inhoud is veranderd, worden opnieuw weggeschreven
+            print("\nData wegschrijven naar bestanden...")
+            schrijf_publicatie_csvs(
+                indicatoren_dict, output_maps[team], rapport_pad=WIJZIGINGEN_MAP / f"{team}.json",
+                decimaaltekens={code: teken for stap in stappen for code, teken in stap.decimaalteken.items()}
+            )
+            manifesten[team].markeer_gepubliceerd(
+                [stap.naam for stap in stappen if (team, stap.naam) not in mislukt and (team, stap.naam) not in overgeslagen],
+                output_maps[team]
+            )
+        if parquet_map:
+            schrijf_publicatie_parquet(indicatoren_dict, team, parquet_map)
+
+    toon_samenvatting(profiel_bestand)
+    print(f"Metingen per stap opgeslagen in: {profiel_bestand}")
+
+    if mislukt:
+        raise RuntimeError(
+            f"De volgende stappen zijn mislukt: {', '.join(label(sleutel) for sleutel in mislukt)}"
+            + (f"; overgeslagen: {', '.join(label(sleutel) for sleutel in overgeslagen)}" if overgeslagen else "")
+            + f". Zie de logbestanden in {LOG_MAP if meerdere_teams else LOG_MAP / teams[0]}."
+        )
+    return indicatoren_per_team
+
+
+def voer_team_uit(
+    team, selectie=None, output_map=None, schrijf=True, forceer=False, manifest_map=None, max_workers=None,
+    parquet_map=None
+):
+    """
+    Voert de pipeline van één team uit voor de gevraagde indicatoren (of alle indicatoren).
+    Zie `voer_teams_uit`.
+
+    Args:
+        team (str): Naam van de teammap, bijv. 'Leefbare_steden_en_dorpen'
+        selectie (list, optional): Indicatorcodes en/of stapnamen. Standaard alle stappen.
+        output_map (str, optional): Map voor de CSV-bestanden. Standaard 'publicatie_bestanden/<team>'.
+        schrijf (bool, optional): Schrijf de indicatoren weg als CSV indien `True`.
+        forceer (bool, optional): Voer alle geselecteerde stappen uit, ook als ze niet gewijzigd zijn.
+        manifest_map (str, optional): Map van het build-manifest. Standaard '.cache/manifest'.
+        max_workers (int, optional): Maximaal aantal parallelle processen. Standaard het aantal cores.
+        parquet_map (str, optional): Schrijf de indicatoren ook naar de Parquet-dataset in deze map.
+
+    Returns:
+        dict: Mapping van indicatorcode naar DataFrame
+
+    Raises:
+        RuntimeError: Als één of meer stappen mislukt zijn (nadat de overige stappen zijn afgerond)
+    """
+    return voer_teams_uit(
+        [team], selectie, output_maps={team: output_map} if output_map else None, schrijf=schrijf, forceer=forceer,
+        manifest_map=manifest_map, max_workers=max_workers, parquet_map=parquet_map,
+    )[team]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("selectie", nargs="*", help="Indicatorcodes of stapnamen (standaard: alles)")
+    parser.add_argument(
+        "--team", action="append", dest="teams",
+        help="Naam van de teammap onder teams/ (meerdere keren mogelijk; standaard alle teams)"
+    )
+    parser.add_argument("--output-map", help="Map voor de CSV-bestanden bij één team (standaard publicatie_bestanden/<team>)")
+    parser.add_argument(
+        "--parquet", nargs="?", const=str(PARQUET_MAP), metavar="MAP",
+        help=f"Schrijf de indicatoren ook naar een gepartitioneerde Parquet-dataset (standaard {PARQUET_MAP.name}/)"
+    )
+    parser.add_argument("--geen-output", action="store_true", help="Schrijf geen CSV-bestanden weg")
+    parser.add_argument("--max-workers", type=int, help="Maximaal aantal parallelle processen (standaard: aantal cores)")
+    parser.add_argument("--forceer", action="store_true", help="Voer alle stappen uit, ook als ze ongewijzigd zijn")
+    parser.add_argument("--lijst", action="store_true", help="Toon de teams, stappen en indicatoren in de registers")
+    args = parser.parse_args(argv)
+
+    teams = args.teams or ontdek_teams()
+    if args.output_map and len(teams) != 1:
+        parser.error("--output-map kan alleen met één team (--team) worden gebruikt")
+
+    if args.lijst:
+        for team, stappen in _selecteer_per_team(teams, args.selectie).items():
+            if len(teams) > 1:
+                print(f"{team}:")
+            for stap in stappen:
+                afhankelijk = f" (na: {', '.join(stap.afhankelijk_van)})" if stap.afhankelijk_van else ""
+                print(f"{'  ' if len(teams) > 1 else ''}{stap.naam}: {', '.join(stap.indicatoren)}{afhankelijk}")
+            controleer_metadata(team, stappen)
+        return
+
+    voer_teams_uit(
+        teams, args.selectie, output_maps={teams[0]: args.output_map} if args.output_map else None,
+        schrijf=not args.geen_output, forceer=args.forceer, max_workers=args.max_workers, parquet_map=args.parquet,
+    )
+
+
+if __name__ == "__main__":
+    main()
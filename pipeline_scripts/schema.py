@@ -0,0 +1,143 @@
+"""
+Gedeeld schema voor indicatortabellen in lang formaat.
+
+Alle indicatoren hebben de kolommen 'geoitem', 'geolevel' en 'period', en eventueel
+dimensiekolommen ('dim_*'). Als tekstkolom staat dezelfde waarde (bijv. 'corop_id') op
+elke rij opnieuw in het geheugen; als categorie wordt elke waarde één keer bewaard en
+per rij alleen een kleine gehele code. Op buurtniveau scheelt dat een veelvoud aan geheugen.
+
+De categorieën van 'geoitem' en 'geolevel' liggen vast (uit de geografische referentie),
+zodat tabellen van verschillende stappen dezelfde codes gebruiken en `pd.concat` ze als
+categorie samenvoegt. Waarden die niet in de vaste categorieën voorkomen, worden achteraan
+toegevoegd. De inhoud (en dus de gepubliceerde CSV) verandert niet.
+
+    from pipeline_scripts.schema import pas_indicator_schema_toe
+
+    df = pas_indicator_schema_toe(df)
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from pipeline_scripts.geo_referentie import GEO_HIERARCHIE, laad_geo_referentie
+from pipeline_scripts.periode import sorteer_perioden
+
+# Vaste geografische niveaus van het dataportaal, van hoog naar laag
+GEOLEVELS = [
+    "nederland",
+    "prov_id",
+    "prov_code",
+    "corop_id",
+    "corop_code",
+    "gemeente_id",
+    "wijk_id",
+    "buurt_id",
+]
+
+# Prefix van dimensiekolommen, bijv. 'dim_tevredenheid_1'
+DIMENSIE_PREFIX = "dim_"
+
+
+@lru_cache(maxsize=None)
+def geoitem_categorieen():
+    """
+    Vaste categorieën voor 'geoitem': Nederland en alle provincie-, COROP-, gemeente-,
+    wijk- en buurtcodes uit de geografische referentie, in kleine letters (bijv. 'pv31',
+    'cr37', 'gm0889'). Is de referentie niet beschikbaar, dan alleen 'nl00'.
+    """
+    codes = ["nl00"]
+    try:
+        geo_referentie = laad_geo_referentie()
+        for niveau in reversed(GEO_HIERARCHIE):
+            niveau_codes = geo_referentie.niveau_mapping(niveau).dropna().astype(str).str.lower()
+            codes.extend(sorted(niveau_codes.unique()))
+    except (FileNotFoundError, KeyError) as e:
+        print(f"Waarschuwing: Geografische referentie niet beschikbaar voor het indicatorschema: {e}")
+    return tuple(dict.fromkeys(codes))
+
+
+def _sorteer(waarden):
+    # Waarden kunnen getallen en tekst door elkaar bevatten (bijv. 2024 en 'm6y2025')
+    try:
+        return sorted(waarden)
+    except TypeError:
+        return sorted(waarden, key=str)
+
+
+def als_categorie(reeks, vaste_categorieen=None, sorteer=_sorteer):
+    """
+    Zet een Series om naar een categorische Series. De vaste categorieën komen eerst (in
+    de gegeven volgorde), daarna de overige waarden uit de reeks, gesorteerd.
+
+    Args:
+        reeks (pd.Series): De om te zetten kolom
+        vaste_categorieen (iterable, optional): Categorieën die altijd aanwezig zijn
+        sorteer (callable, optional): Sorteert de overige waarden, bijv. `sorteer_perioden`
+
+    Returns:
+        pd.Series: Dezelfde waarden als categorie
+    """
+    vast = list(vaste_categorieen or [])
+    if isinstance(reeks.dtype, pd.CategoricalDtype):
+        waarden = reeks.cat.categories[pd.unique(reeks.cat.codes[reeks.cat.codes >= 0])]
+    else:
+        waarden = pd.unique(reeks.dropna())
+    bekend = set(vast)
+    extra = sorteer([waarde for waarde in waarden if waarde not in bekend])
+
+    categorieen = vast + extra
+    if isinstance(reeks.dtype, pd.CategoricalDtype) and list(reeks.cat.categories) == categorieen:
+        return reeks
+    return reeks.astype(pd.CategoricalDtype(categorieen))
+
+
+def map_unieke_waarden(reeks, functie):
+    """
+    Past een functie toe op elke unieke waarde van een reeks in plaats van op elke rij,
+    bijv. voor het opschonen van dimensie-items. Ontbrekende waarden blijven ontbrekend.
+
+    Returns:
+        pd.Series: Categorische Series met de omgezette waarden
+    """
+    codes, uniek = pd.factorize(reeks)
+    omgezet = [functie(waarde) for waarde in uniek]
+    nieuwe_categorieen = list(dict.fromkeys(omgezet))
+    positie = {waarde: i for i, waarde in enumerate(nieuwe_categorieen)}
+
+    # Code -1 (ontbrekende waarde) wijst naar het laatste element en blijft dus -1
+    vertaling = np.array([positie[waarde] for waarde in omgezet] + [-1])
+    return pd.Series(
+        pd.Categorical.from_codes(vertaling[codes], categories=nieuwe_categorieen),
+        index=reeks.index,
+        name=reeks.name,
+    )
+
+
+def pas_indicator_schema_toe(df):
+    """
+    Zet de kolommen 'geoitem', 'geolevel', 'period' en 'dim_*' van een indicatortabel om
+    naar categorieën. Overige kolommen (de indicatorwaarden) blijven ongewijzigd.
+
+    'geoitem' heeft alle codes uit de geografische referentie als categorie. Groepeer op deze
+    kolommen dus altijd met `observed=True`; vóór pandas 3 is de standaard `observed=False`
+    en levert een groupby ook alle lege combinaties van categorieën op.
+
+    Args:
+        df (pd.DataFrame): Indicatortabel in lang formaat
+
+    Returns:
+        pd.DataFrame: Nieuw DataFrame met dezelfde waarden en kolomvolgorde
+    """
+    omgezet = {}
+    for kolom in df.columns:
+        if kolom == "geoitem":
+            omgezet[kolom] = als_categorie(df[kolom], geoitem_categorieen())
+        elif kolom == "geolevel":
+            omgezet[kolom] = als_categorie(df[kolom], GEOLEVELS)
+        elif kolom == "period":
+            # Chronologisch, ook bij gemengde notaties (bijv. 'm6y2025' vóór 'm10y2025')
+            omgezet[kolom] = als_categorie(df[kolom], sorteer=sorteer_perioden)
+        elif str(kolom).startswith(DIMENSIE_PREFIX):
+            omgezet[kolom] = als_categorie(df[kolom])
+    return df.assign(**omgezet) if omgezet else df
@@ -0,0 +1,250 @@
+"""
+Watch-modus: bouwt indicatoren opnieuw zodra hun invoerbestanden veranderen.
+
+Een langlopend proces controleert elke paar seconden de invoerbestanden van alle stappen
+in de registers (de glob-patronen in `invoer`) en de transformatiecode van de teams. Komt
+er een bestand bij (bijv. 'Invoerapplicatie ... - Najaar 2026.xlsx'), of wordt er een
+gewijzigd of verwijderd, dan worden alleen de stappen die dat bestand gebruiken opnieuw
+uitgevoerd en hun CSV-bestanden bijgewerkt. Gebruik vanuit de root van de repository:
+
+    python -m pipeline_scripts.watch
+    python -m pipeline_scripts.watch --team Leefbare_steden_en_dorpen --interval 5
+
+De pool van processen blijft tussen de runs bestaan. De referentiedata, de registers en
+de ingelezen bronbestanden blijven daardoor in het geheugen; die kosten worden één keer
+bij het opstarten betaald in plaats van bij elke nieuwe levering. Verandert een van de
+referentiebestanden in 'data/Buurtcodes/', dan worden die opnieuw ingelezen en alle
+stappen opnieuw uitgevoerd. Stoppen met Ctrl+C.
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pipeline_scripts.bestand_cache import houd_in_geheugen
+from pipeline_scripts.geo_referentie import STANDAARD_PAD_BUURTCODES, laad_geo_referentie, wis_geo_referentie_cache
+from pipeline_scripts.registry import ROOT_MAP
+from pipeline_scripts.runner import laad_team_register, ontdek_teams, team_map, voer_teams_uit
+from pipeline_scripts.schema import geoitem_categorieen
+
+# Aantal seconden tussen twee controles van de bestanden
+STANDAARD_INTERVAL = 2.0
+
+# Referentiebestanden (buurtcodes en correcties) die elke stap via het indicatorschema gebruikt
+REFERENTIE_PATROON = STANDAARD_PAD_BUURTCODES.parent / "*"
+
+
+def _negeer(pad):
+    # Lock- en tijdelijke bestanden van Excel ('~$...') en verborgen bestanden
+    naam = os.path.basename(pad)
+    return naam.startswith("~$") or naam.startswith(".")
+
+
+def _stat(pad):
+    try:
+        stat = os.stat(pad)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def maak_momentopname(teams):
+    """
+    Legt vast welke bestanden de stappen van de teams nu gebruiken, met hun grootte en
+    wijzigingstijd. Ook de Python-bestanden in de transformatiemap van elk team en de
+    geografische referentiebestanden tellen mee.
+
+    Returns:
+        tuple: ({pad: (grootte, mtime_ns)}, {pad: {(team, stapnaam), ...}}, {pad: team} voor code,
+            {paden van referentiebestanden})
+    """
+    gebruikers, code = {}, {}
+    for team in teams:
+        for stap in laad_team_register(team):
+            for pad in stap.invoer_bestanden(ROOT_MAP):
+                if not _negeer(pad):
+                    gebruikers.setdefault(pad, set()).add((team, stap.naam))
+        for pad in team_map(team).glob("*.py"):
+            code[str(pad)] = team
+
+    referentie = {pad for pad in glob.glob(str(REFERENTIE_PATROON)) if not _negeer(pad)}
+
+    bestanden = {}
+    for pad in [*gebruikers, *code, *referentie]:
+        stat = _stat(pad)
+        if stat is not None:
+            bestanden[pad] = stat
+    return bestanden, gebruikers, code, referentie
+
+
+def gewijzigde_bestanden(vorige, huidige):
+    """Geeft de bestanden terug die zijn toegevoegd, verwijderd of gewijzigd (grootte of wijzigingstijd)."""
+    return sorted(pad for pad in vorige.keys() | huidige.keys() if vorige.get(pad) != huidige.get(pad))
+
+
+def getroffen_stappen(paden, *gebruikers_mappings):
+    """
+    Bepaalt per team welke stappen een van de gewijzigde bestanden gebruiken (of gebruikten,
+    bij een verwijderd bestand).
+
+    Returns:
+        dict: {team: [stapnamen]}
+    """
+    per_team = {}
+    for gebruikers in gebruikers_mappings:
+        for pad in paden:
+            for team, stap_naam in gebruikers.get(pad, ()):
+                per_team.setdefault(team, [])
+                if stap_naam not in per_team[team]:
+                    per_team[team].append(stap_naam)
+    return per_team
+
+
+def _laad_referentie(teams):
+    """Laadt de geografische referentie, de geoitem-categorieën en de registers van de teams in dit proces."""
+    try:
+        laad_geo_referentie()
+    except FileNotFoundError as e:
+        print(f"Waarschuwing: Geografische referentie niet vooraf geladen: {e}")
+    geoitem_categorieen()
+    for team in teams:
+        laad_team_register(team)
+
+
+def _start_pool(teams, max_workers, herlaad_referentie=False):
+    """
+    Laadt de referentiedata en registers in dit proces en start daarna de pool. Waar het
+    platform 'fork' ondersteunt, worden de processen van de pool expliciet geforkt en erven
+    ze zo de ingelezen data; anders (bijv. Windows, of macOS met 'spawn') laadt elk proces
+    de referentiedata bij het opstarten zelf via een initializer. Met `herlaad_referentie`
+    worden de referentiebestanden eerst opnieuw ingelezen.
+    """
+    if herlaad_referentie:
+        wis_geo_referentie_cache()
+        geoitem_categorieen.cache_clear()
+    _laad_referentie(teams)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if "fork" in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("fork"))
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_laad_referentie, initargs=(list(teams),))
+
+
+def _bouw(selectie, **kwargs):
+    try:
+        voer_teams_uit(list(selectie), selectie, **kwargs)
+    except RuntimeError as e:
+        # Mislukte stappen stoppen de watch-modus niet; na een nieuwe levering volgt een nieuwe poging
+        print(f"Waarschuwing: {e}")
+
+
+def watch(teams=None, interval=STANDAARD_INTERVAL, max_workers=None, parquet_map=None, eerst_bouwen=True):
+    """
+    Blijft de invoerbestanden van de teams controleren en bouwt de getroffen indicatoren
+    opnieuw op. Een bestand wordt pas verwerkt als het bij twee opeenvolgende controles
+    gelijk is gebleven, zodat een bestand dat nog gekopieerd wordt niet half wordt ingelezen.
+
+    Bij een wijziging in de transformatiecode van een team wordt het register opnieuw
+    geladen, de pool vervangen en worden de stappen van dat team opnieuw bekeken (het
+    build-manifest slaat stappen over waarvan de code niet is veranderd). Bij een wijziging
+    in de geografische referentie wordt die opnieuw ingelezen, de pool vervangen en worden
+    alle stappen van alle teams opnieuw uitgevoerd.
+
+    Args:
+        teams (list, optional): Namen van teammappen. Standaard alle teams met een indicatorregister.
+        interval (float, optional): Aantal seconden tussen twee controles
+        max_workers (int, optional): Aantal processen in de pool. Standaard het aantal cores.
+        parquet_map (str, optional): Werk ook de Parquet-dataset in deze map bij
+        eerst_bouwen (bool, optional): Breng bij het starten eerst alle indicatoren bij
+            (ongewijzigde stappen worden via het manifest overgeslagen)
+    """
+    teams = list(teams or ontdek_teams())
+    if not teams:
+        raise FileNotFoundError("Geen teams met een indicatorregister gevonden")
+    houd_in_geheugen()
+    pool = _start_pool(teams, max_workers)
+    opties = dict(max_workers=max_workers, parquet_map=parquet_map)
+
+    try:
+        if eerst_bouwen:
+            _bouw({team: None for team in teams}, pool=pool, **opties)
+        bestanden, gebruikers, code, referentie = maak_momentopname(teams)
+        print(f"\nWatch-modus actief voor {', '.join(teams)}: {len(gebruikers)} invoerbestanden (Ctrl+C om te stoppen)")
+
+        kandidaten = {}
+        while True:
+            time.sleep(interval)
+            nieuwe_bestanden, nieuwe_gebruikers, nieuwe_code, nieuwe_referentie = maak_momentopname(teams)
+            gewijzigd = gewijzigde_bestanden(bestanden, nieuwe_bestanden)
+
+            # Alleen bestanden die sinds de vorige controle niet meer veranderd zijn, worden verwerkt
+            stabiel = [pad for pad in gewijzigd if kandidaten.get(pad, False) == nieuwe_bestanden.get(pad)]
+            kandidaten = {pad: nieuwe_bestanden.get(pad) for pad in gewijzigd}
+            if not stabiel:
+                continue
+
+            code_teams = sorted({code.get(pad) or nieuwe_code.get(pad) for pad in stabiel} - {None})
+            referentie_gewijzigd = any(pad in referentie or pad in nieuwe_referentie for pad in stabiel)
+            if code_teams:
+                print(f"\nTransformatiecode gewijzigd voor: {', '.join(code_teams)}; registers en pool worden vernieuwd")
+            if referentie_gewijzigd:
+                print("\nGeografische referentie gewijzigd; referentie en pool worden vernieuwd, alle stappen opnieuw uitgevoerd")
+            if code_teams or referentie_gewijzigd:
+                pool.shutdown()
+                for team in code_teams:
+                    laad_team_register(team, herlaad=True)
+                pool = _start_pool(teams, max_workers, herlaad_referentie=referentie_gewijzigd)
+                nieuwe_bestanden, nieuwe_gebruikers, nieuwe_code, nieuwe_referentie = maak_momentopname(teams)
+
+            selectie = getroffen_stappen(stabiel, gebruikers, nieuwe_gebruikers)
+            selectie.update({team: None for team in code_teams})
+            if referentie_gewijzigd:
+                selectie = {team: None for team in teams}
+            for pad in stabiel:
+                status = "verwijderd" if pad not in nieuwe_bestanden else "nieuw" if pad not in bestanden else "gewijzigd"
+                print(f"{status}: {os.path.relpath(pad, ROOT_MAP)}")
+
+            # Bijwerken na het verwerken, zodat een bestand niet twee keer wordt opgepakt
+            for pad in stabiel:
+                if pad in nieuwe_bestanden:
+                    bestanden[pad] = nieuwe_bestanden[pad]
+                else:
+                    bestanden.pop(pad, None)
+            gebruikers, code, referentie = nieuwe_gebruikers, nieuwe_code, nieuwe_referentie
+            kandidaten = {pad: stat for pad, stat in kandidaten.items() if pad not in stabiel}
+
+            if not selectie:
+                continue
+            start = time.perf_counter()
+            print(f"Opnieuw bouwen: {', '.join(f'{team}/{stap}' for team, stappen in selectie.items() for stap in stappen or ['*'])}")
+            # Het build-manifest kent de referentiebestanden niet; forceer dan alle stappen
+            _bouw(selectie, pool=pool, forceer=referentie_gewijzigd, **opties)
+            print(f"Bijgewerkt in {time.perf_counter() - start:.1f} s; watch-modus actief")
+    except KeyboardInterrupt:
+        print("\nWatch-modus gestopt")
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--team", action="append", dest="teams",
+        help="Naam van de teammap onder teams/ (meerdere keren mogelijk; standaard alle teams)"
+    )
+    parser.add_argument("--interval", type=float, default=STANDAARD_INTERVAL, help="Seconden tussen twee controles")
+    parser.add_argument("--max-workers", type=int, help="Aantal parallelle processen (standaard: aantal cores)")
+    parser.add_argument("--parquet", metavar="MAP", help="Werk ook de Parquet-dataset in deze map bij")
+    parser.add_argument("--niet-eerst-bouwen", action="store_true", help="Sla de eerste volledige controle over")
+    args = parser.parse_args(argv)
+    watch(
+        args.teams, interval=args.interval, max_workers=args.max_workers, parquet_map=args.parquet,
+        eerst_bouwen=not args.niet_eerst_bouwen,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,27 @@
+import numpy as np
 import pandas as pd
 import warnings
 
-def corrigeer_bu_codes(df, bu_code_kolom, pad_naar_bu_code_correcties):
+from pipeline_scripts.bestand_cache import lees_csv, lees_excel
+from pipeline_scripts.geo_referentie import laad_geo_referentie
+from pipeline_scripts.profilering import meet_stap
+
+@meet_stap
+def corrigeer_bu_codes(df, bu_code_kolom, pad_naar_bu_code_correcties=None, geo_referentie=None):
     """
     Corrigeert buurtcodes in een DataFrame op basis van een correctiebestand.
 
     Deze functie voert de volgende stappen uit:
-    1. Leest een Excel-bestand met buurtcode correcties
+    1. Haalt de buurtcode correcties op uit de gedeelde GeoReferentie (eenmalig ingelezen per proces)
     2. Zet alle buurtcodes om naar hoofdletters voor consistentie
     3. Past de correcties toe op de gespecificeerde kolom in het DataFrame
 
     Args:
         df (pd.DataFrame): Het DataFrame waarin de buurtcodes gecorrigeerd moeten worden
         bu_code_kolom (str): De naam van de kolom in het DataFrame die de buurtcodes bevat
-        pad_naar_bu_code_correcties (str): Het pad naar het Excel-bestand met de buurtcode correcties
+        pad_naar_bu_code_correcties (str, optional): Het pad naar het Excel-bestand met de buurtcode correcties
+        geo_referentie (GeoReferentie, optional): Reeds geladen geografische referentie. Standaard wordt
+            de gedeelde referentie voor `pad_naar_bu_code_correcties` gebruikt.
 
     Returns:
         pd.DataFrame: Het DataFrame met gecorrigeerde buurtcodes
@@ -26,30 +34,84 @@ def corrigeer_bu_codes(df, bu_code_kolom, pad_naar_bu_code_correcties):
         Het correctiebestand moet een Excel-bestand zijn met ten minste twee kolommen:
         'BUURT_CODE' (de originele buurtcodes) en 'BUURT_CODE_CORRECTIE' (de gecorrigeerde buurtcodes)
     """
-    # Lees het bestand met de buurtcode correcties
-    try:
-        correctie_df = pd.read_excel(pad_naar_bu_code_correcties)
-        correctie_dict = correctie_df.set_index('BUURT_CODE')['BUURT_CODE_CORRECTIE'].to_dict()
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Het correctiebestand kon niet worden gevonden op het pad: {pad_naar_bu_code_correcties}")
-    
-    # Zet alle waardes om naar hoofdletters voor consistentie
-    correctie_dict = {key.upper(): value.upper() for key, value in correctie_dict.items()}
+    # Haal de buurtcode correcties op (al in hoofdletters)
+    if geo_referentie is None:
+        geo_referentie = laad_geo_referentie(pad_correcties=pad_naar_bu_code_correcties)
+    correctie_dict = geo_referentie.correcties
     
-    # Pas de correcties toe op de buurtcodes in het DataFrame
+    # Pas de correcties toe op de buurtcodes in het DataFrame (gevectoriseerd)
     try:
-        df[bu_code_kolom] = df[bu_code_kolom].apply(lambda x: correctie_dict.get(x.upper(), x.upper()))
+        bu_codes = df[bu_code_kolom].str.upper()
     except KeyError:
         raise KeyError(f"De kolom '{bu_code_kolom}' bestaat niet in het DataFrame")
+    df[bu_code_kolom] = bu_codes.map(correctie_dict).fillna(bu_codes)
     
     return df
 
-def filter_limburgse_buurten(df, buurt_code_kolom, pad_naar_limburgse_buurten):
+@meet_stap
+def corrigeer_filter_en_map_buurten(df, bu_code_kolom, geo_referentie=None):
+    """
+    Corrigeert buurtcodes, filtert op Limburgse buurten en voegt de COROP naam toe in één stap.
+
+    Levert hetzelfde resultaat als achtereenvolgens `corrigeer_bu_codes`,
+    `filter_limburgse_buurten` en `map_bu_code_naar_corop_code`, maar werkt op de
+    unieke buurtcodes in plaats van op elke rij:
+    1. Factoriseert de buurtcodes (elke unieke code krijgt een integer-code)
+    2. Zet de unieke codes om naar hoofdletters en past de correcties toe
+    3. Bepaalt per unieke code of deze Limburgs is en wat de COROP naam is
+    4. Neemt de resultaten per rij over via de integer-codes en filtert in één keer
+
+    Args:
+        df (pd.DataFrame): Het originele DataFrame met buurtcodes
+        bu_code_kolom (str): De naam van de kolom in het DataFrame die de buurtcodes bevat
+        geo_referentie (GeoReferentie, optional): Reeds geladen geografische referentie.
+            Standaard wordt de gedeelde referentie met de standaardbestanden gebruikt.
+
+    Returns:
+        pd.DataFrame: Een gefilterd DataFrame met alleen Limburgse buurten, gecorrigeerde
+        buurtcodes en een extra 'COROP_NAAM' kolom
+
+    Raises:
+        KeyError: Als de gespecificeerde bu_code_kolom niet in het DataFrame bestaat
+        ValueError: Als er geen Limburgse buurten in het DataFrame worden gevonden na filtering
+    """
+    if bu_code_kolom not in df.columns:
+        raise KeyError(f"De kolom '{bu_code_kolom}' bestaat niet in het DataFrame")
+    if geo_referentie is None:
+        geo_referentie = laad_geo_referentie()
+
+    # Stap 1: Factoriseer de buurtcodes; ontbrekende codes krijgen code -1
+    codes, unieke_codes = pd.factorize(df[bu_code_kolom])
+
+    # Stap 2: Hoofdletters en correcties, alleen op de unieke codes
+    unieke_codes = pd.Series(unieke_codes, dtype=object).str.upper()
+    unieke_codes = unieke_codes.map(geo_referentie.correcties).fillna(unieke_codes)
+
+    # Stap 3: Limburgse buurten en COROP namen, alleen op de unieke codes
+    is_limburgs = unieke_codes.isin(geo_referentie.bu_codes).to_numpy()
+    corop_namen = unieke_codes.map(geo_referentie.mapping('COROP_NAAM')).to_numpy()
+
+    # Stap 4: Terug naar rijniveau en filteren
+    masker = (codes >= 0) & np.append(is_limburgs, False)[codes]
+    codes = codes[masker]
+
+    df_limburg = df[masker].reset_index(drop=True)
+    df_limburg[bu_code_kolom] = unieke_codes.to_numpy()[codes]
+    df_limburg['COROP_NAAM'] = corop_namen[codes]
+
+    # Controleer of er Limburgse buurten zijn gevonden
+    if df_limburg.empty:
+        raise ValueError("Er zijn geen Limburgse buurten gevonden in het DataFrame")
+
+    return df_limburg
+
+@meet_stap
+def filter_limburgse_buurten(df, buurt_code_kolom, pad_naar_limburgse_buurten=None, geo_referentie=None):
     """
     Filtert een DataFrame om alleen Limburgse buurten te behouden op basis van een Excel-bestand met Limburgse buurtcodes.
 
     Deze functie voert de volgende stappen uit:
-    1. Leest een Excel-bestand met Limburgse buurtcodes
+    1. Haalt de Limburgse buurtcodes op uit de gedeelde GeoReferentie (eenmalig ingelezen per proces)
     2. Controleert of de gespecificeerde buurtcode kolom in het DataFrame aanwezig is
     3. Filtert het DataFrame om alleen rijen te behouden waar de buurtcode voorkomt in de lijst van Limburgse buurtcodes
     4. Reset de index van het gefilterde DataFrame
@@ -57,7 +119,9 @@ def filter_limburgse_buurten(df, buurt_code_kolom, pad_naar_limburgse_buurten):
     Args:
         df (pd.DataFrame): Het originele DataFrame met buurtcodes
         buurt_code_kolom (str): De naam van de kolom in het DataFrame die de buurtcodes bevat
-        pad_naar_limburgse_buurten (str): Het pad naar het Excel-bestand met Limburgse buurtcodes
+        pad_naar_limburgse_buurten (str, optional): Het pad naar het Excel-bestand met Limburgse buurtcodes
+        geo_referentie (GeoReferentie, optional): Reeds geladen geografische referentie. Standaard wordt
+            de gedeelde referentie voor `pad_naar_limburgse_buurten` gebruikt.
 
     Returns:
         pd.DataFrame: Een gefilterd DataFrame met alleen Limburgse buurten
@@ -70,13 +134,10 @@ def filter_limburgse_buurten(df, buurt_code_kolom, pad_naar_limburgse_buurten):
     Note:
         Zorg ervoor dat het Excel-bestand met Limburgse buurtcodes een kolom 'BU_CODE' bevat met de buurtcodes.
     """
-    # Lees het Excel-bestand met Limburgse buurtcodes
-    try:
-        bu_codes_limburg = pd.read_excel(pad_naar_limburgse_buurten)['BU_CODE'].tolist()
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Het bestand met Limburgse buurtcodes kon niet worden gevonden op het pad: {pad_naar_limburgse_buurten}")
-    except KeyError:
-        raise KeyError("Het Excel-bestand moet een kolom 'BU_CODE' bevatten met de Limburgse buurtcodes")
+    # Haal de Limburgse buurtcodes op (als hash-index)
+    if geo_referentie is None:
+        geo_referentie = laad_geo_referentie(pad_buurtcodes=pad_naar_limburgse_buurten)
+    bu_codes_limburg = geo_referentie.bu_codes
 
     # Controleer of de gespecificeerde kolom in het DataFrame aanwezig is
     if buurt_code_kolom not in df.columns:
@@ -94,19 +155,22 @@ def filter_limburgse_buurten(df, buurt_code_kolom, pad_naar_limburgse_buurten):
 
     return df_limburg
 
-def map_bu_code_naar_corop_code(df, buurt_code_kolom, pad_naar_limburgse_buurten):
+@meet_stap
+def map_bu_code_naar_corop_code(df, buurt_code_kolom, pad_naar_limburgse_buurten=None, geo_referentie=None):
     """
     Voegt een COROP_NAAM kolom toe aan het DataFrame door de buurtcode te mappen naar de bijbehorende COROP naam.
 
     Deze functie voert de volgende stappen uit:
-    1. Leest een Excel-bestand met buurtcodes en bijbehorende COROP namen
-    2. Creëert een mapping dictionary van buurtcode naar COROP naam
+    1. Haalt de buurtcodes en bijbehorende COROP namen op uit de gedeelde GeoReferentie
+    2. Gebruikt de (op buurtcode geïndexeerde) mapping van buurtcode naar COROP naam
     3. Voegt een nieuwe kolom 'COROP_NAAM' toe aan het DataFrame gebaseerd op de mapping
 
     Args:
         df (pd.DataFrame): Het originele DataFrame met buurtcodes
         buurt_code_kolom (str): De naam van de kolom in het DataFrame die de buurtcodes bevat
-        pad_naar_limburgse_buurten (str): Het pad naar het Excel-bestand met buurtcodes en COROP namen
+        pad_naar_limburgse_buurten (str, optional): Het pad naar het Excel-bestand met buurtcodes en COROP namen
+        geo_referentie (GeoReferentie, optional): Reeds geladen geografische referentie. Standaard wordt
+            de gedeelde referentie voor `pad_naar_limburgse_buurten` gebruikt.
 
     Returns:
         pd.DataFrame: Het originele DataFrame met een extra 'COROP_NAAM' kolom
@@ -118,38 +182,36 @@ def map_bu_code_naar_corop_code(df, buurt_code_kolom, pad_naar_limburgse_buurten
     Note:
         Het Excel-bestand moet kolommen 'BU_CODE' en 'COROP_NAAM' bevatten.
     """
-    try:
-        bu_wk_gm_codes = pd.read_excel(pad_naar_limburgse_buurten)
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Het bestand met Limburgse buurtcodes kon niet worden gevonden op het pad: {pad_naar_limburgse_buurten}")
-    
-    # Controleer of de vereiste kolommen aanwezig zijn in het Excel-bestand
-    required_columns = ['BU_CODE', 'COROP_NAAM']
-    if not all(col in bu_wk_gm_codes.columns for col in required_columns):
-        raise KeyError(f"Het Excel-bestand moet de volgende kolommen bevatten: {', '.join(required_columns)}")
+    if geo_referentie is None:
+        geo_referentie = laad_geo_referentie(pad_buurtcodes=pad_naar_limburgse_buurten)
+
+    # Haal de mapping van bu_code naar COROP naam op (controleert ook de vereiste kolommen)
+    corop_mapping = geo_referentie.mapping('COROP_NAAM')
     
     # Controleer of de buurt_code_kolom aanwezig is in het DataFrame
     if buurt_code_kolom not in df.columns:
         raise KeyError(f"De kolom '{buurt_code_kolom}' bestaat niet in het DataFrame")
     
-    # Creëer een mapping dictionary van bu_code naar corop_code
-    mapping_dict = dict(zip(bu_wk_gm_codes['BU_CODE'], bu_wk_gm_codes['COROP_NAAM']))
-    
-    # Map de bu_code naar corop_code met behulp van de mapping dictionary
-    df['COROP_NAAM'] = df[buurt_code_kolom].map(mapping_dict)
+    # Map de bu_code naar corop_code met behulp van de mapping
+    df['COROP_NAAM'] = df[buurt_code_kolom].map(corop_mapping)
     
     return df
 
-def laad_en_verwerk_enkel_invoerbestand(bron_bestand: str) -> pd.DataFrame:
+@meet_stap
+def lees_invoerbestand(bron_bestand: str) -> pd.DataFrame:
     """
-    Laadt en verwerkt één enkel bestand volgens de gewenste structuur.
+    Leest één bestand uit de Invoerapplicatie in en bepaalt per regel de periode.
+
+    Returns:
+        pd.DataFrame: Eén regel per ingevoerde indicator, met de kolommen
+            'geolevel', 'geoitem', 'period', 'Indicator_nr' en 'Invoerveld'.
     """
     # Bestand inlezen afhankelijk van extensie
     try:
         if bron_bestand.endswith(".csv"):
-            df = pd.read_csv(bron_bestand, sep=';')
+            df = lees_csv(bron_bestand, sep=';')
         elif bron_bestand.endswith(".xlsx") or bron_bestand.endswith(".xls"):
-            df = pd.read_excel(bron_bestand)
+            df = lees_excel(bron_bestand)
         else:
             raise ValueError(f"Bestandstype niet ondersteund: {bron_bestand}")
     except FileNotFoundError:
@@ -179,12 +241,7 @@ def laad_en_verwerk_enkel_invoerbestand(bron_bestand: str) -> pd.DataFrame:
     # Gebruik 'Peildatum (indien afwijkend van datum van invoer)' indien ingevuld
     if "Peildatum (indien afwijkend van datum van invoer)" in df.columns:
         print(f"'Peildatum (indien afwijkend van datum van invoer)' kolom gevonden in bestand: {bron_bestand}, deze zal worden gebruikt als 'period' indien deze niet leeg is.")
-        df['period'] = df.apply(
-            lambda row: row['Peildatum (indien afwijkend van datum van invoer)'] 
-            if pd.notnull(row['Peildatum (indien afwijkend van datum van invoer)']) 
-            else row['period'], 
-            axis=1
-        )
+        df['period'] = df['Peildatum (indien afwijkend van datum van invoer)'].combine_first(df['period'])
     
     # Controleer de kolommen in het DataFrame
     verwachte_kolommen = {'geolevel', 'geoitem', 'period', 'Indicator_nr', 'Invoerveld'}
@@ -198,20 +255,38 @@ def laad_en_verwerk_enkel_invoerbestand(bron_bestand: str) -> pd.DataFrame:
 
     # Datum verwerken, eventueel converteren naar gewenst stringformaat, met controle
     try:
-        df['period'] = pd.to_datetime(df['period'], format='%d-%m-%Y', errors='coerce')
+        periode = pd.to_datetime(df['period'], format='%d-%m-%Y', errors='coerce')
     except Exception as e:
         raise RuntimeError(f"Er is een fout opgetreden bij het verwerken van de dates in de 'period'-kolom in bestand: {bron_bestand}, fout: {e}")
 
-    df['period'] = df['period'].apply(lambda x: f"m{x.month}y{x.year}" if not pd.isna(x) else None)
+    # Formatteer als 'm{maand}y{jaar}', bijv. 'm6y2025'; lege datums blijven leeg
+    maand = periode.dt.month.astype('Int64').astype(str)
+    jaar = periode.dt.year.astype('Int64').astype(str)
+    df['period'] = ('m' + maand + 'y' + jaar).where(periode.notna(), None)
+
+    return df[['geolevel', 'geoitem', 'period', 'Indicator_nr', 'Invoerveld']]
 
-    # Pivot zodat Indicator_nr kolommen worden en Invoerveld de waarden
+
+def pivoteer_invoer(df: pd.DataFrame, index: list = None) -> pd.DataFrame:
+    """
+    Pivot zodat Indicator_nr kolommen worden en Invoerveld de waarden.
+    Per (index, indicator) wordt de eerste ingevoerde waarde gebruikt.
+    """
     df_pivot = df.pivot_table(
-        index=['geolevel', 'geoitem', 'period'],
+        index=index or ['geolevel', 'geoitem', 'period'],
         columns='Indicator_nr',
         values='Invoerveld',
-        aggfunc='first'
+        aggfunc='first',
+        observed=True
     ).reset_index()
 
     df_pivot.columns.name = None
     df_pivot = df_pivot.rename_axis(None, axis=1)
-    return df_pivot
\ No newline at end of file
+    return df_pivot
+
+
+def laad_en_verwerk_enkel_invoerbestand(bron_bestand: str) -> pd.DataFrame:
+    """
+    Laadt en verwerkt één enkel bestand volgens de gewenste structuur.
+    """
+    return pivoteer_invoer(lees_invoerbestand(bron_bestand))
@@ -0,0 +1,164 @@
+"""
+Indicatorregister van het team Leefbare steden en dorpen.
+
+Elke stap declareert zijn invoer (bestanden en CBS-tabellen), de transformatie uit
+`preprocessing.py` en de indicatoren die hij oplevert. Uitvoeren met:
+
+    python -m pipeline_scripts.runner --team Leefbare_steden_en_dorpen [indicatorcodes...]
+"""
+import re
+
+import pandas as pd
+
+from api_scripts.api_utils import download_cbs_data
+from pipeline_scripts.registry import IndicatorStap
+from preprocessing import (
+    transformeer_woononderzoek_nederland,
+    transformeer_leefbarometer_data,
+    transformeer_cbs_data,
+    laad_woningtekort_data,
+    laad_data_invoerapplicatie,
+    transformeer_planrealisaties
+)
+
+# Mapping van regio's
+# Dit kan later verbeterd worden door alle buurt-wijk-gem-corop-prov mappings centraal op te slaan
+REGIO_MAPPING = {
+    "Nederland": "nl00",
+    "Noord-Limburg": "cr37",
+    "Midden-Limburg": "cr38",
+    "Zuid-Limburg": "cr39",
+}
+
+
+def bouw_mo_11a(context):
+    # Indicator MO_11a: Woningtekort Data
+    df_mo_11a = laad_woningtekort_data(REGIO_MAPPING, data_map=str(context.data_map))
+    return {"MO_11a": df_mo_11a[["geoitem", "geolevel", "mo_11a", "period"]]}
+
+
+def bouw_mo_11b(context):
+    # Indicator MO_11b: Woononderzoek Nederland en Limburg
+    df_woonderzoek_limburg = pd.read_csv(
+        context.pad("data", "Woononderzoek_nederland", "Tevreden met woning - Limburg.csv"), sep=';'
+    )
+    return {"MO_11b": transformeer_woononderzoek_nederland(df_woonderzoek_limburg, geolevel='prov_code')}
+
+
+def bouw_mo_12d(context):
+    # Indicator MO_12d: CBS Statline, Limburgse COROP-regio's (oppervlakte uit 70072NED)
+    df_mo_12d = download_cbs_data(
+        table_code='37230NED',
+        geolevel='cr',
+        filter_limburg=True,
+        convert_to_geolevel_codes=True,
+        keep_nl_data=True,
+        perioden=['JJ00'],
+        kolommen=['RegioS', 'Perioden', 'BevolkingAanHetEindeVanDePeriode_15']
+    )
+    return {"MO_12d": transformeer_cbs_data(df_mo_12d, geolevel='corop_id', hele_jaren=True)}
+
+
+def bouw_leefbaarometer(context):
+    # Indicatoren MO_10a, D_39a, D_39aa: Leefbaarometer Data
+    df_leefbarometer = transformeer_leefbarometer_data(
+        input_bestand_pad=context.pad("data", "Leefbarometer", "Leefbaarometer-scores buurten 2002-2024.csv"),
+        bu_code_correcties_pad=context.pad("data", "Buurtcodes", "bu_code_correcties.xlsx"),
+        limburg_buurten_pad=context.pad("data", "Buurtcodes", "BU_WK_GM_codes.xls"),
+        relevante_jaren=[2014, 2018, 2020, 2022, 2024],
+        column_renames={
+            "lbm": "MO_10a",
+            "fys": "D_39a",
+            "vrz": "D_39aa",
+            "COROP_NAAM": "geoitem",
+            "jaar": "period",
+        },
+        regio_mapping=REGIO_MAPPING,
+    )
+    return {
+        indicator_code: df_leefbarometer[["geoitem", "geolevel", "period", indicator_code]]
+        for indicator_code in ["MO_10a", "D_39a", "D_39aa"]
+    }
+
+
+def bouw_planrealisaties(context):
+    # Indicatoren D_40a, D_40b, D_41a: Planrealisaties Data (eerst ETIL, daarna alle JUNO-jaren)
+    bron_bestanden = [context.pad("data", "Planrealisaties", "Planrealisaties 2004-2023 (ETIL).xlsx")]
+    bron_bestanden += [bestand for bestand in context.invoer if bestand.endswith("(JUNO).xlsx")]
+    df_d_40a, df_d_40b, df_d_41a = transformeer_planrealisaties(
+        bron_bestanden=bron_bestanden, regio_mapping=REGIO_MAPPING, max_workers=context.max_workers
+    )
+    return {"D_40a": df_d_40a, "D_40b": df_d_40b, "D_41a": df_d_41a}
+
+
+def _invoerapplicatie_volgorde(bestand):
+    # Sorteer de halfjaarlijkse bestanden chronologisch: Voorjaar 2025, Najaar 2025, Voorjaar 2026, ...
+    match = re.search(r"(Voorjaar|Najaar) (\d{4})", bestand)
+    if not match:
+        return (0, 0, bestand)
+    return (int(match.group(2)), 0 if match.group(1) == "Voorjaar" else 1, bestand)
+
+
+def bouw_invoerapplicatie(context):
+    # Indicatoren R_118a, R_119a, R_120a, R_122a: Data Invoerapplicatie
+    bron_bestanden = sorted(context.invoer, key=_invoerapplicatie_volgorde)
+    df_invoerapplicatie = laad_data_invoerapplicatie(bron_bestanden)
+
+    resultaat = {}
+    for indicator_code in ["R_118a", "R_119a", "R_120a", "R_122a"]:
+        if indicator_code not in df_invoerapplicatie.columns:
+            continue
+        # Verwijder rijen met missende waarden in de geselecteerde kolommen
+        filtered_df = df_invoerapplicatie[["geoitem", "geolevel", "period", indicator_code]].dropna()
+        # Alleen niet-lege indicatoren worden opgenomen
+        if not filtered_df.empty:
+            resultaat[indicator_code] = filtered_df
+    return resultaat
+
+
+STAPPEN = [
+    IndicatorStap(
+        naam="woningtekort",
+        indicatoren=["MO_11a"],
+        functie=bouw_mo_11a,
+        invoer=["data/Woningtekort/*"],
+        # MO_11a wordt van oudsher met een decimale punt gepubliceerd
+        decimaalteken={"MO_11a": "."},
+    ),
+    IndicatorStap(
+        naam="woononderzoek",
+        indicatoren=["MO_11b"],
+        functie=bouw_mo_11b,
+        invoer=["data/Woononderzoek_nederland/Tevreden met woning - Limburg.csv"],
+    ),
+    IndicatorStap(
+        naam="cbs_bevolking",
+        indicatoren=["MO_12d"],
+        functie=bouw_mo_12d,
+        cbs_tabellen=["37230NED", "70072NED"],
+    ),
+    IndicatorStap(
+        naam="leefbaarometer",
+        indicatoren=["MO_10a", "D_39a", "D_39aa"],
+        functie=bouw_leefbaarometer,
+        invoer=["data/Leefbarometer/*.csv", "data/Buurtcodes/*"],
+    ),
+    IndicatorStap(
+        naam="planrealisaties",
+        indicatoren=["D_40a", "D_40b", "D_41a"],
+        functie=bouw_planrealisaties,
+        invoer=[
+            "data/Planrealisaties/Planrealisaties 2004-2023 (ETIL).xlsx",
+            "data/Planrealisaties/Planrealisaties * (JUNO).xlsx",
+        ],
+    ),
+    IndicatorStap(
+        naam="invoerapplicatie",
+        indicatoren=["R_118a", "R_119a", "R_120a", "R_122a"],
+        functie=bouw_invoerapplicatie,
+        invoer=[
+            "data/Invoerapplicatie/Invoerapplicatie Leefbare steden en dorpen - *.xlsx",
+            "data/Invoerapplicatie/Invoerapplicatie Leefbare steden en dorpen - *.csv",
+        ],
+    ),
+]
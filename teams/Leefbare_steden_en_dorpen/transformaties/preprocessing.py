@@ -1,13 +1,28 @@
 import pandas as pd
 from helpers import (
     corrigeer_bu_codes,
-    filter_limburgse_buurten,
-    map_bu_code_naar_corop_code,
-    laad_en_verwerk_enkel_invoerbestand
+    corrigeer_filter_en_map_buurten,
+    lees_invoerbestand,
+    pivoteer_invoer
 )
 from typing import List, Union
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import os
 import re
 
+import requests
+
+from api_scripts.api_utils import download_cbs_oppervlakte
+from pipeline_scripts.aggregatie import CODE_NEDERLAND, aggregeer_geoniveaus
+from pipeline_scripts.bestand_cache import lees_csv, lees_excel
+from pipeline_scripts.geo_referentie import laad_geo_referentie
+from pipeline_scripts.kubus import IndicatorKubus
+from pipeline_scripts.periode import JAAR, parseer_perioden, periode_soort
+from pipeline_scripts.profilering import meet_stap
+from pipeline_scripts.schema import map_unieke_waarden, pas_indicator_schema_toe
+
+@meet_stap
 def transformeer_woononderzoek_nederland(df, geolevel):
     """
     Verwerkt het woononderzoek DataFrame en transformeert het naar het gewenste formaat.
@@ -82,8 +97,9 @@ def transformeer_woononderzoek_nederland(df, geolevel):
     # Stap 11: Voeg geolevel-kolom toe
     df_melted['geolevel'] = geolevel
 
-    return df_melted
+    return pas_indicator_schema_toe(df_melted)
 
+@meet_stap
 def transformeer_woonderzoek_nederland(df, n_rows, vermenigvuldig_met_100=True):
     """
     Transformeert het DataFrame van het woningonderzoek Nederland naar een gestructureerd formaat.
@@ -136,6 +152,7 @@ def transformeer_woonderzoek_nederland(df, n_rows, vermenigvuldig_met_100=True):
 
     return df_melted
 
+@meet_stap
 def transformeer_woonderzoek_data(df, region_mapping, column_renames=None):
     """
     Transformeert het gecombineerde woonderzoek DataFrame.
@@ -157,7 +174,7 @@ def transformeer_woonderzoek_data(df, region_mapping, column_renames=None):
         pd.DataFrame: Getransformeerd DataFrame
     """
     # Stap 1: Voeg 'geolevel' kolom toe
-    df['geolevel'] = df['Regio'].map(lambda x: "nederland" if x == "Nederland" else "corop_id")
+    df['geolevel'] = pd.Series("corop_id", index=df.index).mask(df['Regio'] == "Nederland", "nederland")
 
     # Stap 2: Map de regio's naar hun codes
     df['Regio'] = df['Regio'].map(region_mapping)
@@ -173,29 +190,90 @@ def transformeer_woonderzoek_data(df, region_mapping, column_renames=None):
     if column_renames:
         df = df.rename(columns=column_renames)
 
-    # Stap 6: Hernoem dimensie-items naar lowercase en verwijder spaties
+    # Stap 6: Hernoem dimensie-items naar lowercase en verwijder spaties (één keer per unieke waarde)
     for col in df.columns:
         if col.startswith('dim_'):
-            df[col] = df[col].apply(lambda x: str(x).lower().replace(" ", "_").replace(",", "") if isinstance(x, str) else x)
+            df[col] = map_unieke_waarden(
+                df[col], lambda x: x.lower().replace(" ", "_").replace(",", "") if isinstance(x, str) else x
+            )
+
+    return pas_indicator_schema_toe(df)
+
+# Kolommen uit het Leefbaarometer-buurtbestand die voor MO_10a, D_39a en D_39aa nodig zijn
+LEEFBAROMETER_KOLOMMEN = ['bu_code', 'jaar', 'lbm', 'fys', 'vrz']
+
+@meet_stap
+def lees_leefbarometer_limburg_gestreamd(input_bestand_pad, geo_referentie, relevante_jaren, chunksize=250_000):
+    """
+    Leest het landelijke Leefbaarometer-buurtbestand in blokken en houdt alleen de
+    Limburgse buurten in de relevante jaren over.
+
+    Per blok worden alleen de benodigde kolommen ingelezen (buurtcodes als categorie),
+    wordt direct op de relevante jaren gefilterd en worden de buurtcodes gecorrigeerd,
+    gefilterd op Limburg en voorzien van een COROP naam. Alleen dat kleine deel wordt
+    bewaard: het geheugengebruik is begrensd door het aantal Limburgse buurten maal het
+    aantal relevante jaren, niet door de grootte van het landelijke bestand. Omdat de
+    bewaarde rijen precies de rijen zijn die ook in de niet-gestreamde verwerking worden
+    geaggregeerd, zijn de gemiddelden per COROP-regio en jaar exact gelijk.
+
+    Parameters:
+    input_bestand_pad (str): Pad naar het input CSV-bestand met Leefbarometer scores.
+    geo_referentie (GeoReferentie): De geografische referentie met buurtcodes en correcties.
+    relevante_jaren (list): Lijst van jaren om op te nemen.
+    chunksize (int, optional): Aantal rijen per blok.
 
-    return df
+    Returns:
+    pandas.DataFrame: Limburgse buurtscores met gecorrigeerde buurtcodes en een 'COROP_NAAM' kolom.
 
+    Raises:
+    ValueError: Als er in het hele bestand geen Limburgse buurten worden gevonden.
+    """
+    blokken = pd.read_csv(
+        input_bestand_pad,
+        usecols=LEEFBAROMETER_KOLOMMEN,
+        dtype={'bu_code': 'category'},
+        chunksize=chunksize
+    )
+
+    limburgse_blokken = []
+    for blok in blokken:
+        # Filter zo vroeg mogelijk op de relevante jaren
+        blok = blok[blok['jaar'].isin(relevante_jaren)]
+        if blok.empty:
+            continue
+        try:
+            blok = corrigeer_filter_en_map_buurten(blok, bu_code_kolom='bu_code', geo_referentie=geo_referentie)
+        except ValueError:
+            # Dit blok bevat geen Limburgse buurten
+            continue
+        blok['COROP_NAAM'] = blok['COROP_NAAM'].astype('category')
+        limburgse_blokken.append(blok)
+
+    if not limburgse_blokken:
+        raise ValueError("Er zijn geen Limburgse buurten gevonden in het DataFrame")
+
+    df_limburg = pd.concat(limburgse_blokken, ignore_index=True)
+    df_limburg['COROP_NAAM'] = df_limburg['COROP_NAAM'].astype(object)
+    return df_limburg
+
+@meet_stap
 def transformeer_leefbarometer_data(
     input_bestand_pad,
     limburg_buurten_pad,
     column_renames,
     relevante_jaren,
     bu_code_correcties_pad,
-    regio_mapping
+    regio_mapping,
+    chunksize=None,
+    geoniveaus=None,
+    buurt_gewichten=None
 ):
     """
     Verwerkt Leefbarometer data voor Limburgse COROP-regio's.
 
     Deze functie voert de volgende stappen uit:
     1. Laad ruwe data
-    2. Corrigeer buurtcodes
-    3. Filter op Limburgse buurten
-    4. Voeg COROP-codes toe
+    2-4. Corrigeer buurtcodes, filter op Limburgse buurten en voeg COROP-codes toe (in één gevectoriseerde stap)
     5. Aggregeer data op COROP-niveau
     6. Filter op relevante jaren
     7. Hernoem kolommen naar de juiste indicatorcodes
@@ -207,36 +285,88 @@ def transformeer_leefbarometer_data(
     column_renames (dict): Woordenboek om kolomnamen te hernoemen naar de juiste indicatorcodes.
     relevante_jaren (list): Lijst van jaren om op te nemen in de output.
     regio_mapping (dict): Woordenboek om COROP-namen te mappen naar gewenste output namen. Standaard is None.
+    chunksize (int, optional): Indien opgegeven wordt het CSV-bestand in blokken van dit aantal rijen
+        gestreamd (zie `lees_leefbarometer_limburg_gestreamd`), zodat het geheugengebruik niet
+        afhangt van de grootte van het landelijke bestand. Standaard wordt het bestand in één keer gelezen.
+    geoniveaus (list, optional): Geografische niveaus waarnaar geaggregeerd wordt, bijv.
+        ['wijk', 'gemeente', 'corop', 'provincie', 'nederland'] (zie `aggregeer_geoniveaus`).
+        Standaard alleen COROP-niveau, zoals gepubliceerd.
+    buurt_gewichten (pd.Series, optional): Gewicht per buurtcode (bijv. inwoners of woningen)
+        voor gewogen gemiddelden bij `geoniveaus`. Standaard telt elke buurt even zwaar. Met
+        'nederland' in `geoniveaus` zijn gewichten voor alle buurten van Nederland nodig.
 
     Returns:
-    pandas.DataFrame: Verwerkte Leefbarometer data geaggregeerd op COROP-niveau.
+    pandas.DataFrame: Verwerkte Leefbarometer data geaggregeerd op COROP-niveau (of op `geoniveaus`).
+
+    Raises:
+    ValueError: Als `buurt_gewichten` niet voor alle gebruikte buurten een gewicht bevat.
     """
-    # Stap 1: Laad ruwe data
-    df_lbm_buurt = pd.read_csv(input_bestand_pad)
-    
-    # Stap 2: Corrigeer buurtcodes
-    df_lbm_buurt = corrigeer_bu_codes(
-        df=df_lbm_buurt, 
-        bu_code_kolom="bu_code", 
-        pad_naar_bu_code_correcties=bu_code_correcties_pad
-    )
-    
-    # Stap 3: Filter op Limburgse buurten
-    df_lbm_buurt = filter_limburgse_buurten(
-        df=df_lbm_buurt, 
-        buurt_code_kolom="bu_code", 
-        pad_naar_limburgse_buurten=limburg_buurten_pad
-    )
-    
-    # Stap 4: Voeg COROP-codes toe
-    df_lbm_buurt = map_bu_code_naar_corop_code(
-        df=df_lbm_buurt, 
-        buurt_code_kolom="bu_code", 
-        pad_naar_limburgse_buurten=limburg_buurten_pad
+    # Stap 1: Laad de (per proces gedeelde) geografische referentie
+    geo_referentie = laad_geo_referentie(
+        pad_buurtcodes=limburg_buurten_pad,
+        pad_correcties=bu_code_correcties_pad
     )
+
+    if geoniveaus:
+        # Alle niveaus in één aggregatie; ook niet-Limburgse buurten tellen mee voor Nederland
+        df_lbm_buurt = lees_csv(input_bestand_pad)
+        df_lbm_buurt = df_lbm_buurt[df_lbm_buurt['jaar'].isin(relevante_jaren)]
+        df_lbm_buurt = corrigeer_bu_codes(df_lbm_buurt, 'bu_code', geo_referentie=geo_referentie)
+        gewicht_kolom = None
+        if buurt_gewichten is not None:
+            gewichten = buurt_gewichten.rename(index=lambda code: str(code).upper())
+            df_lbm_buurt = df_lbm_buurt.assign(gewicht=df_lbm_buurt['bu_code'].map(gewichten))
+            gewicht_kolom = 'gewicht'
+
+            # Een buurt zonder gewicht zou stilzwijgend wegvallen uit het gewogen gemiddelde
+            zonder_gewicht = df_lbm_buurt['gewicht'].isna()
+            in_limburg = df_lbm_buurt['bu_code'].astype(str).str.upper().isin(geo_referentie.bu_codes)
+            if (zonder_gewicht & in_limburg).any():
+                raise ValueError(
+                    f"Geen gewicht voor {df_lbm_buurt.loc[zonder_gewicht & in_limburg, 'bu_code'].nunique()} "
+                    "Limburgse buurten in buurt_gewichten"
+                )
+            if 'nederland' in geoniveaus and (zonder_gewicht & ~in_limburg).any():
+                raise ValueError(
+                    f"Geen gewicht voor {df_lbm_buurt.loc[zonder_gewicht & ~in_limburg, 'bu_code'].nunique()} "
+                    "buurten buiten Limburg; geef gewichten voor alle buurten van Nederland of laat 'nederland' weg"
+                )
+
+        geaggregeerd = aggregeer_geoniveaus(
+            df_lbm_buurt, ['lbm', 'fys', 'vrz'],
+            niveaus=geoniveaus,
+            groep_kolommen=['jaar'],
+            gewicht_kolom=gewicht_kolom,
+            geo_referentie=geo_referentie
+        )
+
+        # Dezelfde geoitems als op COROP-niveau: de namen van COROP-gebieden (en 'Nederland') via regio_mapping
+        namen = dict(zip(
+            geo_referentie.niveau_mapping('corop').str.lower(), geo_referentie.niveau_mapping('corop', naam=True)
+        ))
+        namen[CODE_NEDERLAND] = 'Nederland'
+        geoitems = geaggregeerd['geoitem'].astype(str)
+        geaggregeerd['geoitem'] = geoitems.map(namen).map(regio_mapping).fillna(geoitems)
+        return pas_indicator_schema_toe(geaggregeerd.rename(columns=column_renames))
+
+    if chunksize:
+        # Stap 1-4 gestreamd: per blok inlezen, corrigeren, filteren en COROP-codes toevoegen
+        df_lbm_buurt = lees_leefbarometer_limburg_gestreamd(
+            input_bestand_pad, geo_referentie, relevante_jaren, chunksize=chunksize
+        )
+    else:
+        # Stap 1: Laad ruwe data
+        df_lbm_buurt = lees_csv(input_bestand_pad)
+
+        # Stap 2-4: Corrigeer buurtcodes, filter op Limburgse buurten en voeg COROP-codes toe
+        df_lbm_buurt = corrigeer_filter_en_map_buurten(
+            df=df_lbm_buurt,
+            bu_code_kolom="bu_code",
+            geo_referentie=geo_referentie
+        )
     
     # Stap 5: Aggregeer data op COROP-niveau
-    gegroepeerde_data_limburg = df_lbm_buurt.groupby(['COROP_NAAM', 'jaar'], as_index=False).agg({
+    gegroepeerde_data_limburg = df_lbm_buurt.groupby(['COROP_NAAM', 'jaar'], as_index=False, observed=True).agg({
         'lbm': 'mean',  # MO_10a: Gemiddelde leefbaarheidsscore
         'fys': 'mean',  # D_39a: Gemiddelde score fysieke omgeving
         'vrz': 'mean'   # D_39aa: Gemiddelde score voorzieningen
@@ -251,11 +381,23 @@ def transformeer_leefbarometer_data(
     
     gegroepeerde_data_limburg['geolevel'] = 'corop_id'
     
-    return gegroepeerde_data_limburg
+    return pas_indicator_schema_toe(gegroepeerde_data_limburg)
+
+@meet_stap
+def laad_woningtekort_data(regio_mapping, data_map='../../../data'):
+    """
+    Laadt en combineert de woningtekortcijfers (MO_11a) uit de jaarlijkse Woningtekort- en Primos-bestanden.
+
+    Parameters:
+    regio_mapping (dict): Mapping van regionamen naar hun codes.
+    data_map (str, optional): Pad naar de data-map van de repository. Standaard relatief
+        vanuit de transformatiemap van het team.
 
-def laad_woningtekort_data(regio_mapping):
+    Returns:
+    pandas.DataFrame: Woningtekort per regio en jaar, met kolommen 'geoitem', 'period', 'mo_11a' en 'geolevel'.
+    """
     # 2025
-    df_2025 = pd.read_excel('../../../data/Woningtekort/Woningtekort - 2025 - COROP-gebieden.xlsx', skiprows=1)
+    df_2025 = lees_excel(f'{data_map}/Woningtekort/Woningtekort - 2025 - COROP-gebieden.xlsx', skiprows=1)
     df_2025 = df_2025.iloc[:3, :]
     df_2025.columns = ['Regio', 'aantal']
     df_2025['period'] = '2025'
@@ -263,7 +405,7 @@ def laad_woningtekort_data(regio_mapping):
     df_2025['aantal'] =  df_2025['aantal'].astype(float).abs() * 100
 
     # 2024
-    df_2024 = pd.read_excel('../../../data/Woningtekort/Woningtekort - 2024 - COROP-gebieden.xlsx', skiprows=1)
+    df_2024 = lees_excel(f'{data_map}/Woningtekort/Woningtekort - 2024 - COROP-gebieden.xlsx', skiprows=1)
     df_2024 = df_2024.iloc[:3, :]
     df_2024.columns = ['Regio', 'aantal']
     df_2024['period'] = '2024'
@@ -272,8 +414,8 @@ def laad_woningtekort_data(regio_mapping):
 
     # 2023
     # Inlezen van de data
-    df_2023 = pd.read_excel(
-        '../../../data/Woningtekort/Woningtekort - COROP-gebieden 2023.xlsx'
+    df_2023 = lees_excel(
+        f'{data_map}/Woningtekort/Woningtekort - COROP-gebieden 2023.xlsx'
     ).iloc[[2], 1:4]
 
     df_2023.columns = ['Noord-Limburg', 'Midden-Limburg', 'Zuid-Limburg']
@@ -287,53 +429,47 @@ def laad_woningtekort_data(regio_mapping):
     # Voeg woningvoorraad waardes toe uit Woningmonitor 2024
     df_2023['woningvoorraad'] = [296021, 111531, 127375]
 
-    # Bereken het percentage woningtekort
-    df_2023['aantal'] = abs((df_2023['woningtekort'] / df_2023['woningvoorraad']) * 100)
-
-    # Drop de onnodige kolommen
-    df_2023.drop(['woningtekort', 'woningvoorraad'], axis=1, inplace=True)
-
-
-
     # 2022
-    df_2022 = pd.read_excel('../../../data/Woningtekort/Actueel woningtekort Primos 2022.xlsx').iloc[:3, [0, 2]]
+    df_2022 = lees_excel(f'{data_map}/Woningtekort/Actueel woningtekort Primos 2022.xlsx').iloc[:3, [0, 2]]
     df_2022 = df_2022.rename(columns={'Unnamed: 0': 'Regio', 'Woningtekort 2022 (%)': 'aantal'})
     df_2022['period'] = '2022'
     df_2022['aantal'] =  df_2022['aantal'].astype(float).abs() * 100
 
     # 2021
-    df_2021 = pd.read_excel('../../../data/Woningtekort/Actueel woningtekort Primos 2021.xlsx', sheet_name='Actueel woningtekort').iloc[:3, [0, 2]]
+    df_2021 = lees_excel(f'{data_map}/Woningtekort/Actueel woningtekort Primos 2021.xlsx', sheet_name='Actueel woningtekort').iloc[:3, [0, 2]]
     df_2021 = df_2021.rename(columns={'Unnamed: 0': 'Regio', 'Actueel woningtekort (%)': 'aantal'})
     df_2021['period'] = '2021'
     df_2021['aantal'] =  df_2022['aantal'].astype(float)
 
     # 2019
     # 2019 Woningvoorraad
-    df_2019_woningvoorraad = pd.read_excel(
-        '../../../data/Woningtekort/Primos 2019 Ontwikkeling woningvoorraad  - NL Limburg COROP-gebieden.xls'
+    df_2019_woningvoorraad = lees_excel(
+        f'{data_map}/Woningtekort/Primos 2019 Ontwikkeling woningvoorraad  - NL Limburg COROP-gebieden.xls'
     ).iloc[[3], [1, 5, 9, 13]]
     df_2019_woningvoorraad.columns = ['Noord-Limburg', 'Midden-Limburg', 'Zuid-Limburg', 'Nederland']
     df_2019_woningvoorraad = df_2019_woningvoorraad.melt(var_name='Regio', value_name='woningvoorraad')
+    df_2019_woningvoorraad['period'] = '2019'
 
     # 2019 Woningbehoefte
-    df_2019_woningbehoefte = pd.read_excel(
-        '../../../data/Woningtekort/Primos 2019 woningbehoefte  - NL Limburg COROP-gebieden 2019.xls'
+    df_2019_woningbehoefte = lees_excel(
+        f'{data_map}/Woningtekort/Primos 2019 woningbehoefte  - NL Limburg COROP-gebieden 2019.xls'
     ).iloc[[3], [5, 10, 15, 20]]
     df_2019_woningbehoefte.columns = ['Noord-Limburg', 'Midden-Limburg', 'Zuid-Limburg', 'Nederland']
     df_2019_woningbehoefte = df_2019_woningbehoefte.melt(var_name='Regio', value_name='woningbehoefte')
+    df_2019_woningbehoefte['period'] = '2019'
 
-    # Samenvoegen van de dataframes
-    df_2019 = pd.merge(df_2019_woningvoorraad, df_2019_woningbehoefte, on='Regio')
-    df_2019['period'] = '2019'
-
-    # Berekening van het tekort
-    df_2019['aantal'] = ((df_2019['woningbehoefte'] - df_2019['woningvoorraad']) / df_2019['woningvoorraad']) * 100
-
-    # Drop onnodige kolommen
-    df_2019.drop(['woningvoorraad', 'woningbehoefte'], axis=1, inplace=True)
+    # Tekort als percentage van de woningvoorraad, voor 2019 (Primos) en 2023 (ABF) in één kubus
+    kubus = IndicatorKubus.uit_dataframes(
+        [df_2019_woningvoorraad, df_2019_woningbehoefte, df_2023],
+        geo_kolom='Regio', periode_kolom='period'
+    )
+    kubus.voeg_toe(
+        "tekort_primos = (woningbehoefte - woningvoorraad) / woningvoorraad * 100",
+        "tekort_abf = abs(woningtekort / woningvoorraad * 100)",
+    )
+    df_2019 = kubus.naar_dataframe('tekort_primos', kolom='aantal')
+    df_2023 = kubus.naar_dataframe('tekort_abf', kolom='aantal')
 
-    
-    
     ### Voeg missende Nederland waardes toe
     dict_ned = {
         2020: 4.2, # https://www.rijksoverheid.nl/actueel/nieuws/2020/06/15/staat-van-de-woningmarkt-2020
@@ -360,12 +496,19 @@ def laad_woningtekort_data(regio_mapping):
 
     return df_mo_11a
 
-def laad_data_invoerapplicatie(bron_bestanden: Union[str, List[str]]) -> pd.DataFrame:
+@meet_stap
+def laad_data_invoerapplicatie(bron_bestanden: Union[str, List[str]], max_workers: int = 4) -> pd.DataFrame:
     """
     Laadt en verwerkt één of meerdere bronbestanden, combineert resultaten in één DataFrame.
+
+    De bestanden worden gelijktijdig ingelezen (in threads, zodat waarschuwingen over
+    bijv. de kolom 'Operationeel databewaker' gewoon zichtbaar blijven). Daarna volgen
+    één concat en één pivot over alle bestanden. Net als voorheen levert elk bestand
+    zijn eigen rijen op, in de volgorde van `bron_bestanden`.
     
     Parameters:
         bron_bestanden (str of list van str): Eén of meerdere paden naar bestanden.
+        max_workers (int, optional): Maximaal aantal bestanden dat tegelijk wordt ingelezen.
     
     Returns:
         pd.DataFrame: Gecombineerde resultaten.
@@ -373,32 +516,105 @@ def laad_data_invoerapplicatie(bron_bestanden: Union[str, List[str]]) -> pd.Data
     # Sta toe dat er een string mee wordt gegeven
     if isinstance(bron_bestanden, str):
         bron_bestanden = [bron_bestanden]
+    if not bron_bestanden:
+        return pd.DataFrame()
 
-    # Verwerk alle bestanden en voeg samen
-    alle_df = []
-    for bestand in bron_bestanden:
-        df = laad_en_verwerk_enkel_invoerbestand(bestand)
-        alle_df.append(df)
+    # Lees alle bestanden gelijktijdig in
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        alle_df = list(pool.map(lees_invoerbestand, bron_bestanden))
 
-    # Combineer alles tot één DataFrame
-    if alle_df:
-        resultaat = pd.concat(alle_df, ignore_index=True)
-    else:
-        resultaat = pd.DataFrame()
+    # Combineer alles tot één DataFrame; het bestandsnummer houdt de rijen per bestand apart
+    df = pd.concat(
+        [df.assign(bestand_nr=nr) for nr, df in enumerate(alle_df)],
+        ignore_index=True
+    )
+    resultaat = pivoteer_invoer(df, index=['bestand_nr', 'geolevel', 'geoitem', 'period'])
+    resultaat = resultaat.drop(columns=['bestand_nr'])
+
+    # Kolomvolgorde: per bestand de (gesorteerde) indicatoren, in volgorde van eerste voorkomen
+    indicator_kolommen = []
+    for df in alle_df:
+        for indicator in sorted(df.dropna(subset=['period', 'Invoerveld'])['Indicator_nr'].unique()):
+            if indicator not in indicator_kolommen and indicator in resultaat.columns:
+                indicator_kolommen.append(indicator)
+    return pas_indicator_schema_toe(resultaat[['geolevel', 'geoitem', 'period'] + indicator_kolommen])
+
+# Oppervlakte (km²) van de Limburgse COROP-regio's en Nederland, bron: 70072NED (2025JJ00).
+# Terugval voor als de CBS-tabel niet opgehaald kan worden en niet in de cache staat.
+REGIO_OPPERVLAKTE_TERUGVAL = {
+    'nl00': 41543.37,  # Nederland
+    'cr37': 854.14,   # Noord-Limburg
+    'cr38': 694.8,   # Midden-Limburg
+    'cr39': 660.91    # Zuid-Limburg
+}
+
+# Geolevel per prefix van de regiocode
+GEOLEVEL_PER_PREFIX = {
+    'nl': 'nederland',
+    'pv': 'prov_id',
+    'cr': 'corop_id',
+    'gm': 'gemeente_id',
+    'wk': 'wijk_id',
+    'bu': 'buurt_id',
+}
+
+@meet_stap
+def bepaal_regio_oppervlakte(regio_codes, table_code='70072NED', **kwargs):
+    """
+    Geeft de oppervlakte (km²) van de opgegeven regio's, uit de (gecachte) CBS-tabel
+    `table_code` (zie `download_cbs_oppervlakte`). Is het CBS niet bereikbaar of staat de
+    tabel offline niet in de cache, dan wordt teruggevallen op `REGIO_OPPERVLAKTE_TERUGVAL`.
+
+    Parameters:
+    -----------
+    regio_codes (iterable): Regiocodes, bijv. ['nl00', 'cr37', 'gm0889'].
+    table_code (str, optional): CBS-tabel met oppervlaktes; voor wijken en buurten een
+        tabel met de Kerncijfers wijken en buurten.
+    **kwargs: Overige argumenten voor `download_cbs_oppervlakte`.
 
-    return resultaat
+    Returns:
+    --------
+    pd.Series: Oppervlakte in km², geïndexeerd op regiocode.
+
+    Raises:
+    -------
+    KeyError: Als van een opgegeven regio geen oppervlakte bekend is, ook niet als terugval.
+    """
+    regio_codes = sorted({code.lower() for code in regio_codes})
+    terugval = pd.Series(REGIO_OPPERVLAKTE_TERUGVAL, name='oppervlakte')
+    try:
+        oppervlakte = download_cbs_oppervlakte(regio_codes, table_code=table_code, **kwargs)
+    except (requests.RequestException, FileNotFoundError) as e:
+        # Alleen bij netwerkfouten of een ontbrekende offline-cache; andere fouten wijzen op een probleem met de tabel
+        print(f"Waarschuwing: Oppervlaktes uit CBS-tabel {table_code} niet beschikbaar ({e}); vaste waarden gebruikt.")
+        oppervlakte = terugval.iloc[:0]
+    oppervlakte = oppervlakte.combine_first(terugval)
+
+    ontbrekend = [code for code in regio_codes if code not in oppervlakte.index]
+    if ontbrekend:
+        raise KeyError(f"Geen oppervlakte bekend voor de regio's {ontbrekend} (CBS-tabel {table_code}).")
+    return oppervlakte
 
 # Functie om CBS data verder te transformeren
-def transformeer_cbs_data(df, geolevel, hele_jaren=False):
+@meet_stap
+def transformeer_cbs_data(df, geolevel=None, hele_jaren=False, oppervlakte=None):
     """
     Transformeert de CBS data door filters toe te passen,
     berekeningen uit te voeren, en de dataset te herstructureren.
 
+    MO_12d (ruimte per inwoner) is de oppervlakte van de regio gedeeld door het aantal
+    inwoners, maal 1000. De oppervlakte wordt per regiocode gekoppeld, zodat dit voor elk
+    regioniveau werkt (COROP, gemeente, wijk, buurt). Is van een regio geen oppervlakte
+    bekend, dan geeft `bepaal_regio_oppervlakte` een KeyError.
+
     Parameters:
     -----------
-    df (pd.DataFrame): De originele dataset met CBS data.
-    geolevel (str): Geografisch niveau (bijv. 'corop_id').
+    df (pd.DataFrame): De originele dataset met CBS data, met regiocodes in 'RegioS'.
+    geolevel (str, optional): Geografisch niveau (bijv. 'corop_id') van alle regio's behalve
+        Nederland. Standaard afgeleid uit de prefix van de regiocode (zie `GEOLEVEL_PER_PREFIX`).
     hele_jaren (bool): Indien True, filter op hele jaren (standaard False).
+    oppervlakte (pd.Series, optional): Oppervlakte in km² per regiocode. Standaard opgehaald
+        met `bepaal_regio_oppervlakte`.
 
     Returns:
     --------
@@ -412,20 +628,14 @@ def transformeer_cbs_data(df, geolevel, hele_jaren=False):
 
     # FILTER: Alleen hele jaren als hele_jaren==True
     if hele_jaren:
-        # Voorbeelden hele jaren: '2023', '2024JJ00'
-        jaar_regex = re.compile(r"^(?:\d{4}JJ00|\d{4})$")
-        df = df[df['Perioden'].astype(str).str.match(jaar_regex)]
+        # Voorbeelden hele jaren: '2023', '2024JJ00' (maanden en kwartalen vallen af)
+        df = df[periode_soort(parseer_perioden(df['Perioden'])) == JAAR]
 
     # Oppervlakte blijft stabiel, dus we kunnen deze gebruiken om de bevolkingsdichtheid te berekenen
-    # Bron: 70072NED (2025JJ00)
-    regio_oppervlakte_mapping = {
-        'nl00': 41543.37,  # Nederland
-        'cr37': 854.14,   # Noord-Limburg
-        'cr38': 694.8,   # Midden-Limburg
-        'cr39': 660.91    # Zuid-Limburg
-    }
+    if oppervlakte is None:
+        oppervlakte = bepaal_regio_oppervlakte(df['RegioS'].unique())
 
-    df['mo_12d'] = df.apply(lambda row: (regio_oppervlakte_mapping.get(row['RegioS']) / row['BevolkingAanHetEindeVanDePeriode_15']) * 1000, axis=1)
+    df['mo_12d'] = df['RegioS'].map(oppervlakte) / df['BevolkingAanHetEindeVanDePeriode_15'] * 1000
 
     # Verwijder de nu overbodige kolommen
     df = df.drop(['BevolkingAanHetEindeVanDePeriode_15'], axis=1)
@@ -439,14 +649,19 @@ def transformeer_cbs_data(df, geolevel, hele_jaren=False):
         'Perioden': 'period'
     })
 
-    # Voeg een nieuwe kolom toe voor geolevel ('cr' voor COROP-regio's)
-    df['geolevel'] = df['geoitem'].apply(lambda x: 'nederland' if x == 'nl00' else geolevel)
+    # Voeg een nieuwe kolom toe voor geolevel, op basis van de prefix van de regiocode
+    is_nederland = df['geoitem'] == 'nl00'
+    if geolevel:
+        df['geolevel'] = pd.Series(geolevel, index=df.index).mask(is_nederland, 'nederland')
+    else:
+        df['geolevel'] = df['geoitem'].str[:2].map(GEOLEVEL_PER_PREFIX)
 
-    return df
+    return pas_indicator_schema_toe(df)
 
 
 
 
+@meet_stap
 def transformeer_planrealisaties_juno(brond_bestand: pd.DataFrame, year: int, regio_mapping: dict) -> pd.DataFrame:
     """
     Transformeert planrealisaties data specifiek voor het Juno-bestand.
@@ -462,7 +677,7 @@ def transformeer_planrealisaties_juno(brond_bestand: pd.DataFrame, year: int, re
     pd.DataFrame: Getransformeerde planrealisaties data.
     """
     # Inlezen van het Juno-bestand en selecteren van relevante kolommen
-    df = pd.read_excel(brond_bestand)
+    df = lees_excel(brond_bestand)
     df = df[['Gemeente', 'COROP', 'Soort', 'Aantal toevoegingen', 'Aantal onttrekkingen', 'Huur/Koop', 'Prijsklasse', 'Woningtype', 'In-/uitbreidingslocatie']]
 
     # Toevoegen van geolevel en geoitem op basis van COROP-code
@@ -470,54 +685,89 @@ def transformeer_planrealisaties_juno(brond_bestand: pd.DataFrame, year: int, re
     df = df['COROP'].map(regio_mapping).to_frame('geoitem').join(df.drop(columns=['COROP']))
     df['period'] = year
 
-    # Bepalen van d_40a (bruto toevoegingen) en d_40b (netto toevoegingen)
-    df_d_40a = df.groupby(['geoitem', 'geolevel', 'period'])['Aantal toevoegingen'].sum().reset_index()
-    df_d_40a = df_d_40a.rename(columns={'Aantal toevoegingen': 'd_40a'})
-
-    # Netto toevoegingen berekenen als bruto toevoegingen minus onttrekkingen
-    df_d_40b = df.groupby(['geoitem', 'geolevel', 'period'])['Aantal toevoegingen'].sum().reset_index()
-    df_d_40b['d_40b'] = df_d_40b['Aantal toevoegingen'] - df.groupby(['geoitem', 'geolevel', 'period'])['Aantal onttrekkingen'].sum().reset_index()['Aantal onttrekkingen']
-    df_d_40b = df_d_40b.drop(columns=['Aantal toevoegingen'])
-
     # 41a: Aandeel gerealiseerde woningen in de betaalbare prijsklasse t.o.v. het totale aantal gerealiseerde woningen.
     betaalbare_prijsklasse = [
         'Goedkope sociale huur', 'Betaalbare sociale huur', 'Dure sociale huur', 'Middeldure huur',
         'Betaalbaar laag koop', 'Betaalbaar midden koop', 'Betaalbaar hoog koop'
         ]
-    
+
     # Maak een nieuwe kolom 'is_betaalbaar' die aangeeft of de woning in een betaalbare prijsklasse valt
     df['is_betaalbaar'] = df['Prijsklasse'].isin(betaalbare_prijsklasse)
+    df['betaalbare_toevoegingen'] = df['Aantal toevoegingen'].where(df['is_betaalbaar'], 0)
+
+    # Eén groupby voor bruto toevoegingen, onttrekkingen en betaalbare toevoegingen tegelijk
+    totalen = df.groupby(['geoitem', 'geolevel', 'period'], observed=True).agg(
+        d_40a=('Aantal toevoegingen', 'sum'),
+        onttrekkingen=('Aantal onttrekkingen', 'sum'),
+        betaalbaar=('betaalbare_toevoegingen', 'sum'),
+        heeft_betaalbaar=('is_betaalbaar', 'any'),
+    ).reset_index()
+
+    # d_40a (bruto toevoegingen)
+    df_d_40a = totalen[['geoitem', 'geolevel', 'period', 'd_40a']]
+
+    # d_40b: netto toevoegingen berekenen als bruto toevoegingen minus onttrekkingen
+    df_d_40b = totalen[['geoitem', 'geolevel', 'period']].assign(d_40b=totalen['d_40a'] - totalen['onttrekkingen'])
+
+    # d_41a: aantal toevoegingen in betaalbare prijsklassen gedeeld door het totale aantal toevoegingen (d_40a),
+    # als percentage en alleen voor regio's met ten minste één woning in een betaalbare prijsklasse
+    kubus = IndicatorKubus.uit_dataframes(
+        [totalen], maten=['d_40a', 'betaalbaar', 'heeft_betaalbaar'], geo_kenmerken=['geolevel']
+    )
+    kubus.voeg_toe("d_41a = betaalbaar / d_40a * 100")
+    df_d_41a = kubus.naar_dataframe('d_41a', waar='heeft_betaalbaar')
+    df_d_41a['d_41a'] = df_d_41a['d_41a'].apply(lambda x: f"{x:.1f}".replace('.', ','))
+
+    return pas_indicator_schema_toe(df_d_40a), pas_indicator_schema_toe(df_d_40b), pas_indicator_schema_toe(df_d_41a)
 
-    # df_d_41a berekenen door het aantal toevoegingen in betaalbare prijsklassen te sommeren en dit te delen door het totale aantal toevoegingen (d_40a)
-    df_d_41a = df[df['is_betaalbaar']].groupby(['geoitem', 'geolevel', 'period'])['Aantal toevoegingen'].sum().reset_index()
-    df_d_41a = df_d_41a.rename(columns={'Aantal toevoegingen': 'aantal_betaalbare_woningen'})
-    df_d_41a = df_d_41a.merge(df_d_40a, on=['geoitem', 'geolevel', 'period'])
 
-    # Bereken het aandeel betaalbare woningen ten opzichte van het totale aantal gerealiseerde woningen
-    df_d_41a['d_41a'] = df_d_41a['aantal_betaalbare_woningen'] / df_d_41a['d_40a']
-    df_d_41a = df_d_41a.drop(columns=['aantal_betaalbare_woningen', 'd_40a'])
-    df_d_41a['d_41a'] = df_d_41a['d_41a'] * 100 # Omzetten naar percentage
-    df_d_41a['d_41a'] = df_d_41a['d_41a'].apply(lambda x: f"{x:.1f}".replace('.', ','))
 
-    return df_d_40a, df_d_40b, df_d_41a
+def bepaal_jaar_uit_bestandsnaam(bestand: str) -> int:
+    """
+    Bepaalt het jaar van een JUNO-bestand uit de bestandsnaam, bijv. 'Planrealisaties 2024 (JUNO).xlsx' -> 2024.
 
+    Raises:
+    -------
+    ValueError: Als de bestandsnaam geen (eenduidig) jaartal bevat.
+    """
+    jaren = set(re.findall(r"(?<!\d)((?:19|20)\d{2})(?!\d)", os.path.basename(bestand)))
+    if len(jaren) != 1:
+        raise ValueError(f"Kan het jaar niet eenduidig bepalen uit de bestandsnaam: {bestand}")
+    return int(jaren.pop())
 
 
-def transformeer_planrealisaties(bron_bestanden: Union[str, List[str]], regio_mapping: dict) -> pd.DataFrame:
+@meet_stap
+def transformeer_planrealisaties(bron_bestanden: Union[str, List[str]], regio_mapping: dict, max_workers: int = None) -> pd.DataFrame:
     """
     Laadt en transformeert planrealisaties data uit één of meerdere bronbestanden.
 
+    Het eerste bestand is het ETIL-bestand (2004-2023); de overige bestanden zijn JUNO-bestanden
+    met één jaar per bestand. Het jaar wordt uit de bestandsnaam gehaald. Meerdere JUNO-bestanden
+    worden parallel in aparte processen ingelezen en aan het eind in één keer samengevoegd.
+    Draait de functie zelf al in een werkproces (zoals een stap in de runner), dan worden de
+    bestanden standaard na elkaar ingelezen: dat voorkomt een pool per werkproces, en de
+    bestandscache in het geheugen van het werkproces blijft bruikbaar.
+
     Parameters:
     -----------
     bron_bestanden (str of list van str): Pad of paden naar de bronbestanden.
     regio_mapping (dict): Mapping van COROP-namen naar geoitems.
+    max_workers (int, optional): Maximaal aantal processen voor het inlezen van de JUNO-bestanden;
+        1 leest ze na elkaar in. Standaard het aantal cores, of 1 binnen een werkproces.
 
     Returns:
     --------
     pd.DataFrame: Getransformeerde planrealisaties data.
+
+    Raises:
+    -------
+    ValueError: Als het jaar van een JUNO-bestand niet te bepalen is of meerdere bestanden hetzelfde jaar hebben.
     """
+    if isinstance(bron_bestanden, str):
+        bron_bestanden = [bron_bestanden]
+
     # Laad en verwerk de invoerbestanden
-    df_2004_2023 = pd.read_excel(bron_bestanden[0])
+    df_2004_2023 = lees_excel(bron_bestanden[0])
     
     # Hernoemen van kolommen voor consistentie
     df = df_2004_2023.rename(columns={
@@ -531,18 +781,37 @@ def transformeer_planrealisaties(bron_bestanden: Union[str, List[str]], regio_ma
     df_d_40b = df[df['variablecode'] == 'd_40b'][['geoitem', 'geolevel', 'period', 'value']].rename(columns={'value': 'd_40b'})
     df_d_41a = df[df['variablecode'] == 'd_41a'][['geoitem', 'geolevel', 'period', 'value']].rename(columns={'value': 'd_41a'})
 
-    year = 2024
-    for bestand in bron_bestanden[1:]:
-        temp_df_d_40a, temp_df_d_40b, temp_df_d_41a = transformeer_planrealisaties_juno(bestand, year, regio_mapping)
-        
-        # sorteer op geoitem, period
-        df_d_40a = pd.concat([df_d_40a, temp_df_d_40a], ignore_index=True).sort_values(by=['geoitem', 'period'])
-        df_d_40b = pd.concat([df_d_40b, temp_df_d_40b], ignore_index=True).sort_values(by=['geoitem', 'period'])
-        df_d_41a = pd.concat([df_d_41a, temp_df_d_41a], ignore_index=True).sort_values(by=['geoitem', 'period'])
+    juno_bestanden = bron_bestanden[1:]
+    if not juno_bestanden:
+        return pas_indicator_schema_toe(df_d_40a), pas_indicator_schema_toe(df_d_40b), pas_indicator_schema_toe(df_d_41a)
 
-        year = year + 1
-
-    return df_d_40a, df_d_40b, df_d_41a
-    
+    # Bepaal per JUNO-bestand het jaar en verwerk de bestanden in volgorde van jaar
+    jaren = {bestand: bepaal_jaar_uit_bestandsnaam(bestand) for bestand in juno_bestanden}
+    dubbele_jaren = sorted({jaar for jaar in jaren.values() if list(jaren.values()).count(jaar) > 1})
+    if dubbele_jaren:
+        raise ValueError(f"Meerdere JUNO-bestanden voor hetzelfde jaar: {', '.join(map(str, dubbele_jaren))}")
+    juno_bestanden = sorted(juno_bestanden, key=jaren.get)
 
+    if max_workers is None:
+        max_workers = 1 if multiprocessing.parent_process() is not None else os.cpu_count() or 1
+    max_workers = min(max_workers, len(juno_bestanden))
 
+    if max_workers == 1:
+        juno_resultaten = [
+            transformeer_planrealisaties_juno(bestand, jaren[bestand], regio_mapping) for bestand in juno_bestanden
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            juno_resultaten = list(pool.map(
+                transformeer_planrealisaties_juno,
+                juno_bestanden,
+                [jaren[bestand] for bestand in juno_bestanden],
+                [regio_mapping] * len(juno_bestanden),
+            ))
+
+    # Eén concat en één sortering (op geoitem, period) per indicator
+    df_d_40a = pd.concat([df_d_40a] + [r[0] for r in juno_resultaten], ignore_index=True).sort_values(by=['geoitem', 'period'])
+    df_d_40b = pd.concat([df_d_40b] + [r[1] for r in juno_resultaten], ignore_index=True).sort_values(by=['geoitem', 'period'])
+    df_d_41a = pd.concat([df_d_41a] + [r[2] for r in juno_resultaten], ignore_index=True).sort_values(by=['geoitem', 'period'])
+
+    return pas_indicator_schema_toe(df_d_40a), pas_indicator_schema_toe(df_d_40b), pas_indicator_schema_toe(df_d_41a)
@@ -0,0 +1,99 @@
+import os
+import sys
+
+# Tests draaien vanuit de root van de repository, net als de pipeline zelf
+ROOT_MAP = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_MAP not in sys.path:
+    sys.path.insert(0, ROOT_MAP)
+
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cbsodata
+import pytest
+
+
+class CbsStub:
+    """
+    Kleine nabootsing van de OData-endpoints van het CBS voor één tabel: de root-lijst,
+    'TableInfos' (met 'Modified'), 'DataProperties', de dimensies, de dataset en '$count'.
+    `verzoeken` bevat het laatste padsegment van elk ontvangen verzoek.
+    """
+
+    def __init__(self):
+        self.gewijzigd = "2025-01-01T00:00:00"
+        self.dimensies = {
+            "RegioS": [{"Key": "NL01  ", "Title": "Nederland"}, {"Key": "CR37    ", "Title": "Noord-Limburg (CR)"}],
+            "Perioden": [{"Key": "2024JJ00", "Title": "2024"}],
+        }
+        self.rijen = [
+            {"ID": 0, "RegioS": "NL01  ", "Perioden": "2024JJ00", "Bevolking_1": 17942942},
+            {"ID": 1, "RegioS": "CR37    ", "Perioden": "2024JJ00", "Bevolking_1": 533211},
+        ]
+        self.verzoeken = []
+
+    def antwoord(self, pad, parameters):
+        segment = pad.rstrip("/").split("/")[-1]
+        self.verzoeken.append(segment)
+        rijen = self.rijen
+        filter_ = parameters.get("$filter", [""])[0]
+        if "startswith(RegioS," in filter_:
+            prefixen = [deel.split("'")[1] for deel in filter_.split("startswith(RegioS,")[1:]]
+            rijen = [rij for rij in rijen if rij["RegioS"].startswith(tuple(prefixen))]
+        if segment == "$count":
+            return str(len(rijen))
+        if segment == "TableInfos":
+            waarde = [{"Identifier": "TEST", "Modified": self.gewijzigd}]
+        elif segment == "DataProperties":
+            waarde = [
+                {"Key": "RegioS", "Type": "GeoDimension"},
+                {"Key": "Perioden", "Type": "TimeDimension"},
+                {"Key": "Bevolking_1", "Type": "Topic"},
+            ]
+        elif segment in self.dimensies:
+            waarde = self.dimensies[segment]
+        elif segment in ("TypedDataSet", "UntypedDataSet"):
+            skip = int(parameters.get("$skip", ["0"])[0])
+            top = int(parameters.get("$top", [str(len(rijen))])[0])
+            waarde = rijen[skip:skip + top]
+        else:
+            namen = ["TableInfos", "UntypedDataSet", "TypedDataSet", "DataProperties", "CategoryGroups", *self.dimensies]
+            waarde = [{"name": naam, "url": f"{pad.rstrip('/')}/{naam}"} for naam in namen]
+        return json.dumps({"value": waarde})
+
+
+@pytest.fixture
+def cbs_stub(monkeypatch, tmp_path):
+    """Start een `CbsStub` op localhost, laat cbsodata en de CBS-cache (in `tmp_path`) daarnaar wijzen."""
+    from api_scripts import cbs_cache
+
+    stub = CbsStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            inhoud = stub.antwoord(url.path, parse_qs(url.query)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(inhoud)))
+            self.end_headers()
+            self.wfile.write(inhoud)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(cbsodata.options, "catalog_url", f"127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(cbsodata.options, "use_https", False)
+    monkeypatch.setattr(cbs_cache, "CACHE_MAP", tmp_path / "cbs")
+    monkeypatch.delenv("CBS_OFFLINE", raising=False)
+    try:
+        yield stub
+    finally:
+        server.shutdown()
+        server.server_close()
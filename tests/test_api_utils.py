@@ -0,0 +1,30 @@
+from api_scripts.api_utils import download_cbs_oppervlakte, download_cbs_tabel_parallel
+
+
+def test_dimensies_uit_lijst_met_endpoints(cbs_stub):
+    cbs_stub.dimensies["Geslacht"] = [{"Key": "T001038", "Title": "Totaal mannen en vrouwen"}]
+    for rij in cbs_stub.rijen:
+        rij["Geslacht"] = "T001038"
+
+    data = download_cbs_tabel_parallel("TEST", max_workers=2)
+    assert "DataProperties" not in cbs_stub.verzoeken
+    assert sorted(data["RegioS"]) == ["Nederland", "Noord-Limburg (CR)"]
+    assert set(data["Geslacht"]) == {"Totaal mannen en vrouwen"}
+    assert set(data["Perioden"]) == {"2024"}
+
+
+def test_behoud_codes(cbs_stub):
+    data = download_cbs_tabel_parallel("TEST", max_workers=1, behoud_codes=["RegioS"])
+    assert sorted(data["RegioS"].str.strip()) == ["CR37", "NL01"]
+    assert set(data["Perioden"]) == {"2024"}
+
+
+def test_oppervlakte_op_regiocode_meest_recente_periode(cbs_stub):
+    cbs_stub.rijen = [
+        {"ID": 0, "RegioS": "NL01  ", "Perioden": "2024JJ00", "TotaleOppervlakte_1": 41540.0},
+        {"ID": 1, "RegioS": "NL01  ", "Perioden": "2025JJ00", "TotaleOppervlakte_1": 41543.37},
+        {"ID": 2, "RegioS": "CR37    ", "Perioden": "2024JJ00", "TotaleOppervlakte_1": 854.14},
+        {"ID": 3, "RegioS": "CR37    ", "Perioden": "2025JJ00", "TotaleOppervlakte_1": None},
+    ]
+    oppervlakte = download_cbs_oppervlakte(["nl00", "cr37"], table_code="TEST", use_cache=False)
+    assert oppervlakte.sort_index().to_dict() == {"cr37": 854.14, "nl00": 41543.37}
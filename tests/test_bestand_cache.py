@@ -0,0 +1,58 @@
+import os
+import time
+
+import pandas as pd
+
+from pipeline_scripts import bestand_cache
+from pipeline_scripts.bestand_cache import lees_cache, lees_csv, ruim_cache_op, schrijf_cache
+
+
+def test_schrijf_en_lees_cache(tmp_path):
+    df = pd.DataFrame({"geoitem": ["cr37", "cr38"], "aantal": [1.5, 2.0]})
+    schrijf_cache(df, tmp_path / "MO_11a")
+    assert (tmp_path / "MO_11a.parquet").exists()
+    pd.testing.assert_frame_equal(lees_cache(tmp_path / "MO_11a"), df)
+    assert lees_cache(tmp_path / "onbekend") is None
+
+
+def test_gemengde_types_als_pickle(tmp_path):
+    df = pd.DataFrame({"aantal": [1, "tekst"]})
+    schrijf_cache(df, tmp_path / "gemengd")
+    assert (tmp_path / "gemengd.pkl").exists() and not (tmp_path / "gemengd.parquet").exists()
+    pd.testing.assert_frame_equal(lees_cache(tmp_path / "gemengd"), df)
+
+
+def test_ruim_cache_op_op_leeftijd(tmp_path):
+    df = pd.DataFrame({"a": range(10)})
+    schrijf_cache(df, tmp_path / "oud")
+    schrijf_cache(df, tmp_path / "nieuw")
+    lang_geleden = time.time() - 40 * 24 * 60 * 60
+    os.utime(tmp_path / "oud.parquet", (lang_geleden, lang_geleden))
+
+    assert ruim_cache_op(tmp_path, max_leeftijd_dagen=30) == 1
+    assert not (tmp_path / "oud.parquet").exists()
+    assert (tmp_path / "nieuw.parquet").exists()
+
+
+def test_ruim_cache_op_op_grootte_minst_recent_gebruikt_eerst(tmp_path):
+    df = pd.DataFrame({"a": range(1000)})
+    for i, naam in enumerate(["a", "b", "c"]):
+        schrijf_cache(df, tmp_path / naam)
+        os.utime(tmp_path / f"{naam}.parquet", (1_000_000 + i, 1_000_000 + i))
+    lees_cache(tmp_path / "a")  # 'a' is nu het meest recent gebruikt
+
+    grootte_mb = (tmp_path / "a.parquet").stat().st_size / (1024 * 1024)
+    ruim_cache_op(tmp_path, max_leeftijd_dagen=1e6, max_grootte_mb=2.5 * grootte_mb)
+    assert sorted(pad.stem for pad in tmp_path.glob("*.parquet")) == ["a", "c"]
+
+
+def test_lees_csv_ruimt_hash_index_op(tmp_path):
+    cache_map = tmp_path / "cache"
+    bron = tmp_path / "bron.csv"
+    bron.write_text("a;b\n1;2\n", encoding="utf-8")
+    pd.testing.assert_frame_equal(lees_csv(bron, cache_map=cache_map, sep=";"), pd.DataFrame({"a": [1], "b": [2]}))
+    assert len(list(cache_map.glob("*.parquet"))) == 1
+
+    bron.unlink()
+    ruim_cache_op(cache_map)
+    assert bestand_cache._lees_hash_index(cache_map) == {}
@@ -0,0 +1,26 @@
+from pipeline_scripts.bevraging import Indicator
+
+
+def _schrijf_indicator(pad, perioden):
+    regels = ["geoitem;geolevel;period;r_118a"]
+    regels += [f"cr37;corop_id;{periode};{i},5" for i, periode in enumerate(perioden)]
+    pad.write_text("\n".join(regels) + "\n", encoding="utf-8")
+    return Indicator.lees(pad, "Team")
+
+
+def test_selecteer_tot_jaar_omvat_alle_maanden(tmp_path):
+    perioden = [f"m{maand}y2025" for maand in range(1, 13)] + ["m1y2026"]
+    indicator = _schrijf_indicator(tmp_path / "R_118a.csv", perioden)
+
+    rijen = indicator.selecteer(tot=2025)
+    assert [rij["period"] for rij in rijen] == perioden[:12]
+    assert [rij["period"] for rij in indicator.selecteer(van="2025", tot="2025")] == perioden[:12]
+
+
+def test_selecteer_bereik_gemengde_jaren_en_maanden(tmp_path):
+    perioden = ["2024", "m6y2024", "m12y2024", "2025", "m1y2025"]
+    indicator = _schrijf_indicator(tmp_path / "R_118a.csv", perioden)
+
+    rijen = indicator.selecteer(geoitems=["cr37"], van="m6y2024", tot="2024")
+    assert [rij["period"] for rij in rijen] == ["m6y2024", "m12y2024"]
+    assert rijen[0]["waarde"] == 1.5
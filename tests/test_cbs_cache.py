@@ -0,0 +1,114 @@
+import multiprocessing
+
+import pytest
+
+from api_scripts import cbs_cache
+from api_scripts.api_utils import _bouw_odata_filter, download_cbs_data
+
+
+def _haal_op(**kwargs):
+    return download_cbs_data("TEST", keep_nl_data=False, **kwargs)
+
+
+def test_cache_miss_dan_hit(cbs_stub):
+    eerste = _haal_op()
+    assert cbs_stub.verzoeken.count("TypedDataSet") == 1
+    assert sorted(eerste["RegioS"]) == ["nederland", "noord limburg (cr)"]
+
+    tweede = _haal_op()
+    assert cbs_stub.verzoeken.count("TypedDataSet") == 1
+    assert cbs_stub.verzoeken.count("TableInfos") == 1
+    assert tweede.equals(eerste)
+
+
+def test_andere_query_is_eigen_cache_item(cbs_stub):
+    _haal_op()
+    gefilterd = _haal_op(regio_codes=["CR37"])
+    assert cbs_stub.verzoeken.count("TypedDataSet") == 2
+    assert gefilterd["RegioS"].tolist() == ["noord limburg (cr)"]
+
+
+def test_nieuwe_wijzigingsdatum_maakt_cache_ongeldig(cbs_stub):
+    _haal_op(cache_ttl=0)
+    cbs_stub.gewijzigd = "2025-06-01T00:00:00"
+    cbs_stub.rijen[1]["Bevolking_1"] = 540000
+
+    data = _haal_op(cache_ttl=0)
+    assert cbs_stub.verzoeken.count("TypedDataSet") == 2
+    assert 540000 in data["Bevolking_1"].tolist()
+
+    # Beide versies staan in de index, de nieuwste onder de nieuwe wijzigingsdatum
+    items = cbs_cache._lees_index(cbs_cache.CACHE_MAP)["items"]
+    assert sorted(item["gewijzigd"] for item in items.values()) == ["2025-01-01T00:00:00", "2025-06-01T00:00:00"]
+
+
+def test_wijzigingsdatum_pas_na_ttl_opnieuw_gecontroleerd(cbs_stub):
+    _haal_op(cache_ttl=3600)
+    cbs_stub.gewijzigd = "2025-06-01T00:00:00"
+
+    # Binnen de TTL: geen nieuwe controle, dus de oude versie uit de cache
+    _haal_op(cache_ttl=3600)
+    assert cbs_stub.verzoeken.count("TableInfos") == 1
+    assert cbs_stub.verzoeken.count("TypedDataSet") == 1
+
+    # TTL verlopen: de wijzigingsdatum wordt opnieuw opgehaald en de tabel opnieuw gedownload
+    _haal_op(cache_ttl=0)
+    assert cbs_stub.verzoeken.count("TableInfos") == 2
+    assert cbs_stub.verzoeken.count("TypedDataSet") == 2
+
+
+def test_offline_zonder_cache_geeft_fout(cbs_stub, monkeypatch):
+    monkeypatch.setenv("CBS_OFFLINE", "1")
+    with pytest.raises(FileNotFoundError):
+        _haal_op()
+    assert cbs_stub.verzoeken == []
+
+
+def test_offline_gebruikt_cache_zonder_netwerk(cbs_stub, monkeypatch):
+    online = _haal_op()
+    aantal_verzoeken = len(cbs_stub.verzoeken)
+
+    monkeypatch.setenv("CBS_OFFLINE", "1")
+    cbs_stub.gewijzigd = "2025-06-01T00:00:00"
+    offline = _haal_op(cache_ttl=0)
+    assert len(cbs_stub.verzoeken) == aantal_verzoeken
+    assert offline.equals(online)
+
+
+def test_leeg_cbs_cache(cbs_stub):
+    _haal_op()
+    cbs_cache.leeg_cbs_cache("TEST")
+    assert cbs_cache._lees_index(cbs_cache.CACHE_MAP)["items"] == {}
+    _haal_op()
+    assert cbs_stub.verzoeken.count("TypedDataSet") == 2
+
+
+@pytest.mark.parametrize("regio_codes, perioden, verwacht", [
+    (None, None, None),
+    (["cr37"], None, "(startswith(RegioS,'CR37'))"),
+    (["CR37", "NL01"], None, "(startswith(RegioS,'CR37') or startswith(RegioS,'NL01'))"),
+    (None, ["JJ00"], "(substringof('JJ00',Perioden))"),
+    (["GM"], ["2023", "2024"],
+     "(startswith(RegioS,'GM')) and (substringof('2023',Perioden) or substringof('2024',Perioden))"),
+])
+def test_bouw_odata_filter(regio_codes, perioden, verwacht):
+    assert _bouw_odata_filter(regio_codes, perioden) == verwacht
+
+
+def _voeg_toe_aan_index(cache_map, proces, aantal):
+    for nummer in range(aantal):
+        with cbs_cache._index_slot(cache_map):
+            index = cbs_cache._lees_index(cache_map)
+            index.setdefault("items", {})[f"{proces}-{nummer}"] = {}
+            cbs_cache._schrijf_index(cache_map, index)
+
+
+@pytest.mark.skipif(cbs_cache.fcntl is None, reason="slot tussen processen vereist fcntl")
+def test_index_slot_tussen_processen(tmp_path):
+    context = multiprocessing.get_context("fork")
+    processen = [context.Process(target=_voeg_toe_aan_index, args=(tmp_path, proces, 25)) for proces in range(4)]
+    for proces in processen:
+        proces.start()
+    for proces in processen:
+        proces.join()
+    assert len(cbs_cache._lees_index(tmp_path)["items"]) == 100
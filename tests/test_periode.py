@@ -0,0 +1,29 @@
+import numpy as np
+
+from pipeline_scripts.periode import JAAR, MAAND, PeriodeIndex
+
+
+def test_bereik_tot_omvat_maanden_van_het_laatste_jaar():
+    index = PeriodeIndex(["2024", "m3y2024", "m12y2024", "2025"])
+    assert index.bereik(van="2024", tot="2024").tolist() == [0, 1, 2]
+
+
+def test_bereik_gemengde_jaren_en_maanden():
+    perioden = ["m11y2023", "2023", "2024", "m1y2024", "m6y2024", "m12y2024", "2025", "m1y2025"]
+    index = PeriodeIndex(perioden)
+
+    assert index.bereik(van="2024", tot="2024").tolist() == [2, 3, 4, 5]
+    assert index.bereik(van="m6y2024", tot="2025").tolist() == [4, 5, 6, 7]
+    assert index.bereik(tot="m11y2023").tolist() == [0, 1]
+    assert index.bereik(van="2024", soort=JAAR).tolist() == [2, 6]
+    assert index.bereik(van="2024", tot="2024", soort=MAAND).tolist() == [3, 4, 5]
+
+
+def test_bereik_tot_kwartaal_tot_en_met_laatste_maand():
+    index = PeriodeIndex(["2024KW01", "m3y2024", "m4y2024", "2024KW02"])
+    assert index.bereik(tot="2024KW01").tolist() == [0, 1]
+
+
+def test_bereik_zonder_grenzen_slaat_onbekende_perioden_over():
+    index = PeriodeIndex(["2024", "onbekend", "m1y2025"])
+    assert np.array_equal(index.bereik(), [0, 2])